@@ -1,6 +1,9 @@
-from flask import Flask, render_template, session, request, url_for, redirect
+from flask import Flask, render_template, session, request, url_for, redirect, jsonify
+import click
 from config import Config
-from controllers import auth_controller, funcionario_controller, cliente_controller, veiculo_controller, venda_controller
+from infra import pool, imagens, estaticos, senhas, busca, metricas, perfilador, sessoes, condicional, fragmentos
+from infra.cache_paginas import pagina_em_cache, CATALOGO
+from controllers import auth_controller, funcionario_controller, cliente_controller, veiculo_controller, venda_controller, importacao_controller, diagnostico_controller, mudancas_controller
 
 app = Flask(__name__, 
             template_folder='views/templates',
@@ -9,12 +12,36 @@ app = Flask(__name__,
 # Carrega as configurações
 app.config.from_object('config.Config')
 
+# Mede as requisições e expõe /metrics (Prometheus)
+metricas.init_app(app)
+# Devolve ao pool a conexão usada em cada requisição
+pool.init_app(app)
+# Sessões guardadas no servidor (o cookie leva só o id)
+sessoes.init_app(app)
+# Disponibiliza imagem_responsiva() nas templates
+imagens.init_app(app)
+# Disponibiliza cartao_veiculo() (cartões em cache por versão da linha) nas templates
+fragmentos.init_app(app)
+# Versiona os arquivos de views/static e serve com cache de longo prazo
+estaticos.init_app(app)
+# Registra o comando que recomenda o custo do bcrypt (o custo em uso é o BCRYPT_ROUNDS)
+senhas.init_app(app)
+# Monta o índice de busca textual de veículos em segundo plano
+busca.init_app(app)
+# Perfila a requisição com ?perfilar=1 (funcionários)
+perfilador.init_app(app)
+# ETags das páginas condicionais mudam a cada deploy (templates e estáticos)
+condicional.init_app(app)
+
 # Registro de rotas 
 auth_controller.configure_routes(app)
 funcionario_controller.configure_routes(app)
 cliente_controller.configure_routes(app)
 veiculo_controller.configure_routes(app)
 venda_controller.configure_routes(app)
+importacao_controller.configure_routes(app)
+diagnostico_controller.configure_routes(app)
+mudancas_controller.configure_routes(app)
 
 # ========== PÁGINAS PÚBLICAS ==========
 
@@ -41,11 +68,16 @@ def sobre():
     return render_template('sobre.html', logged_in='user_id' in session)
 
 @app.route('/veiculos_publicos')
+@condicional.condicional('veiculos')
+@pagina_em_cache(CATALOGO)
 def veiculos_publicos():
     """Página de veículos disponíveis (pública)"""
-    from models import veiculo_model
-    veiculos = veiculo_model.listar_veiculos_disponiveis()
-    return render_template('veiculos_disponiveis.html', veiculos=veiculos, logged_in='user_id' in session)
+    return veiculo_controller.renderizar_catalogo()
+
+@app.route('/status/pool')
+def status_pool():
+    """Estatísticas do pool de conexões deste worker (restrito a funcionários)"""
+    return jsonify(pool.obter_pool().estatisticas())
 
 
 # ========== CONTEXTO GLOBAL ==========
@@ -63,7 +95,7 @@ def injetar_usuario():
 @app.before_request
 def proteger_rotas_admin():
     """Verifica se rotas administrativas estão protegidas"""
-    rotas_admin = ['/funcionarios', '/clientes', '/vendas']
+    rotas_admin = ['/funcionarios', '/clientes', '/vendas', '/status', '/diagnostico']
     if any(request.path.startswith(rota) for rota in rotas_admin):
         if 'user_id' not in session:
             return redirect(url_for('login'))
@@ -71,5 +103,57 @@ def proteger_rotas_admin():
         if session.get('user_tipo') != 'funcionario':
             return redirect(url_for('home'))
 
+# ========== COMANDOS (flask --app app <comando>) ==========
+
+@app.cli.command('migrar')
+@click.option('--status', 'so_status', is_flag=True, help='Só lista as migrações aplicadas e pendentes')
+def migrar(so_status):
+    """Aplica as migrações pendentes de migracoes/ (rode a cada deploy)"""
+    from infra import migracoes
+    if so_status:
+        for versao, aplicada_em, alterada in migracoes.situacao():
+            estado = f"aplicada em {aplicada_em}" if aplicada_em else "pendente"
+            click.echo(f"{versao}: {estado}{' (arquivo alterado depois de aplicado)' if alterada else ''}")
+        return
+    novas = migracoes.migrar(click.echo)
+    click.echo(f"{len(novas)} migração(ões) aplicada(s)" if novas else "Esquema já está atualizado")
+
+@app.cli.command('reconstruir-resumo')
+@click.option('--inicio', default=None, help='Data inicial (AAAA-MM-DD)')
+@click.option('--fim', default=None, help='Data final (AAAA-MM-DD)')
+def reconstruir_resumo(inicio, fim):
+    """Recalcula vendas_resumo_diario a partir da tabela vendas"""
+    from models import venda_model
+    linhas = venda_model.reconstruir_resumo_vendas(inicio, fim)
+    click.echo(f"Resumo de vendas reconstruído ({linhas} linhas)")
+
+@app.cli.command('reconstruir-facetas')
+def reconstruir_facetas():
+    """Recalcula veiculos_facetas a partir da tabela veiculos"""
+    from models import faceta_model, versao_model
+    linhas = faceta_model.reconstruir_facetas()
+    versao_model.tocar_versao('veiculos')
+    click.echo(f"Facetas do catálogo reconstruídas ({linhas} linhas)")
+
+@app.cli.command('importar')
+@click.argument('tipo', type=click.Choice(['veiculos', 'clientes']))
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def importar(tipo, arquivo):
+    """Importa veículos ou clientes de um arquivo CSV"""
+    from models import importacao_model
+    with open(arquivo, encoding='utf-8-sig', newline='') as f:
+        resultado = importacao_model.importar_csv(tipo, f)
+    for linha, erro in resultado['erros']:
+        click.echo(f"Linha {linha}: {erro}", err=True)
+    click.echo(f"{resultado['inseridos']} registro(s) importado(s), {len(resultado['erros'])} com erro")
+
+@app.cli.command('limpar-sessoes')
+def limpar_sessoes():
+    """Apaga as sessões vencidas do armazém de sessões"""
+    if sessoes.armazem is None:
+        click.echo("Armazém de sessões desativado (SESSION_STORE_ENABLED = False)")
+        return
+    click.echo(f"{sessoes.armazem.limpar_expiradas()} sessão(ões) vencida(s) apagada(s)")
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Modo de serviço async (ASGI):
+
+    pip install -r requirements-async.txt
+    uvicorn asgi:application --workers 4
+
+As leituras públicas do catálogo (/veiculos_publicos e /veiculos_disponiveis) rodam
+no event loop, com o MySQL acessado pelo pool do aiomysql: uma requisição esperando
+o banco não ocupa thread. Todas as outras rotas (login, área administrativa, vendas,
+uploads...) seguem pelo app Flask de sempre, numa thread pool, sem mudança alguma.
+"""
+import io
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+
+from app import app as flask_app
+from config import Config
+from controllers import veiculo_controller
+from infra import pool_async
+from infra.condicional import condicional_async
+from infra.cache_paginas import pagina_em_cache_async, CATALOGO
+
+# Rotas atendidas pelo event loop (somente GET/HEAD)
+ROTAS_ASYNC = {
+    '/veiculos_publicos': veiculo_controller.renderizar_catalogo_async,
+    '/veiculos_disponiveis': veiculo_controller.renderizar_catalogo_async,
+}
+
+wsgi = WSGIMiddleware(flask_app, workers=Config.ASYNC_WSGI_THREADS)
+
+
+async def _enviar(send, resposta, com_corpo):
+    await send({
+        'type': 'http.response.start',
+        'status': resposta.status_code,
+        'headers': [(nome.lower().encode('latin-1'), valor.encode('latin-1'))
+                    for nome, valor in resposta.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': resposta.get_data() if com_corpo else b''})
+
+
+async def _atender(scope, send, renderizar):
+    """Roda a view async dentro do contexto de requisição do Flask (sessão, hooks, templates)"""
+    contexto = flask_app.request_context(build_environ(scope, io.BytesIO()))
+    contexto.push()
+    erro = None
+    try:
+        try:
+            # before_request/after_request do app valem aqui também (métricas, perfil...)
+            resposta = flask_app.preprocess_request()
+            if resposta is None:
+                # 304 direto se o catálogo não mudou; senão a página vem do cache ou é renderizada
+                resposta = await condicional_async(('veiculos',), lambda: pagina_em_cache_async(CATALOGO, renderizar))
+            resposta = flask_app.process_response(flask_app.make_response(resposta))
+        except Exception as e:
+            erro = e
+            resposta = flask_app.make_response(flask_app.handle_exception(e))
+    finally:
+        contexto.pop(erro)
+    await _enviar(send, resposta, scope['method'] != 'HEAD')
+
+
+async def _ciclo_de_vida(receive, send):
+    """Abre o pool async no startup do worker e fecha no shutdown"""
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            try:
+                await pool_async.iniciar()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            await pool_async.encerrar()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _ciclo_de_vida(receive, send)
+    renderizar = ROTAS_ASYNC.get(scope.get('path'))
+    if scope['type'] == 'http' and renderizar and scope['method'] in ('GET', 'HEAD'):
+        return await _atender(scope, send, renderizar)
+    return await wsgi(scope, receive, send)
@@ -0,0 +1,182 @@
+"""
+Gerador de carga HTTP para as rotas principais, usando só a biblioteca padrão:
+
+    python -m bench.carga --url http://localhost:5000 --concorrencia 32 --duracao 60 --saida resultado.json
+
+Cada worker (thread) abre uma conexão keep-alive, faz login como um funcionário
+e um cliente gerados pelo bench.gerar_dados e sorteia rotas até o fim do tempo.
+O resultado (JSON) traz, por rota, requisições, erros, vazão e latências p50/p95/p99.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from bench.gerar_dados import DOMINIO
+
+# rota -> (método, sessão usada: None, 'cliente' ou 'funcionario')
+ROTAS = {
+    '/veiculos_publicos': ('GET', None),
+    '/login': ('POST', None),
+    '/vendas': ('GET', 'funcionario'),
+    '/venda/nova': ('GET', 'funcionario'),
+    '/perfil': ('GET', 'cliente'),
+}
+
+
+class SessaoHttp:
+    """Conexão keep-alive com um pote de cookies próprio"""
+
+    def __init__(self, url, timeout):
+        partes = urlsplit(url)
+        classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._criar = lambda: classe(partes.hostname, partes.port, timeout=timeout)
+        self._conexao = self._criar()
+        self.cookies = {}
+
+    def requisitar(self, metodo, caminho, corpo=None, cookies=None):
+        """Retorna (status, location) e atualiza o pote de cookies informado"""
+        cookies = self.cookies if cookies is None else cookies
+        cabecalhos = {'Accept-Encoding': 'gzip'}
+        if cookies:
+            cabecalhos['Cookie'] = '; '.join(f"{k}={v}" for k, v in cookies.items())
+        if corpo is not None:
+            corpo = urlencode(corpo)
+            cabecalhos['Content-Type'] = 'application/x-www-form-urlencoded'
+        for tentativa in (1, 2):
+            try:
+                self._conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+                resposta = self._conexao.getresponse()
+                resposta.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # O servidor fechou a conexão keep-alive: reabre uma vez
+                self._conexao.close()
+                self._conexao = self._criar()
+                if tentativa == 2:
+                    raise
+        for valor in resposta.headers.get_all('Set-Cookie') or []:
+            for nome, morsel in SimpleCookie(valor).items():
+                cookies[nome] = morsel.value
+        return resposta.status, resposta.headers.get('Location', '')
+
+    def entrar(self, email, senha, cookies):
+        status, destino = self.requisitar('POST', '/login', {'email': email, 'senha': senha}, cookies)
+        # Sucesso redireciona para a home; falha volta para /login
+        return status in (302, 303) and not destino.rstrip('/').endswith('/login')
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def _worker(numero, args, rotas, fim, resultados, lock):
+    rnd = random.Random(args.semente + numero)
+    sessao = SessaoHttp(args.url, args.timeout)
+    potes = {'cliente': {}, 'funcionario': {}}
+    cliente = f"cliente{rnd.randint(1, args.clientes)}@{DOMINIO}"
+    funcionario = f"funcionario{rnd.randint(1, args.funcionarios)}@{DOMINIO}"
+    if any(ROTAS[r][1] == 'cliente' for r in rotas) and not sessao.entrar(cliente, args.senha, potes['cliente']):
+        print(f"worker {numero}: login de {cliente} falhou", file=sys.stderr)
+    if any(ROTAS[r][1] == 'funcionario' for r in rotas) and not sessao.entrar(funcionario, args.senha, potes['funcionario']):
+        print(f"worker {numero}: login de {funcionario} falhou", file=sys.stderr)
+
+    latencias = {rota: [] for rota in rotas}
+    erros = {rota: 0 for rota in rotas}
+    while time.monotonic() < fim:
+        rota = rnd.choice(rotas)
+        metodo, tipo = ROTAS[rota]
+        inicio = time.perf_counter()
+        try:
+            if rota == '/login':
+                email = f"cliente{rnd.randint(1, args.clientes)}@{DOMINIO}"
+                ok = sessao.entrar(email, args.senha, {})
+            else:
+                status, destino = sessao.requisitar(metodo, rota, cookies=potes.get(tipo, {}))
+                # Rotas autenticadas redirecionam para /login quando a sessão se perde
+                ok = status < 400 and not (status in (301, 302, 303) and '/login' in destino)
+        except Exception:
+            ok = False
+        latencias[rota].append(time.perf_counter() - inicio)
+        if not ok:
+            erros[rota] += 1
+
+    with lock:
+        for rota in rotas:
+            resultados['latencias'][rota].extend(latencias[rota])
+            resultados['erros'][rota] += erros[rota]
+
+
+def _resumo(latencias, erros, duracao):
+    ordenadas = sorted(latencias)
+    em_ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        'requisicoes': len(ordenadas),
+        'erros': erros,
+        'vazao_rps': round(len(ordenadas) / duracao, 2) if duracao else None,
+        'p50_ms': em_ms(percentil(ordenadas, 50)),
+        'p95_ms': em_ms(percentil(ordenadas, 95)),
+        'p99_ms': em_ms(percentil(ordenadas, 99)),
+        'max_ms': em_ms(ordenadas[-1] if ordenadas else None),
+    }
+
+
+def executar(args):
+    rotas = args.rotas or list(ROTAS)
+    desconhecidas = [r for r in rotas if r not in ROTAS]
+    if desconhecidas:
+        raise SystemExit(f"Rotas desconhecidas: {', '.join(desconhecidas)}")
+    resultados = {'latencias': {r: [] for r in rotas}, 'erros': {r: 0 for r in rotas}}
+    lock = threading.Lock()
+    inicio = time.monotonic()
+    fim = inicio + args.duracao
+    threads = [threading.Thread(target=_worker, args=(n, args, rotas, fim, resultados, lock), daemon=True)
+               for n in range(args.concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.monotonic() - inicio
+
+    todas = [v for r in rotas for v in resultados['latencias'][r]]
+    return {
+        'url': args.url,
+        'concorrencia': args.concorrencia,
+        'duracao_s': round(duracao, 2),
+        'rotas': {r: _resumo(resultados['latencias'][r], resultados['erros'][r], duracao) for r in rotas},
+        'total': _resumo(todas, sum(resultados['erros'].values()), duracao),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga HTTP com relatório de vazão e percentis por rota")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concorrencia', type=int, default=16, help='workers simultâneos')
+    parser.add_argument('--duracao', type=float, default=30, help='segundos de carga')
+    parser.add_argument('--rotas', nargs='*', help=f"subconjunto de {', '.join(ROTAS)}")
+    parser.add_argument('--clientes', type=int, default=200000, help='clientes gerados (para sortear logins)')
+    parser.add_argument('--funcionarios', type=int, default=50)
+    parser.add_argument('--senha', default='bench123')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--saida', help='arquivo JSON do resultado (padrão: stdout)')
+    args = parser.parse_args()
+
+    resultado = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(resultado + '\n')
+    else:
+        print(resultado)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Teste de concorrência da reserva de veículos: centenas de vendas disputam o mesmo
+carro ao mesmo tempo e exatamente uma deve vencer.
+
+    python -m bench.corrida --vendas 300 --threads 64
+
+Cria um veículo de teste, dispara as vendas em paralelo direto no venda_model
+(uma conexão do pool por tentativa) e confere no banco que ficou uma única venda,
+o veículo indisponível e as facetas iguais às de antes. No fim apaga a venda e o
+veículo (a não ser com --manter). Sai com código 1 se a verificação falhar.
+
+Sem MySQL, `python -m bench.corrida --sem-banco` confere o que os models mandam
+para o banco: reservar_veiculo envia o UPDATE condicional (WHERE ... AND
+disponivel=TRUE) e só mexe nas facetas quando vence; adicionar_venda, quando a
+reserva afeta 0 linhas, levanta ValueError, desfaz a transação e não insere a
+venda. Não substitui a rodada no banco: a exclusividade depende da trava de
+linha do InnoDB, que só o MySQL exercita.
+"""
+import argparse
+import re
+import threading
+import time
+from collections import Counter
+
+from config import Config
+
+
+def _primeiro_id(cursor, tabela, coluna):
+    cursor.execute(f"SELECT MIN({coluna}) FROM {tabela}")
+    valor = cursor.fetchone()[0]
+    if valor is None:
+        raise SystemExit(f"Nenhum registro em {tabela}: rode antes o bench.gerar_dados")
+    return valor
+
+
+def _facetas(cursor):
+    cursor.execute("SELECT dimensao, valor, total FROM veiculos_facetas WHERE total <> 0")
+    return {(dimensao, valor): total for dimensao, valor, total in cursor.fetchall()}
+
+
+# O UPDATE da reserva precisa ser condicional: é ele que trava a linha e decide a disputa
+RESERVA_CONDICIONAL = re.compile(r"^UPDATE veiculos SET disponivel=FALSE\b.* WHERE id_veiculo=%s AND disponivel=TRUE$")
+
+
+class CursorGravador:
+    """Cursor que só anota os comandos; o UPDATE da reserva afeta `linhas_reserva` linhas"""
+
+    def __init__(self, conexao):
+        self._conexao = conexao
+        self.rowcount = 0
+        self.lastrowid = 1
+
+    def execute(self, sql, params=()):
+        compacto = ' '.join(sql.split())
+        self._conexao.comandos.append((compacto, tuple(params or ())))
+        reserva = compacto.startswith('UPDATE veiculos SET disponivel=FALSE')
+        self.rowcount = self._conexao.linhas_reserva if reserva else 1
+
+    def fetchone(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class ConexaoGravadora:
+    """Conexão sem banco: guarda os comandos enviados e conta commits e rollbacks"""
+
+    def __init__(self, linhas_reserva):
+        self.linhas_reserva = linhas_reserva
+        self.comandos = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, *args, **kwargs):
+        return CursorGravador(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def conferir_sem_banco(id_veiculo=42):
+    """Confere o SQL da reserva e o rollback de adicionar_venda quando ela perde; retorna a lista de falhas"""
+    from models import venda_model
+
+    falhas = []
+    conn = ConexaoGravadora(1)
+    venceu = venda_model.reservar_veiculo(conn.cursor(), id_veiculo)
+    comando, params = conn.comandos[0]
+    if not RESERVA_CONDICIONAL.match(comando) or params != (id_veiculo,):
+        falhas.append(f"a reserva deveria ser um UPDATE condicional em disponivel=TRUE, mandou: {comando[:120]}")
+    if not venceu:
+        falhas.append("com rowcount 1 a reserva deveria vencer")
+
+    conn = ConexaoGravadora(0)
+    if venda_model.reservar_veiculo(conn.cursor(), id_veiculo) or len(conn.comandos) != 1:
+        falhas.append("com rowcount 0 a reserva deveria perder sem mexer nas facetas")
+
+    # A venda inteira, com outro pedido tendo levado o veículo antes (rowcount 0)
+    conn = ConexaoGravadora(0)
+    original = Config.__dict__['get_db_connection']
+    Config.get_db_connection = staticmethod(lambda: conn)
+    try:
+        venda_model.adicionar_venda(1, id_veiculo, 1, 50000, 'À vista')
+        falhas.append("adicionar_venda deveria recusar o veículo já reservado")
+    except ValueError:
+        pass
+    finally:
+        Config.get_db_connection = original
+    if conn.rollbacks != 1 or conn.commits:
+        falhas.append(f"adicionar_venda deveria desfazer a transação: {conn.rollbacks} rollback(s), {conn.commits} commit(s)")
+    if any(comando.startswith('INSERT INTO vendas ') for comando, _ in conn.comandos):
+        falhas.append("adicionar_venda não deveria inserir a venda sem a reserva")
+    return falhas
+
+
+def correr(qtd_vendas, qtd_threads, id_cliente=None, id_funcionario=None, manter=False):
+    from infra import pool
+    from models import venda_model, veiculo_model
+
+    conn = pool.conexao_dedicada()
+    cursor = conn.cursor()
+    id_cliente = id_cliente or _primeiro_id(cursor, 'clientes', 'id_cliente')
+    id_funcionario = id_funcionario or _primeiro_id(cursor, 'funcionarios', 'id_funcionario')
+    facetas_antes = _facetas(cursor)
+    conn.commit()
+
+    id_veiculo = veiculo_model.adicionar_veiculo('Corrida', 'Teste', 2020, 50000, cor='Preto', combustivel='Flex')
+    print(f"Veículo de teste {id_veiculo}: {qtd_vendas} vendas em {qtd_threads} threads")
+
+    resultados = Counter()
+    lock = threading.Lock()
+    pendentes = iter(range(qtd_vendas))
+    largada = threading.Barrier(qtd_threads)
+
+    def worker():
+        largada.wait()
+        while True:
+            with lock:
+                if next(pendentes, None) is None:
+                    return
+            try:
+                venda_model.adicionar_venda(id_cliente, id_veiculo, id_funcionario, 50000, 'À vista')
+                resultado = 'vendeu'
+            except ValueError:
+                resultado = 'indisponivel'
+            except Exception as e:
+                resultado = f"erro: {type(e).__name__}: {e}"
+            with lock:
+                resultados[resultado] += 1
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(qtd_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    conn.commit()
+    cursor.execute("SELECT COUNT(*) FROM vendas WHERE id_veiculo=%s", (id_veiculo,))
+    vendas_no_banco = cursor.fetchone()[0]
+    cursor.execute("SELECT disponivel FROM veiculos WHERE id_veiculo=%s", (id_veiculo,))
+    disponivel = bool(cursor.fetchone()[0])
+    # O veículo entrou (+1) e saiu (-1) das facetas: as contagens devem voltar ao que eram
+    facetas_iguais = _facetas(cursor) == facetas_antes
+    conn.commit()
+
+    for resultado, total in sorted(resultados.items()):
+        print(f"  {resultado}: {total}")
+    print(f"  vendas no banco: {vendas_no_banco}, disponível: {disponivel}, facetas conferem: {facetas_iguais}")
+    print(f"  {qtd_vendas} tentativas em {duracao:.2f}s")
+
+    ok = (resultados['vendeu'] == 1 and vendas_no_banco == 1 and not disponivel and facetas_iguais
+          and sum(resultados.values()) == resultados['vendeu'] + resultados['indisponivel'])
+
+    if not manter:
+        # Pelo model, para o resumo diário e as facetas voltarem ao estado anterior
+        cursor.execute("SELECT id_venda FROM vendas WHERE id_veiculo=%s", (id_veiculo,))
+        vendas = [linha[0] for linha in cursor.fetchall()]
+        conn.commit()
+        for id_venda in vendas:
+            venda_model.excluir_venda(id_venda)
+        veiculo_model.excluir_veiculo(id_veiculo)
+    cursor.close()
+    conn.close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendas simultâneas do mesmo veículo: exatamente uma deve vencer")
+    parser.add_argument('--vendas', type=int, default=300, help='tentativas de venda do mesmo veículo')
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--pool', type=int, default=None, help='tamanho do pool (padrão: --threads)')
+    parser.add_argument('--cliente', type=int, default=None, help='id do cliente (padrão: o menor id)')
+    parser.add_argument('--funcionario', type=int, default=None, help='id do funcionário (padrão: o menor id)')
+    parser.add_argument('--manter', action='store_true', help='não apaga a venda e o veículo de teste')
+    parser.add_argument('--sem-banco', action='store_true',
+                        help='só confere o SQL da reserva e o rollback de adicionar_venda (sem MySQL)')
+    args = parser.parse_args()
+
+    if args.sem_banco:
+        falhas = conferir_sem_banco()
+        for falha in falhas:
+            print(f"  {falha}")
+        print("FALHOU: reserva ou rollback da venda" if falhas else "OK: UPDATE condicional e rollback da venda conferem")
+        raise SystemExit(1 if falhas else 0)
+
+    # Uma conexão por thread, para as transações realmente disputarem a linha
+    Config.DB_POOL_SIZE = args.pool or args.threads
+    ok = correr(args.vendas, args.threads, args.cliente, args.funcionario, args.manter)
+    print("OK: exatamente uma venda venceu" if ok else "FALHOU: reserva do veículo não é exclusiva")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
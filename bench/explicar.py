@@ -0,0 +1,275 @@
+"""
+Confere o plano (EXPLAIN) das consultas dos models num banco populado:
+
+    flask --app app migrar
+    python -m bench.gerar_dados --limpar
+    python -m bench.explicar --linhas-min 1000
+
+Falha (código de saída 1) se alguma consulta ler a tabela inteira (type ALL)
+ou ordenar em arquivo (Using filesort) estimando --linhas-min linhas ou mais.
+Os comandos são capturados rodando as funções de model com valores reais do
+banco, numa conexão própria cujo cursor anota cada execute (CursorGravado).
+Leituras e escritas (cadastros, edições, vendas, exclusões) rodam de verdade
+numa única transação que é desfeita no fim: o commit dos models não confirma
+nada, então nenhuma linha do banco muda.
+Leituras completas de propósito ficam em PERMITIDAS, com o motivo.
+"""
+import argparse
+import sys
+from datetime import timedelta
+
+from config import Config
+from infra import metricas, pool
+from models import (auth_model, cliente_model, faceta_model, funcionario_model, mudanca_model,
+                    veiculo_model, venda_model, versao_model)
+
+PERMITIDAS = {
+    'veiculo_model.listar_veiculos_para_indice': 'carga do índice de busca, lê todos os veículos',
+    'venda_model.obter_relatorio_vendas': 'agrupa o resumo diário; a ordenação dos grupos é do relatório',
+}
+
+COMANDOS_EXPLICAVEIS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class CursorGravado:
+    """Cursor que anota (função de model, sql, parâmetros) de cada execute antes de executá-lo"""
+
+    def __init__(self, cursor, consultas):
+        self._cursor = cursor
+        self._consultas = consultas
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        self._consultas.append((metricas.funcao_model(), args[0], args[1] if len(args) > 1 else kwargs.get('params', ())))
+        return self._cursor.execute(*args, **kwargs)
+
+
+class ConexaoDesfeita:
+    """Conexão dos models durante a captura: commit e rollback não fazem nada; tudo é desfeito no fim"""
+
+    def __init__(self, conexao):
+        self._conexao = conexao
+        self.consultas = []
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    def cursor(self, *args, **kwargs):
+        return CursorGravado(self._conexao.cursor(*args, **kwargs), self.consultas)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _amostras():
+    """Uma linha real de cada tabela, para os parâmetros das consultas"""
+    conn = pool.conexao_dedicada()
+    cursor = conn.cursor(dictionary=True)
+    amostras = {}
+    for nome, sql in (
+        ('veiculo', "SELECT id_veiculo, marca, modelo, ano, preco, km_rodados, combustivel, cor FROM veiculos "
+                    "WHERE disponivel = TRUE ORDER BY id_veiculo DESC LIMIT 1"),
+        ('cliente', "SELECT id_cliente, nome, username, cpf, telefone, email, endereco FROM clientes "
+                    "ORDER BY id_cliente DESC LIMIT 1"),
+        ('funcionario', "SELECT id_funcionario, nome, email, cargo FROM funcionarios ORDER BY id_funcionario DESC LIMIT 1"),
+        ('venda', "SELECT id_venda, id_cliente, id_veiculo, id_funcionario, data_venda, valor_final, forma_pagamento "
+                  "FROM vendas ORDER BY id_venda DESC LIMIT 1"),
+    ):
+        cursor.execute(sql)
+        amostras[nome] = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return amostras
+
+
+def _ler_paginas(listar):
+    """Primeira página e a seguinte (com o cursor do keyset)"""
+    pagina = listar()
+    if pagina['proximo']:
+        listar(apos=pagina['proximo'])
+
+
+def _ler(a):
+    """Roda as funções de leitura dos models"""
+    ve, cl, fu, vd = a['veiculo'], a['cliente'], a['funcionario'], a['venda']
+    fim = vd['data_venda']
+    inicio = fim - timedelta(days=30)
+
+    auth_model.obter_identidades_por_email(cl['email'])
+    _ler_paginas(cliente_model.listar_clientes_paginado)
+    cliente_model.buscar_clientes_por_prefixo(cl['nome'][:3])
+    cliente_model.buscar_clientes_por_prefixo(''.join(c for c in cl['cpf'] if c.isdigit())[:5])
+    cliente_model.obter_cliente(cl['id_cliente'])
+    cliente_model.obter_hash_cliente(cl['id_cliente'])
+    cliente_model.obter_cliente_por_email(cl['email'])
+
+    funcionario_model.listar_funcionarios()
+    funcionario_model.buscar_funcionarios_por_prefixo(fu['nome'][:2])
+    funcionario_model.obter_funcionario(fu['id_funcionario'])
+    funcionario_model.obter_funcionario_por_email(fu['email'])
+
+    _ler_paginas(veiculo_model.listar_veiculos_paginado)
+    veiculo_model.listar_veiculos_para_indice()
+    veiculo_model.obter_veiculo(ve['id_veiculo'])
+    veiculo_model.obter_veiculos_por_ids([ve['id_veiculo'], ve['id_veiculo'] - 1])
+    # Combinações de filtro e ordem do catálogo cobertas por índice
+    for filtros, ordem in (
+        ({}, None), ({}, 'preco'), ({}, 'preco_desc'), ({}, 'ano'), ({}, 'ano_desc'), ({}, 'km'),
+        ({'marca': ve['marca']}, None), ({'marca': ve['marca']}, 'preco'), ({'marca': ve['marca']}, 'preco_desc'),
+        ({'combustivel': ve['combustivel']}, None), ({'combustivel': ve['combustivel']}, 'preco'),
+        ({'cor': ve['cor']}, None), ({'cor': ve['cor']}, 'preco'),
+        ({'preco_max': 80000}, 'preco'), ({'ano_min': 2018}, 'ano'), ({'km_max': 50000}, 'km'),
+    ):
+        _ler_paginas(lambda **k: veiculo_model.listar_catalogo(filtros, ordem, **k))
+
+    _ler_paginas(venda_model.listar_vendas_paginado)
+    venda_model.obter_venda(vd['id_venda'])
+    venda_model.obter_relatorio_vendas(inicio, fim, ['marca', 'funcionario'])
+
+    faceta_model.obter_facetas()
+    versao_model.obter_versoes()
+    for entidade in mudanca_model.ENTIDADES:
+        mudancas = mudanca_model.listar_mudancas(entidade, limite=10) or {}
+        mudanca_model.listar_mudancas(entidade, mudancas.get('proximo'), 10)
+
+
+def capturar(a):
+    """[(função de model, sql, parâmetros)] das consultas dos models, numa transação desfeita no fim"""
+    ve, vd = a['veiculo'], a['venda']
+    fim = vd['data_venda']
+    inicio = fim - timedelta(days=30)
+
+    conexao = pool.conexao_dedicada()
+    desfeita = ConexaoDesfeita(conexao)
+    original = Config.__dict__['get_db_connection']
+    Config.get_db_connection = staticmethod(lambda: desfeita)
+    try:
+        _ler(a)
+        _escrever(a)
+    finally:
+        Config.get_db_connection = original
+        conexao.rollback()
+        conexao.close()
+    consultas = desfeita.consultas
+
+    # Consultas montadas pelos models e executadas fora do pool (busca, exportação)
+    consultas.append(('veiculo_model.consulta_busca',
+                      *veiculo_model.consulta_busca([ve['id_veiculo'], ve['id_veiculo'] - 1], {'cor': ve['cor']})))
+    consultas.append(('venda_model.consulta_exportacao', *venda_model.consulta_exportacao(inicio, fim)))
+    return consultas
+
+
+def _escrever(a):
+    """Roda as funções de escrita dos models; as recusadas (ex.: excluir quem tem vendas) valem até onde foram"""
+    ve, cl, fu, vd = a['veiculo'], a['cliente'], a['funcionario'], a['venda']
+    novos = {}
+    passos = [
+        lambda: veiculo_model.atualizar_veiculo(ve['id_veiculo'], ve['marca'], ve['modelo'], ve['ano'], ve['preco'],
+                                                km_rodados=ve['km_rodados'], cor=ve['cor'],
+                                                combustivel=ve['combustivel']),
+        lambda: cliente_model.atualizar_cliente(cl['id_cliente'], cl['nome'], cl['cpf'], cl['telefone'],
+                                                cl['email'], cl['endereco']),
+        lambda: cliente_model.atualizar_perfil_cliente(cl['id_cliente'], cl['username'], cl['nome'], cl['email'],
+                                                       cl['cpf'], cl['telefone'], cl['endereco']),
+        lambda: funcionario_model.atualizar_funcionario(fu['id_funcionario'], fu['nome'], fu['email'], fu['cargo']),
+        lambda: novos.update(veiculo=veiculo_model.adicionar_veiculo('Explain', 'Bench', ve['ano'], ve['preco'],
+                                                                     cor=ve['cor'], combustivel=ve['combustivel'])),
+        lambda: cliente_model.adicionar_cliente('Explain Bench', '000.000.000-00', None, 'explain@bench.invalid', None),
+        lambda: novos.update(venda=venda_model.adicionar_venda(cl['id_cliente'], novos['veiculo'], fu['id_funcionario'],
+                                                               ve['preco'], 'À vista')),
+        lambda: venda_model.atualizar_venda(vd['id_venda'], vd['id_cliente'], vd['id_veiculo'], vd['id_funcionario'],
+                                            vd['valor_final'], vd['forma_pagamento']),
+        lambda: venda_model.excluir_venda(novos['venda']),
+        lambda: veiculo_model.excluir_veiculo(novos['veiculo']),
+        lambda: cliente_model.excluir_cliente(cl['id_cliente']),
+        lambda: funcionario_model.excluir_funcionario(fu['id_funcionario']),
+    ]
+    for passo in passos:
+        try:
+            passo()
+        except Exception as e:
+            print(f"  (escrita interrompida: {e})")
+
+
+def explicar(consultas, linhas_min):
+    """[(função, sql, problemas, linhas do EXPLAIN)] de cada consulta distinta"""
+    conn = pool.conexao_dedicada()
+    cursor = conn.cursor(dictionary=True)
+    vistas = set()
+    resultado = []
+    try:
+        for funcao, sql, params in consultas:
+            compacto = ' '.join(sql.split())
+            if (funcao, compacto) in vistas or not compacto.upper().startswith(COMANDOS_EXPLICAVEIS):
+                continue
+            vistas.add((funcao, compacto))
+            cursor.execute(f"EXPLAIN {sql}", tuple(params or ()))
+            plano = cursor.fetchall()
+            problemas = []
+            for linha in plano:
+                estimadas = int(linha['rows'] or 0)
+                if estimadas < linhas_min:
+                    continue
+                if linha['type'] == 'ALL':
+                    problemas.append(f"leitura completa de {linha['table']} (~{estimadas} linhas)")
+                if 'Using filesort' in (linha['Extra'] or ''):
+                    problemas.append(f"ordenação em arquivo em {linha['table']} (~{estimadas} linhas)")
+            resultado.append((funcao, compacto, problemas, plano))
+    finally:
+        cursor.close()
+        conn.close()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN das consultas dos models: falha em leituras completas e filesorts")
+    parser.add_argument('--linhas-min', type=int, default=1000,
+                        help='linhas estimadas a partir das quais uma leitura completa ou filesort reprova')
+    parser.add_argument('--planos', action='store_true', help='mostra o EXPLAIN de todas as consultas')
+    args = parser.parse_args()
+
+    amostras = _amostras()
+    if not all(amostras.values()):
+        print("Banco sem dados: rode antes o python -m bench.gerar_dados")
+        sys.exit(1)
+
+    reprovadas = 0
+    for funcao, sql, problemas, plano in explicar(capturar(amostras), args.linhas_min):
+        if problemas and funcao in PERMITIDAS:
+            estado = 'PERMITIDA'
+        elif problemas:
+            estado = 'FALHA'
+            reprovadas += 1
+        else:
+            estado = 'OK'
+        print(f"{estado:<10} {funcao}")
+        if estado != 'OK' or args.planos:
+            print(f"           {sql[:200]}")
+            for problema in problemas:
+                print(f"           - {problema}")
+            if estado == 'PERMITIDA':
+                print(f"           ({PERMITIDAS[funcao]})")
+            if args.planos:
+                for linha in plano:
+                    print(f"           {linha['table']}: type={linha['type']} key={linha['key']} "
+                          f"rows={linha['rows']} extra={linha['Extra']}")
+
+    if reprovadas:
+        print(f"\n{reprovadas} consulta(s) com leitura completa ou filesort")
+        sys.exit(1)
+    print("\nNenhuma consulta com leitura completa ou filesort")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Gera uma massa de dados sintética para benchmarks, direto no MySQL de Config.DB_CONFIG:
+
+    python -m bench.gerar_dados --veiculos 100000 --clientes 200000 --vendas 1000000
+
+Todos os clientes e funcionários gerados usam a mesma senha (--senha), com emails
+cliente<n>@bench.scriptcars e funcionario<n>@bench.scriptcars, para o bench.carga
+conseguir fazer login. Os ids são atribuídos aqui, então as chaves estrangeiras
+das vendas sempre apontam para linhas existentes.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from config import Config
+from infra import pool, senhas
+
+DOMINIO = 'bench.scriptcars'
+
+CATALOGO = {
+    'Toyota': ['Corolla', 'Hilux', 'Yaris', 'Etios', 'SW4', 'RAV4'],
+    'Volkswagen': ['Gol', 'Polo', 'Virtus', 'T-Cross', 'Nivus', 'Saveiro', 'Amarok'],
+    'Chevrolet': ['Onix', 'Prisma', 'Cruze', 'Tracker', 'S10', 'Spin'],
+    'Fiat': ['Uno', 'Mobi', 'Argo', 'Cronos', 'Toro', 'Strada', 'Pulse'],
+    'Honda': ['Civic', 'City', 'Fit', 'HR-V', 'WR-V'],
+    'Hyundai': ['HB20', 'HB20S', 'Creta', 'Tucson'],
+    'Renault': ['Sandero', 'Logan', 'Duster', 'Kwid', 'Captur'],
+    'Jeep': ['Renegade', 'Compass', 'Commander'],
+    'Nissan': ['Kicks', 'Versa', 'Frontier', 'March'],
+    'Ford': ['Ka', 'Fiesta', 'EcoSport', 'Ranger', 'Focus'],
+    'Citroën': ['C3', 'C4 Cactus', 'Aircross'],
+    'Peugeot': ['208', '2008', '3008'],
+}
+CORES = ['Preto', 'Branco', 'Prata', 'Cinza', 'Vermelho', 'Azul', 'Marrom', 'Verde']
+COMBUSTIVEIS = ['Flex', 'Gasolina', 'Diesel', 'Etanol', 'Híbrido', 'Elétrico']
+FORMAS_PAGAMENTO = ['À vista', 'Financiamento', 'Cartão de Crédito', 'Cartão de Débito', 'Transferência']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+         'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+              'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Machado']
+
+
+def gerar_cpf(numero):
+    """CPF válido (com dígitos verificadores) a partir de um número único de até 9 dígitos"""
+    base = [int(d) for d in f"{numero:09d}"]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(base, range(tamanho + 1, 1, -1)))
+        resto = soma * 10 % 11
+        base.append(0 if resto == 10 else resto)
+    d = ''.join(map(str, base))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def _proximo_id(cursor, tabela, coluna):
+    cursor.execute(f"SELECT COALESCE(MAX({coluna}), 0) + 1 FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def _inserir(conn, sql, linhas, lote, rotulo, total):
+    """Insere em lotes (executemany vira um INSERT de várias linhas), commitando a cada lote"""
+    cursor = conn.cursor()
+    buffer, feitos, inicio = [], 0, time.perf_counter()
+    for linha in linhas:
+        buffer.append(linha)
+        if len(buffer) >= lote:
+            cursor.executemany(sql, buffer)
+            conn.commit()
+            feitos += len(buffer)
+            buffer = []
+            print(f"\r{rotulo}: {feitos}/{total}", end='', flush=True)
+    if buffer:
+        cursor.executemany(sql, buffer)
+        conn.commit()
+        feitos += len(buffer)
+    cursor.close()
+    print(f"\r{rotulo}: {feitos}/{total} em {time.perf_counter() - inicio:.1f}s")
+
+
+def limpar(conn):
+    """Apaga vendas, veículos, clientes e os funcionários de benchmark"""
+    cursor = conn.cursor()
+    for sql in ("DELETE FROM vendas", "DELETE FROM vendas_resumo_diario", "DELETE FROM veiculos_facetas",
+                "DELETE FROM veiculos", "DELETE FROM clientes",
+                f"DELETE FROM funcionarios WHERE email LIKE '%@{DOMINIO}'"):
+        cursor.execute(sql)
+    conn.commit()
+    cursor.close()
+
+
+def gerar(qtd_veiculos, qtd_clientes, qtd_vendas, qtd_funcionarios, senha, anos, fracao_vendidos,
+          semente=42, lote=5000, custo=None):
+    rnd = random.Random(semente)
+    custo = custo or Config.BCRYPT_ROUNDS
+    senha_hash = senhas.hashpw_sem_medir(senha, custo)
+    hoje = date.today()
+    dias = anos * 365
+
+    conn = pool.conexao_dedicada()
+    cursor = conn.cursor()
+    id_funcionario = _proximo_id(cursor, 'funcionarios', 'id_funcionario')
+    id_cliente = _proximo_id(cursor, 'clientes', 'id_cliente')
+    id_veiculo = _proximo_id(cursor, 'veiculos', 'id_veiculo')
+    cursor.close()
+
+    funcionarios = range(id_funcionario, id_funcionario + qtd_funcionarios)
+    _inserir(conn, """
+        INSERT INTO funcionarios (id_funcionario, nome, email, senha_hash, cargo, data_admissao)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, ((i, f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}", f"funcionario{n}@{DOMINIO}", senha_hash,
+           'Vendedor', hoje - timedelta(days=rnd.randrange(dias)))
+          for n, i in enumerate(funcionarios, start=1)), lote, 'Funcionários', qtd_funcionarios)
+
+    clientes = range(id_cliente, id_cliente + qtd_clientes)
+    _inserir(conn, """
+        INSERT INTO clientes (id_cliente, nome, username, cpf, telefone, email, endereco, senha_hash, data_cadastro)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, ((i, f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}", f"bench{n}",
+           gerar_cpf(100000000 + i), f"(11) 9{rnd.randrange(10**7, 10**8)}", f"cliente{n}@{DOMINIO}",
+           f"Rua {rnd.choice(SOBRENOMES)}, {rnd.randrange(1, 3000)}", senha_hash,
+           hoje - timedelta(days=rnd.randrange(dias)))
+          for n, i in enumerate(clientes, start=1)), lote, 'Clientes', qtd_clientes)
+
+    # Veículos: uma fração fica sem venda (disponível); as vendas se distribuem
+    # entre os demais, que ficam indisponíveis como no fluxo normal da aplicação
+    veiculos = range(id_veiculo, id_veiculo + qtd_veiculos)
+    vendidos = veiculos[:int(qtd_veiculos * fracao_vendidos)] if qtd_vendas else veiculos[:0]
+    precos = {}
+
+    def linhas_veiculos():
+        for i in veiculos:
+            marca = rnd.choice(list(CATALOGO))
+            ano = rnd.randint(hoje.year - 20, min(hoje.year, 2025))
+            preco = round(rnd.uniform(25000, 180000) * (1 - (2025 - ano) * 0.03), 2)
+            precos[i] = preco
+            yield (i, marca, rnd.choice(CATALOGO[marca]), ano, preco, i not in vendidos,
+                   rnd.randrange(0, 200000) if ano < hoje.year else 0, rnd.choice(CORES), rnd.choice(COMBUSTIVEIS))
+
+    _inserir(conn, """
+        INSERT INTO veiculos (id_veiculo, marca, modelo, ano, preco, disponivel, km_rodados, cor, combustivel)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, linhas_veiculos(), lote, 'Veículos', qtd_veiculos)
+
+    def linhas_vendas():
+        for n in range(qtd_vendas):
+            # Cada veículo vendido recebe pelo menos uma venda; o resto é sorteado
+            veiculo = vendidos[n] if n < len(vendidos) else rnd.choice(vendidos)
+            yield (rnd.choice(clientes), rnd.choice(funcionarios), veiculo,
+                   hoje - timedelta(days=rnd.randrange(dias)),
+                   round(precos[veiculo] * rnd.uniform(0.9, 1.0), 2), rnd.choice(FORMAS_PAGAMENTO))
+
+    if qtd_vendas and vendidos:
+        _inserir(conn, """
+            INSERT INTO vendas (id_cliente, id_funcionario, id_veiculo, data_venda, valor_final, forma_pagamento)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, linhas_vendas(), lote, 'Vendas', qtd_vendas)
+    conn.close()
+
+    # Tabelas derivadas mantidas pelos models
+    from models import venda_model, faceta_model, versao_model
+    print("Reconstruindo resumo de vendas e facetas...")
+    venda_model.reconstruir_resumo_vendas()
+    faceta_model.reconstruir_facetas()
+    for tabela in ('veiculos', 'clientes', 'funcionarios'):
+        versao_model.tocar_versao(tabela)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para benchmark")
+    parser.add_argument('--veiculos', type=int, default=100000)
+    parser.add_argument('--clientes', type=int, default=200000)
+    parser.add_argument('--vendas', type=int, default=1000000)
+    parser.add_argument('--funcionarios', type=int, default=50)
+    parser.add_argument('--senha', default='bench123', help='senha de todos os usuários gerados')
+    parser.add_argument('--anos', type=int, default=5, help='período coberto pelas datas de venda')
+    parser.add_argument('--fracao-vendidos', type=float, default=0.7,
+                        help='fração dos veículos que recebe vendas (o resto fica disponível)')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=5000, help='linhas por INSERT/commit')
+    parser.add_argument('--custo-bcrypt', type=int, default=None,
+                        help='custo do hash das senhas (padrão: BCRYPT_ROUNDS da aplicação)')
+    parser.add_argument('--limpar', action='store_true',
+                        help='APAGA vendas, veículos e clientes existentes antes de gerar')
+    args = parser.parse_args()
+
+    if args.limpar:
+        conn = pool.conexao_dedicada()
+        limpar(conn)
+        conn.close()
+    gerar(args.veiculos, args.clientes, args.vendas, args.funcionarios, args.senha, args.anos,
+          args.fracao_vendidos, args.semente, args.lote, args.custo_bcrypt)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Memória das linhas lidas pelos models: dicionário por linha com SELECT * (como
+era) contra a projeção da tela em linhas compactas (models.linhas).
+
+    python -m bench.memoria_linhas --linhas 100000
+    python -m bench.memoria_linhas --linhas 100000 --banco
+
+Sem --banco, monta as linhas em memória com valores parecidos com os do
+bench.gerar_dados (o que o driver entregaria), então roda sem MySQL. Com --banco,
+lê as linhas de verdade de clientes e veiculos (rode antes o bench.gerar_dados).
+Mede com tracemalloc a memória retida pela lista de linhas e o pico durante a leitura.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from config import Config
+from models import cliente_model, veiculo_model
+from models.linhas import sql_colunas
+
+COLUNAS_CLIENTES = ('id_cliente', 'nome', 'username', 'cpf', 'telefone', 'email', 'endereco',
+                    'senha_hash', 'data_cadastro')
+
+
+def _cliente_sintetico(i):
+    return (i, f'Cliente {i:06d} da Silva', f'cliente{i}', f'{i:011d}', f'(41) 9{i:04d}-{i % 10000:04d}',
+            f'cliente{i}@bench.scriptcars', f'Rua {i % 500}, {i % 2000} - Curitiba/PR',
+            '$2b$12$' + 'x' * 53, date(2024, 1, 1 + i % 28))
+
+
+def _veiculo_sintetico(i):
+    return (i, 'Volkswagen', 'T-Cross', 2015 + i % 10, Decimal(f'{50000 + i % 90000}.00'), 1,
+            f'uploads/veiculo_{i}.jpg', (i * 37) % 200000, 'Prata', 'Flex', 1)
+
+
+def _cenarios_sinteticos(n):
+    """(nome, função que monta a lista de linhas) em memória, sem banco"""
+    posicoes = [COLUNAS_CLIENTES.index(c) for c in cliente_model.COLUNAS_LISTA]
+
+    def clientes_dict():
+        return [dict(zip(COLUNAS_CLIENTES, _cliente_sintetico(i))) for i in range(n)]
+
+    def clientes_compacto():
+        linhas = []
+        for i in range(n):
+            valores = _cliente_sintetico(i)
+            linhas.append(cliente_model.ClienteLista._make([valores[p] for p in posicoes]))
+        return linhas
+
+    def veiculos_dict():
+        return [dict(zip(veiculo_model.COLUNAS_VEICULO, _veiculo_sintetico(i))) for i in range(n)]
+
+    def veiculos_compacto():
+        return [veiculo_model.Veiculo._make(_veiculo_sintetico(i)) for i in range(n)]
+
+    return [
+        ('clientes: dict + SELECT *', clientes_dict),
+        ('clientes: ClienteLista', clientes_compacto),
+        ('veiculos: dict + SELECT *', veiculos_dict),
+        ('veiculos: Veiculo', veiculos_compacto),
+    ]
+
+
+def _cenarios_banco(n):
+    """(nome, função que lê a lista de linhas) do MySQL, numa conexão dedicada"""
+    from infra import pool
+
+    def ler(sql, tipo=None):
+        def executar():
+            conn = pool.conexao_dedicada()
+            cursor = conn.cursor(dictionary=tipo is None)
+            cursor.execute(sql, (n,))
+            linhas = cursor.fetchall() if tipo is None else list(map(tipo._make, cursor.fetchall()))
+            cursor.close()
+            conn.close()
+            return linhas
+        return executar
+
+    return [
+        ('clientes: dict + SELECT *', ler("SELECT * FROM clientes ORDER BY id_cliente LIMIT %s")),
+        ('clientes: ClienteLista', ler(f"SELECT {sql_colunas(cliente_model.COLUNAS_LISTA)} FROM clientes "
+                                       f"ORDER BY id_cliente LIMIT %s", cliente_model.ClienteLista)),
+        ('veiculos: dict + SELECT *', ler("SELECT * FROM veiculos ORDER BY id_veiculo LIMIT %s")),
+        ('veiculos: Veiculo', ler(f"{veiculo_model.SELECT_VEICULO} ORDER BY id_veiculo LIMIT %s",
+                                  veiculo_model.Veiculo)),
+    ]
+
+
+def medir(montar):
+    """(linhas, bytes retidos pela lista, pico em bytes, segundos)"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    linhas = montar()
+    duracao = time.perf_counter() - inicio
+    retido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(linhas), retido, pico, duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória das linhas: dict com SELECT * x projeção compacta")
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--banco', action='store_true', help='lê do MySQL em vez de montar as linhas em memória')
+    args = parser.parse_args()
+
+    cenarios = _cenarios_banco(args.linhas) if args.banco else _cenarios_sinteticos(args.linhas)
+    print(f"{'cenário':<28} {'linhas':>8} {'retido (MB)':>12} {'pico (MB)':>10} {'B/linha':>8} {'tempo (s)':>10}")
+    for nome, montar in cenarios:
+        qtd, retido, pico, duracao = medir(montar)
+        por_linha = retido / qtd if qtd else 0
+        print(f"{nome:<28} {qtd:>8} {retido / 2**20:>12.1f} {pico / 2**20:>10.1f} {por_linha:>8.0f} {duracao:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,13 +14,99 @@ class Config:
     # Opções de sessão (equivalente ao que estava em app.py)
     SESSION_PERMANENT = True
     PERMANENT_SESSION_LIFETIME = 2592000  # 30 dias em segundos
+    # Sessões no servidor (infra/sessoes.py): o cookie leva só um id; os dados ficam num
+    # SQLite compartilhado pelos workers, com um LRU em memória na frente
+    SESSION_STORE_ENABLED = True
+    SESSION_DB = os.environ.get('SESSION_DB', os.path.join('instance', 'sessoes.sqlite3'))
+    SESSION_CACHE_MAX_ITENS = 10000
+    SESSION_CACHE_TTL = 0  # segundos confiando no LRU sem conferir a versão (0 = sempre confere; seguro com vários workers)
+    SESSION_TOUCH_INTERVAL = 3600  # sessões só lidas têm a expiração adiada no máximo 1x por hora
+    SESSION_PURGE_INTERVAL = 3600  # sessões vencidas são apagadas em lote a cada hora
+    # Pool de conexões (por processo/worker)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # segundos esperando conexão livre
+    DB_POOL_MAX_LIFETIME = int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))  # recicla após 30 min
+    # Transações abortadas por deadlock/timeout de lock são repetidas com espera exponencial
+    DB_RETRY_ATTEMPTS = 4
+    DB_RETRY_BACKOFF = 0.05  # segundos; dobra a cada tentativa
+    # Modo async (asgi.py): conexões do pool aiomysql e threads para as rotas WSGI
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))
+    ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 10))
+
+    # Paginação das listagens (veículos, clientes, vendas)
+    PAGE_SIZE = 50
+    PAGE_SIZE_MAX = 200
+    # Autocompletar (clientes, veículos e funcionários no formulário de venda)
+    TYPEAHEAD_SIZE = 10
+    TYPEAHEAD_SIZE_MAX = 25
+
+    # Cache em memória das páginas públicas do catálogo, por worker. As entradas valem
+    # para a versão de veículos em versoes_tabelas: uma escrita em qualquer worker as
+    # invalida em todos em até CONDITIONAL_VERSION_TTL segundos
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TTL = 300  # segundos; rede de segurança além das versões
+    PAGE_CACHE_MAX_ITENS = 256
+    # Cache dos cartões de veículo renderizados (por id_veiculo + versão da linha)
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_MAX_ITENS = 5000
+
+    # GET condicional (ETag/Last-Modified) do catálogo, detalhes de venda e edição de veículo
+    CONDITIONAL_GET_ENABLED = True
+    CONDITIONAL_VERSION_TTL = 1.0  # segundos que cada worker reaproveita os marcadores de versão lidos do banco
+
+    # Feed de alterações (/api/mudancas/<entidade>) para parceiros e DMS. Sem sessão de
+    # funcionário, exige "Authorization: Bearer <FEED_TOKEN>" (se definido)
+    FEED_TOKEN = os.environ.get('FEED_TOKEN')
+    FEED_PAGE_SIZE = 500
+    FEED_PAGE_SIZE_MAX = 5000
+    FEED_SAFETY_LAG = 2.0  # segundos; escritas mais recentes que isso ficam para o próximo pedido
+
+    # Threads que geram as variantes (thumb/card/full) das fotos enviadas
+    IMAGE_WORKERS = 2
+
+    # Nomes de arquivos estáticos versionados pelo conteúdo (cache imutável)
+    STATIC_FINGERPRINT = True
+
+    # bcrypt: executor limitado e custo fixo, igual em todos os workers.
+    # `flask --app app calibrar-bcrypt` recomenda um custo para o alvo em ms
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    BCRYPT_TARGET_MS = 250
+    BCRYPT_WORKERS = os.cpu_count() or 2
+    BCRYPT_QUEUE_MAX = 32
+
+    # Login: emails inexistentes ficam em cache por alguns segundos
+    LOGIN_NEGATIVE_CACHE_TTL = 60
+    LOGIN_NEGATIVE_CACHE_MAX = 10000
+
+    # Importação de CSV: linhas por transação e processos para o bcrypt
+    IMPORT_CHUNK_SIZE = 500
+    IMPORT_HASH_PROCESSES = os.cpu_count() or 2
+
+    # Métricas do Prometheus em /metrics. Com vários workers, aponte METRICS_DIR para
+    # uma pasta comum: cada worker grava ali a sua parte e /metrics soma todas, com os
+    # totais dos workers encerrados guardados em encerrados.json
+    METRICS_ENABLED = True
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = 5  # segundos
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # sem token, /metrics só para funcionários logados
+
+    # Busca textual de veículos (índice invertido em memória)
+    SEARCH_INDEX_ON_STARTUP = True
+    SEARCH_INDEX_REFRESH = 300  # segundos; recarrega para ver escritas de outros workers
+    SEARCH_RESULTS_MAX = 60
+
+    # Perfilamento sob demanda: ?perfilar=1 em qualquer rota (só funcionários, a não ser
+    # com PROFILING_ALLOW_ALL). Os perfis ficam em PROFILING_DIR e aparecem em /diagnostico/perfis
+    PROFILING_ALLOW_ALL = os.environ.get('PROFILING_ALLOW_ALL') == '1'
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'perfis')
+    PROFILING_KEEP = 50  # perfis mais recentes mantidos em disco
+    PROFILING_INTERVAL = 0.001  # segundos entre amostras da pilha (flame graph)
 
     def get_db_connection():
-        # Mantido por compatibilidade, usando Config.DB_CONFIG
-        import mysql.connector
+        # Empresta do pool; dentro de uma requisição todos os models usam a mesma conexão
+        from infra import pool
         try:
-            connection = mysql.connector.connect(**Config.DB_CONFIG)
-            return connection
+            return pool.conexao_da_requisicao()
         except mysql.connector.Error as err:
             print(f"Erro ao se conectar com o banco de dados: {err}")
             return None
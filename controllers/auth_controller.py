@@ -1,8 +1,9 @@
 from flask import render_template, request, redirect, url_for, flash, session, make_response
-from models import funcionario_model, cliente_model
+from models import funcionario_model, cliente_model, auth_model
 from datetime import timedelta
 import mysql.connector
 from config import Config
+from infra import senhas, sessoes
 
 
 def configure_routes(app):
@@ -24,24 +25,33 @@ def configure_routes(app):
             return redirect(url_for('login'))
         
         try:
-            # 1) Tenta logar como cliente (padrão para público)
-            cliente = cliente_model.obter_cliente_por_email(email)
-            if cliente and cliente.get('senha_hash') and cliente_model.verificar_senha(senha, cliente['senha_hash']):
-                session['user_id'] = cliente['id_cliente']
-                session['user_nome'] = cliente.get('username') or cliente['nome']
-                session['user_email'] = cliente['email']
-                session['user_tipo'] = 'cliente'
-            else:
-                # 2) Fallback: tenta logar como funcionário (para área administrativa)
-                funcionario = funcionario_model.obter_funcionario_por_email(email)
-                if not funcionario or not funcionario_model.verificar_senha(senha, funcionario['senha_hash']):
-                    flash("Email ou senha inválidos!", "error")
-                    return redirect(url_for('login'))
-                session['user_id'] = funcionario['id_funcionario']
-                session['user_nome'] = funcionario['nome']
-                session['user_email'] = funcionario['email']
-                session['user_cargo'] = funcionario['cargo']
-                session['user_tipo'] = 'funcionario'
+            # Uma única consulta resolve o email para cliente e/ou funcionário;
+            # o cliente tem prioridade (padrão para público), depois o funcionário
+            identidades = auth_model.obter_identidades_por_email(email) or []
+            conta = None
+            for identidade in identidades:
+                if identidade['senha_hash'] and senhas.verificar(senha, identidade['senha_hash']):
+                    conta = identidade
+                    break
+            if not conta:
+                flash("Email ou senha inválidos!", "error")
+                return redirect(url_for('login'))
+
+            # Id de sessão novo a cada login (contra fixação de sessão)
+            sessoes.renovar_id(session)
+            session['user_id'] = conta['id']
+            session['user_nome'] = conta['nome']
+            session['user_email'] = conta['email']
+            session['user_tipo'] = conta['tipo']
+            if conta['tipo'] == 'funcionario':
+                session['user_cargo'] = conta['cargo']
+
+            # Hash com custo antigo: regrava com o custo atual sem atrasar o login
+            if senhas.precisa_rehash(conta['senha_hash']):
+                id_conta = conta['id']
+                atualizar_hash = (cliente_model.atualizar_hash_cliente if conta['tipo'] == 'cliente'
+                                  else funcionario_model.atualizar_hash_funcionario)
+                senhas.rehash_em_segundo_plano(senha, lambda novo_hash: atualizar_hash(id_conta, novo_hash))
             
             # Se o usuário pediu para lembrar, define cookie
             if lembrar:
@@ -51,6 +61,9 @@ def configure_routes(app):
             flash(f"Bem-vindo, {session['user_nome']}!", "success")
             return redirect(url_for('home'))
         
+        except senhas.FilaSenhasCheiaError as e:
+            flash(str(e), "error")
+            return redirect(url_for('login'))
         except Exception as e:
             flash(f"Erro ao fazer login: {str(e)}", "error")
             return redirect(url_for('login'))
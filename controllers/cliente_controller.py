@@ -1,4 +1,4 @@
-from flask import render_template, request, redirect, url_for, flash, session
+from flask import render_template, request, redirect, url_for, flash, session, jsonify
 from models import cliente_model
 import mysql.connector
 
@@ -37,8 +37,17 @@ def configure_routes(app):
     @funcionario_required
     def listar_clientes():
         """Lista todos os clientes"""
-        clientes = cliente_model.listar_clientes()
-        return render_template('clientes.html', clientes=clientes)
+        pagina = cliente_model.listar_clientes_paginado(
+            request.args.get('apos'), request.args.get('antes'), request.args.get('por_pagina'))
+        return render_template('clientes.html', clientes=pagina['itens'], pagina=pagina)
+
+    @app.route('/clientes/busca')
+    @funcionario_required
+    def buscar_clientes():
+        """Sugestões de clientes por nome ou CPF (JSON do autocompletar)"""
+        texto = request.args.get('q', '').strip()
+        clientes = cliente_model.buscar_clientes_por_prefixo(texto, request.args.get('limite')) if texto else []
+        return jsonify(itens=[{'id': c['id_cliente'], 'rotulo': f"{c['nome']} - {c['cpf']}"} for c in clientes])
 
     @app.route('/perfil')
     @cliente_required
@@ -76,8 +85,8 @@ def configure_routes(app):
                 flash("As senhas não coincidem!", "error")
                 return redirect(url_for('perfil_cliente'))
             # valida senha atual
-            cliente = cliente_model.obter_cliente(session['user_id'])
-            if not cliente_model.verificar_senha(senha_atual, cliente.get('senha_hash')):
+            senha_hash = cliente_model.obter_hash_cliente(session['user_id'])
+            if not cliente_model.verificar_senha(senha_atual, senha_hash):
                 flash("Senha atual incorreta!", "error")
                 return redirect(url_for('perfil_cliente'))
             cliente_model.atualizar_senha_cliente(session['user_id'], nova_senha)
@@ -97,14 +106,14 @@ def configure_routes(app):
             if confirmacao.strip().lower() != 'excluir':
                 flash("Digite 'excluir' para confirmar a exclusão.", "error")
                 return redirect(url_for('perfil_cliente'))
-            # Verifica se cliente tem vendas
-            if cliente_model.cliente_ja_tem_vendas(session['user_id']):
-                flash("Não é possível excluir conta com vendas realizadas.", "error")
-                return redirect(url_for('perfil_cliente'))
+            # Recusa (ValueError) se o cliente tiver vendas
             cliente_model.excluir_cliente(session['user_id'])
             session.clear()
             flash("Sua conta foi excluída.", "success")
             return redirect(url_for('home'))
+        except ValueError:
+            flash("Não é possível excluir conta com vendas realizadas.", "error")
+            return redirect(url_for('perfil_cliente'))
         except Exception as e:
             flash(f"Erro ao excluir conta: {str(e)}", "error")
             return redirect(url_for('perfil_cliente'))
@@ -206,13 +215,11 @@ def configure_routes(app):
     def excluir_cliente(id):
         """Exclui um cliente"""
         try:
-            # Verifica se cliente tem vendas
-            if cliente_model.cliente_ja_tem_vendas(id):
-                flash("Não é possível excluir cliente que já possui vendas associadas!", "error")
-                return redirect(url_for('listar_clientes'))
-            
+            # Recusa (ValueError) se o cliente tiver vendas
             cliente_model.excluir_cliente(id)
             flash("Cliente excluído com sucesso!", "success")
+        except ValueError as e:
+            flash(str(e), "error")
         except Exception as e:
             flash(f"Erro ao excluir cliente: {str(e)}", "error")
         
@@ -0,0 +1,36 @@
+from flask import render_template, redirect, url_for, flash, session, send_from_directory, abort
+from werkzeug.utils import secure_filename
+from config import Config
+from infra import perfilador
+import os
+
+EXTENSOES_PERFIL = ('.pstats', '.folded', '.json')
+
+
+def configure_routes(app):
+    def funcionario_required(f):
+        def wrapper(*args, **kwargs):
+            if 'user_id' not in session:
+                flash("Você precisa fazer login para acessar esta página", "error")
+                return redirect(url_for('login'))
+            if session.get('user_tipo') != 'funcionario':
+                flash("Acesso restrito aos funcionários", "error")
+                return redirect(url_for('home'))
+            return f(*args, **kwargs)
+        wrapper.__name__ = f.__name__
+        return wrapper
+
+    @app.route('/diagnostico/perfis')
+    @funcionario_required
+    def listar_perfis():
+        """Lista os perfis gravados com ?perfilar=1, do mais recente ao mais antigo"""
+        return render_template('perfis.html', perfis=perfilador.listar_perfis())
+
+    @app.route('/diagnostico/perfis/<arquivo>')
+    @funcionario_required
+    def baixar_perfil(arquivo):
+        """Baixa o .pstats, .folded ou .json de um perfil"""
+        arquivo = secure_filename(arquivo)
+        if not arquivo.endswith(EXTENSOES_PERFIL):
+            abort(404)
+        return send_from_directory(os.path.abspath(Config.PROFILING_DIR), arquivo, as_attachment=True)
@@ -1,4 +1,4 @@
-from flask import render_template, request, redirect, url_for, flash, session
+from flask import render_template, request, redirect, url_for, flash, session, jsonify
 from models import funcionario_model
 
 def configure_routes(app):
@@ -32,6 +32,14 @@ def configure_routes(app):
         funcionarios = funcionario_model.listar_funcionarios()
         return render_template('funcionarios.html', funcionarios=funcionarios)
 
+    @app.route('/funcionarios/busca')
+    @funcionario_required
+    def buscar_funcionarios():
+        """Sugestões de funcionários por nome (JSON do autocompletar)"""
+        texto = request.args.get('q', '').strip()
+        funcionarios = funcionario_model.buscar_funcionarios_por_prefixo(texto, request.args.get('limite')) if texto else []
+        return jsonify(itens=[{'id': f['id_funcionario'], 'rotulo': f"{f['nome']} - {f['cargo']}"} for f in funcionarios])
+
     @app.route('/funcionario/novo')
     @funcionario_required
     def formulario_novo_funcionario():
@@ -77,10 +85,6 @@ def configure_routes(app):
             flash("Funcionário não encontrado!", "error")
             return redirect(url_for('listar_funcionarios'))
         
-        # Remove senha do objeto
-        if 'senha_hash' in funcionario:
-            del funcionario['senha_hash']
-        
         return render_template('form_funcionario.html', funcionario=funcionario)
 
     @app.route('/funcionario/editar/<int:id>', methods=['POST'])
@@ -123,12 +127,11 @@ def configure_routes(app):
     def excluir_funcionario(id):
         """Exclui um funcionário"""
         try:
-            # Impede exclusão se houver vendas vinculadas
-            if funcionario_model.funcionario_tem_vendas(id):
-                flash("Não é possível excluir: o funcionário possui vendas vinculadas.", "error")
-                return redirect(url_for('listar_funcionarios'))
+            # Recusa (ValueError) se houver vendas vinculadas
             funcionario_model.excluir_funcionario(id)
             flash("Funcionário excluído com sucesso!", "success")
+        except ValueError as e:
+            flash(str(e), "error")
         except Exception as e:
             flash(f"Erro ao excluir funcionário: {str(e)}", "error")
         
@@ -0,0 +1,48 @@
+from flask import render_template, request, redirect, url_for, flash, session
+from models import importacao_model
+import io
+
+
+def configure_routes(app):
+    def funcionario_required(f):
+        def wrapper(*args, **kwargs):
+            if 'user_id' not in session:
+                flash("Você precisa fazer login para acessar esta página", "error")
+                return redirect(url_for('login'))
+            if session.get('user_tipo') != 'funcionario':
+                flash("Acesso restrito aos funcionários", "error")
+                return redirect(url_for('home'))
+            return f(*args, **kwargs)
+        wrapper.__name__ = f.__name__
+        return wrapper
+
+    @app.route('/importar')
+    @funcionario_required
+    def formulario_importacao():
+        """Exibe formulário de importação de CSV"""
+        return render_template('importar.html', tipo=request.args.get('tipo', 'veiculos'), resultado=None)
+
+    @app.route('/importar', methods=['POST'])
+    @funcionario_required
+    def importar_dados():
+        """Importa veículos ou clientes a partir de um CSV enviado"""
+        tipo = request.form.get('tipo', '')
+        arquivo = request.files.get('arquivo')
+        if not arquivo or arquivo.filename == '':
+            flash("Selecione um arquivo CSV!", "error")
+            return redirect(url_for('formulario_importacao', tipo=tipo))
+
+        try:
+            # Lê o upload em fluxo, sem carregar o arquivo inteiro na memória
+            texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+            resultado = importacao_model.importar_csv(tipo, texto)
+        except ValueError as e:
+            flash(str(e), "error")
+            return redirect(url_for('formulario_importacao', tipo=tipo))
+        except Exception as e:
+            flash(f"Erro ao importar arquivo: {str(e)}", "error")
+            return redirect(url_for('formulario_importacao', tipo=tipo))
+
+        categoria = "success" if not resultado['erros'] else "info"
+        flash(f"Importação concluída: {resultado['inseridos']} registro(s) importado(s).", categoria)
+        return render_template('importar.html', tipo=tipo, resultado=resultado)
@@ -0,0 +1,31 @@
+from flask import request, session, jsonify
+from config import Config
+from models import mudanca_model
+
+
+def configure_routes(app):
+    def acesso_integracao(f):
+        """Funcionário logado ou integração com o token do feed"""
+        def wrapper(*args, **kwargs):
+            if session.get('user_tipo') != 'funcionario' and not (
+                    Config.FEED_TOKEN and request.headers.get('Authorization') == f"Bearer {Config.FEED_TOKEN}"):
+                return jsonify({'erro': 'Não autorizado'}), 401
+            return f(*args, **kwargs)
+        wrapper.__name__ = f.__name__
+        return wrapper
+
+    @app.route('/api/mudancas/<entidade>')
+    @acesso_integracao
+    def listar_mudancas(entidade):
+        """Alterações e exclusões desde o cursor: ?since=<cursor>&limit=<n> (veiculos, vendas, clientes)"""
+        if entidade not in mudanca_model.ENTIDADES:
+            return jsonify({'erro': 'Entidade deve ser veiculos, vendas ou clientes'}), 404
+        try:
+            mudancas = mudanca_model.listar_mudancas(entidade, request.args.get('since'), request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+        if mudancas is None:
+            return jsonify({'erro': 'Não foi possível ler as mudanças'}), 500
+        resposta = jsonify(mudancas)
+        resposta.headers['Cache-Control'] = 'no-store'
+        return resposta
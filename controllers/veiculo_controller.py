@@ -1,5 +1,9 @@
-from flask import render_template, request, redirect, url_for, flash, session, send_file
-from models import veiculo_model
+from flask import render_template, request, redirect, url_for, flash, session, send_file, jsonify
+from models import veiculo_model, faceta_model, catalogo_async
+from infra.cache_paginas import pagina_em_cache, CATALOGO
+from infra import imagens
+from infra.condicional import condicional
+import asyncio
 import os
 from werkzeug.utils import secure_filename
 
@@ -8,6 +12,79 @@ UPLOAD_FOLDER = 'views/static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+FILTROS_TEXTO = ('marca', 'combustivel', 'cor')
+
+
+def ler_filtros_catalogo(args):
+    """Filtros do catálogo vindos da query string; faixas numéricas inválidas são ignoradas"""
+    filtros = {}
+    for nome in veiculo_model.FILTROS_CATALOGO:
+        valor = args.get(nome, '').strip()
+        if not valor:
+            continue
+        if nome not in FILTROS_TEXTO:
+            try:
+                valor = float(valor.replace(',', '.'))
+            except ValueError:
+                continue
+            if not nome.startswith('preco'):
+                valor = int(valor)
+        filtros[nome] = valor
+    return filtros
+
+
+def _template_catalogo(busca, ordem, veiculos, pagina, facetas):
+    return render_template('veiculos_disponiveis.html', veiculos=veiculos, pagina=pagina, busca=busca,
+                           filtros=request.args, ordem=ordem, facetas=facetas)
+
+
+def _erro_catalogo(busca, ordem):
+    """Catálogo vazio com o aviso, em 503: nem o cache de páginas nem o GET condicional guardam a resposta"""
+    flash("Não foi possível carregar os veículos disponíveis. Verifique a conexão com o banco de dados.", "error")
+    return _template_catalogo(busca, ordem, [], None, {}), 503
+
+
+def renderizar_catalogo():
+    """Catálogo público: busca textual, filtros, ordenação, facetas e paginação"""
+    busca = request.args.get('q', '').strip()
+    filtros = ler_filtros_catalogo(request.args)
+    ordem = request.args.get('ordem', '')
+    pagina = None
+    try:
+        if busca:
+            veiculos = veiculo_model.buscar_veiculos_disponiveis(busca, filtros, ordem)
+        else:
+            pagina = veiculo_model.listar_catalogo(
+                filtros, ordem, request.args.get('apos'), request.args.get('antes'), request.args.get('por_pagina'))
+            veiculos = pagina['itens']
+        facetas = faceta_model.obter_facetas()
+    except Exception as e:
+        return _erro_catalogo(busca, ordem)
+    return _template_catalogo(busca, ordem, veiculos, pagina, facetas)
+
+
+async def renderizar_catalogo_async():
+    """Mesmo catálogo para o modo async (asgi.py): página e facetas consultadas em paralelo"""
+    busca = request.args.get('q', '').strip()
+    filtros = ler_filtros_catalogo(request.args)
+    ordem = request.args.get('ordem', '')
+    pagina = None
+    try:
+        if busca:
+            consulta = catalogo_async.buscar_veiculos_disponiveis(busca, filtros, ordem)
+        else:
+            consulta = catalogo_async.listar_catalogo(
+                filtros, ordem, request.args.get('apos'), request.args.get('antes'), request.args.get('por_pagina'))
+        resultado, facetas = await asyncio.gather(consulta, catalogo_async.obter_facetas())
+        if busca:
+            veiculos = resultado
+        else:
+            pagina = resultado
+            veiculos = pagina['itens']
+    except Exception as e:
+        return _erro_catalogo(busca, ordem)
+    return _template_catalogo(busca, ordem, veiculos, pagina, facetas)
+
 
 def configure_routes(app):
     def login_required(f):
@@ -41,33 +118,51 @@ def configure_routes(app):
             os.makedirs(UPLOAD_FOLDER)
 
     def deletar_foto(foto_path):
-        """Deleta uma foto do sistema de arquivos se ela existir"""
+        """Deleta uma foto (e suas variantes) do sistema de arquivos se ela existir"""
         if foto_path and os.path.exists(foto_path):
             try:
                 os.remove(foto_path)
             except Exception as e:
                 print(f"Erro ao deletar foto: {str(e)}")
+        if foto_path:
+            imagens.remover_derivados(foto_path)
 
     @app.route('/veiculos')
     @funcionario_required
     def listar_veiculos():
         """Lista todos os veículos (página pública quando não logado)"""
+        pagina = None
         try:
-            veiculos = veiculo_model.listar_veiculos()
+            pagina = veiculo_model.listar_veiculos_paginado(
+                request.args.get('apos'), request.args.get('antes'), request.args.get('por_pagina'))
+            veiculos = pagina['itens']
         except Exception as e:
             flash("Não foi possível carregar os veículos. Verifique a conexão com o banco de dados.", "error")
             veiculos = []
-        return render_template('veiculos.html', veiculos=veiculos, logged_in='user_id' in session)
+        return render_template('veiculos.html', veiculos=veiculos, pagina=pagina, logged_in='user_id' in session)
+
+    @app.route('/veiculos/busca')
+    @funcionario_required
+    def buscar_veiculos():
+        """Sugestões de veículos (JSON do autocompletar); todos=1 inclui os vendidos"""
+        texto = request.args.get('q', '').strip()
+        somente_disponiveis = request.args.get('todos') != '1'
+        veiculos = veiculo_model.buscar_veiculos_por_prefixo(
+            texto, request.args.get('limite'), somente_disponiveis) if texto else []
+        itens = []
+        for v in veiculos:
+            rotulo = f"{v['marca']} {v['modelo']} {v['ano']} - R$ {v['preco']:.2f}"
+            if not v['disponivel']:
+                rotulo += " (Vendido)"
+            itens.append({'id': v['id_veiculo'], 'rotulo': rotulo})
+        return jsonify(itens=itens)
 
     @app.route('/veiculos_disponiveis')
+    @condicional('veiculos')
+    @pagina_em_cache(CATALOGO)
     def listar_veiculos_disponiveis():
         """Lista veículos disponíveis (página pública)"""
-        try:
-            veiculos = veiculo_model.listar_veiculos_disponiveis()
-        except Exception as e:
-            flash("Não foi possível carregar os veículos disponíveis. Verifique a conexão com o banco de dados.", "error")
-            veiculos = []
-        return render_template('veiculos_disponiveis.html', veiculos=veiculos)
+        return renderizar_catalogo()
 
     @app.route('/veiculo/novo')
     @funcionario_required
@@ -112,6 +207,8 @@ def configure_routes(app):
                     file.save(filepath)
                     # Normaliza o caminho para usar barras (/)
                     foto = filepath.replace('\\', '/')
+                    # Gera thumb/card/full em WebP e JPEG em segundo plano
+                    imagens.agendar_derivados(foto)
             
             # Adiciona veículo
             veiculo_model.adicionar_veiculo(marca, modelo, ano, preco, foto, km_rodados, cor, combustivel)
@@ -126,6 +223,7 @@ def configure_routes(app):
 
     @app.route('/veiculo/editar/<int:id>')
     @funcionario_required
+    @condicional('veiculos', privado=True)
     def formulario_editar_veiculo(id):
         """Exibe formulário para editar veículo"""
         veiculo = veiculo_model.obter_veiculo(id)
@@ -154,10 +252,6 @@ def configure_routes(app):
                 flash("Todos os campos são obrigatórios!", "error")
                 return redirect(url_for('formulario_editar_veiculo', id=id))
             
-            # Busca a foto atual do veículo
-            veiculo_atual = veiculo_model.obter_veiculo(id)
-            foto_antiga = veiculo_atual.get('foto') if veiculo_atual else None
-            
             # Processa upload de nova foto (se fornecida)
             foto = None
             if 'foto' in request.files:
@@ -173,13 +267,21 @@ def configure_routes(app):
                     file.save(filepath)
                     # Normaliza o caminho para usar barras (/)
                     foto = filepath.replace('\\', '/')
-                    
-                    # Deleta a foto antiga se existir e se for diferente da nova
-                    if foto_antiga and foto_antiga != foto:
-                        deletar_foto(foto_antiga)
+                    # Gera thumb/card/full em WebP e JPEG em segundo plano
+                    imagens.agendar_derivados(foto)
             
-            # Atualiza veículo
-            veiculo_model.atualizar_veiculo(id, marca, modelo, ano, preco, disponivel, km_rodados, cor, combustivel, foto)
+            # Atualiza veículo (o model devolve a foto que havia antes da alteração)
+            try:
+                foto_antiga = veiculo_model.atualizar_veiculo(id, marca, modelo, ano, preco, disponivel, km_rodados, cor, combustivel, foto)
+            except Exception:
+                # A alteração não foi gravada: descarta a foto recém-enviada
+                if foto:
+                    deletar_foto(foto)
+                raise
+            
+            # Deleta a foto antiga se existir e se for diferente da nova
+            if foto and foto_antiga and foto_antiga != foto:
+                deletar_foto(foto_antiga)
             flash("Veículo atualizado com sucesso!", "success")
             return redirect(url_for('listar_veiculos'))
         except ValueError as e:
@@ -194,22 +296,16 @@ def configure_routes(app):
     def excluir_veiculo(id):
         """Exclui um veículo"""
         try:
-            # Verifica se veículo tem vendas
-            if veiculo_model.veiculo_tem_vendas(id):
-                flash("Não é possível excluir veículo que já possui vendas associadas!", "error")
-                return redirect(url_for('listar_veiculos'))
-            
-            # Busca o veículo para pegar a foto
-            veiculo = veiculo_model.obter_veiculo(id)
-            
-            # Exclui veículo
-            veiculo_model.excluir_veiculo(id)
+            # Confere vendas e exclui na mesma transação; devolve a foto do veículo
+            foto = veiculo_model.excluir_veiculo(id)
             
             # Deleta a foto do veículo se existir
-            if veiculo and veiculo.get('foto'):
-                deletar_foto(veiculo['foto'])
+            if foto:
+                deletar_foto(foto)
             
             flash("Veículo excluído com sucesso!", "success")
+        except ValueError as e:
+            flash(str(e), "error")
         except Exception as e:
             flash(f"Erro ao excluir veículo: {str(e)}", "error")
         
@@ -1,5 +1,12 @@
-from flask import render_template, request, redirect, url_for, flash, session
-from models import venda_model, cliente_model, veiculo_model, funcionario_model
+from flask import render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import io
+import json
+import zlib
+from models import venda_model
+from infra.condicional import condicional
 
 
 def configure_routes(app):
@@ -27,26 +34,102 @@ def configure_routes(app):
     @app.route('/vendas')
     @funcionario_required
     def listar_vendas():
-        """Lista todas as vendas"""
-        vendas = venda_model.listar_vendas()
-        return render_template('vendas.html', vendas=vendas)
+        """Lista as vendas página a página"""
+        pagina = venda_model.listar_vendas_paginado(
+            request.args.get('apos'), request.args.get('antes'), request.args.get('por_pagina'))
+        return render_template('vendas.html', vendas=pagina['itens'], pagina=pagina)
+
+    def ler_periodo():
+        """Lê ?inicio= e ?fim= (AAAA-MM-DD); levanta ValueError se inválidos"""
+        datas = {}
+        for campo in ('inicio', 'fim'):
+            valor = request.args.get(campo, '').strip()
+            datas[campo] = datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+        return datas['inicio'], datas['fim']
+
+    def valor_exportavel(valor):
+        if isinstance(valor, (date, datetime)):
+            return valor.isoformat()
+        if isinstance(valor, Decimal):
+            return str(valor)
+        return valor
+
+    def linhas_csv(vendas, colunas, lote=500):
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(colunas)
+        for i, venda in enumerate(vendas, 1):
+            escritor.writerow([valor_exportavel(v) for v in venda])
+            if i % lote == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def linhas_ndjson(vendas, colunas):
+        for venda in vendas:
+            registro = {col: valor_exportavel(v) for col, v in zip(colunas, venda)}
+            yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+    def comprimir(partes):
+        # wbits=31: formato gzip, comprimido em fluxo sem acumular o arquivo
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for parte in partes:
+            dados = compressor.compress(parte.encode('utf-8'))
+            if dados:
+                yield dados
+        yield compressor.flush()
+
+    @app.route('/vendas/relatorio')
+    @funcionario_required
+    def relatorio_vendas():
+        """Relatório JSON: ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD&agrupar=marca,funcionario"""
+        try:
+            inicio, fim = ler_periodo()
+            agrupar = [c.strip() for c in request.args.get('agrupar', '').split(',') if c.strip()]
+            relatorio = venda_model.obter_relatorio_vendas(inicio, fim, agrupar)
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+        if relatorio is None:
+            return jsonify({'erro': 'Não foi possível gerar o relatório'}), 500
+        return jsonify(relatorio)
+
+    @app.route('/vendas/exportar')
+    @funcionario_required
+    def exportar_vendas():
+        """Exporta vendas em CSV ou NDJSON, em streaming: ?formato=csv|ndjson&inicio=&fim=&gzip=1"""
+        formato = request.args.get('formato', 'csv').lower()
+        if formato not in ('csv', 'ndjson'):
+            return jsonify({'erro': 'Formato deve ser csv ou ndjson'}), 400
+        try:
+            inicio, fim = ler_periodo()
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+        usar_gzip = request.args.get('gzip') in ('1', 'true', 'sim')
+
+        colunas = venda_model.COLUNAS_EXPORTACAO
+        vendas = venda_model.exportar_vendas(inicio, fim)
+        partes = linhas_csv(vendas, colunas) if formato == 'csv' else linhas_ndjson(vendas, colunas)
+        nome = f"vendas.{formato}"
+        mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+        if usar_gzip:
+            partes = comprimir(partes)
+            nome += '.gz'
+            mimetype = 'application/gzip'
+
+        resposta = Response(stream_with_context(partes), mimetype=mimetype)
+        resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+        resposta.headers['Cache-Control'] = 'no-store'
+        return resposta
 
     @app.route('/venda/nova')
     @funcionario_required
     def formulario_nova_venda():
         """Exibe formulário para nova venda"""
-        clientes = cliente_model.listar_clientes()
-        veiculos = veiculo_model.listar_veiculos_disponiveis()
-        funcionarios = funcionario_model.listar_funcionarios()
-        
-        # Obtém ID do funcionário logado
+        # Cliente e veículo são escolhidos pelo autocompletar (/clientes/busca e /veiculos/busca)
         funcionario_logado_id = session.get('user_id')
         
-        return render_template('form_venda.html', 
-                             clientes=clientes, 
-                             veiculos=veiculos, 
-                             funcionarios=funcionarios,
-                             funcionario_logado_id=funcionario_logado_id)
+        return render_template('form_venda.html', funcionario_logado_id=funcionario_logado_id)
 
     @app.route('/venda/nova', methods=['POST'])
     @funcionario_required
@@ -86,18 +169,10 @@ def configure_routes(app):
             flash("Venda não encontrada!", "error")
             return redirect(url_for('listar_vendas'))
         
-        clientes = cliente_model.listar_clientes()
-        # Para edição, precisa listar todos os veículos (incluindo os já vendidos)
-        veiculos = veiculo_model.listar_veiculos()
-        funcionarios = funcionario_model.listar_funcionarios()
-        
         funcionario_logado_id = session.get('user_id')
         
         return render_template('form_venda.html', 
                              venda=venda,
-                             clientes=clientes, 
-                             veiculos=veiculos, 
-                             funcionarios=funcionarios,
                              funcionario_logado_id=funcionario_logado_id)
 
     @app.route('/venda/editar/<int:id>', methods=['POST'])
@@ -142,6 +217,7 @@ def configure_routes(app):
 
     @app.route('/venda/detalhes/<int:id>')
     @funcionario_required
+    @condicional('veiculos', 'clientes', 'funcionarios', privado=True)
     def detalhes_venda(id):
         """Exibe detalhes de uma venda"""
         venda = venda_model.obter_venda(id)
@@ -0,0 +1,271 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from itertools import product
+
+from config import Config
+
+# Peso de cada campo na relevância
+PESOS = {'marca': 3, 'modelo': 3, 'ano': 2, 'cor': 1, 'combustivel': 1}
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+# Prefixos mais curtos casam quase todo o estoque; abaixo disso só termo exato
+MIN_PREFIXO = 3
+
+
+def normalizar(texto):
+    """Minúsculas sem acentos, quebrado em termos: 'Câmbio Automático' -> ['cambio', 'automatico']"""
+    if texto is None:
+        return []
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+    return [t for t in _SEPARADORES.split(sem_acentos) if t]
+
+
+class IndiceVeiculos:
+    """
+    Índice invertido em memória: termo -> {peso: conjunto de id_veiculo}.
+    Os ids ficam em conjuntos agrupados pelo peso para que a busca trabalhe com
+    interseções de conjuntos (feitas em C) em vez de somar pontos veículo a veículo;
+    cada conjunto também tem uma cópia ordenada, refeita só quando ele muda.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._termos_ordenados = []
+        self._termos_do_doc = {}
+        self._disponiveis = set()
+        self._listas = {}
+        self._lock = threading.RLock()
+        self.construido_em = None
+
+    def _termos(self, veiculo):
+        pesos = {}
+        for campo, peso in PESOS.items():
+            for termo in normalizar(veiculo.get(campo)):
+                pesos[termo] = pesos.get(termo, 0) + peso
+        return pesos
+
+    def _remover_sem_lock(self, id_veiculo):
+        for termo, peso in self._termos_do_doc.pop(id_veiculo, ()):
+            por_peso = self._postings.get(termo)
+            if por_peso is None:
+                continue
+            ids = por_peso.get(peso)
+            self._listas.pop((termo, peso), None)
+            if ids is not None:
+                ids.discard(id_veiculo)
+                if not ids:
+                    del por_peso[peso]
+            if not por_peso:
+                del self._postings[termo]
+                i = bisect_left(self._termos_ordenados, termo)
+                if i < len(self._termos_ordenados) and self._termos_ordenados[i] == termo:
+                    del self._termos_ordenados[i]
+        self._disponiveis.discard(id_veiculo)
+
+    def indexar(self, veiculo):
+        """Adiciona ou substitui um veículo (dict com id_veiculo, marca, modelo, ano, cor, combustivel, disponivel)"""
+        id_veiculo = veiculo['id_veiculo']
+        pesos = self._termos(veiculo)
+        with self._lock:
+            self._remover_sem_lock(id_veiculo)
+            for termo, peso in pesos.items():
+                por_peso = self._postings.get(termo)
+                if por_peso is None:
+                    por_peso = self._postings[termo] = {}
+                    i = bisect_left(self._termos_ordenados, termo)
+                    self._termos_ordenados.insert(i, termo)
+                por_peso.setdefault(peso, set()).add(id_veiculo)
+                self._listas.pop((termo, peso), None)
+            self._termos_do_doc[id_veiculo] = tuple(pesos.items())
+            if veiculo.get('disponivel', True):
+                self._disponiveis.add(id_veiculo)
+
+    def remover(self, id_veiculo):
+        with self._lock:
+            self._remover_sem_lock(id_veiculo)
+
+    def marcar_disponivel(self, id_veiculo, disponivel):
+        with self._lock:
+            if id_veiculo not in self._termos_do_doc:
+                return
+            if disponivel:
+                self._disponiveis.add(id_veiculo)
+            else:
+                self._disponiveis.discard(id_veiculo)
+
+    def carregar(self, veiculos):
+        """Substitui todo o conteúdo do índice"""
+        novo = IndiceVeiculos()
+        for veiculo in veiculos:
+            novo.indexar(veiculo)
+        with self._lock:
+            self._postings = novo._postings
+            self._termos_ordenados = novo._termos_ordenados
+            self._termos_do_doc = novo._termos_do_doc
+            self._disponiveis = novo._disponiveis
+            self._listas = {}
+            self.construido_em = time.monotonic()
+
+    def _lista(self, chave):
+        """Ids de (termo, peso) em ordem crescente"""
+        lista = self._listas.get(chave)
+        if lista is None:
+            termo, peso = chave
+            lista = self._listas[chave] = sorted(self._postings[termo][peso])
+        return lista
+
+    def _faixas(self, termo):
+        """
+        Faixas de pontuação de um termo da consulta: [(pontos, [(termo, peso), ...]), ...]
+        do maior para o menor. Casamento exato vale o dobro do prefixo; quando o
+        prefixo casa vários termos do mesmo veículo vale o melhor deles.
+        """
+        faixas = {}
+        i = bisect_left(self._termos_ordenados, termo)
+        while i < len(self._termos_ordenados) and self._termos_ordenados[i].startswith(termo):
+            candidato = self._termos_ordenados[i]
+            fator = 2 if candidato == termo else 1
+            if fator == 1 and len(termo) < MIN_PREFIXO:
+                break
+            for peso in self._postings[candidato]:
+                faixas.setdefault(peso * fator, []).append((candidato, peso))
+            i += 1
+        return sorted(faixas.items(), reverse=True)
+
+    def _conjunto(self, chaves):
+        if len(chaves) == 1:
+            termo, peso = chaves[0]
+            return self._postings[termo][peso]
+        return set().union(*(self._postings[termo][peso] for termo, peso in chaves))
+
+    def _buscar_um_termo(self, faixas, limite, disponiveis):
+        """Um só termo: percorre as listas ordenadas e para assim que completar o limite"""
+        resultado, vistos = [], set()
+        for _, chaves in faixas:
+            anterior = None
+            for id_veiculo in heapq.merge(*(self._lista(chave) for chave in chaves)):
+                if id_veiculo == anterior or id_veiculo in vistos:
+                    continue
+                anterior = id_veiculo
+                if disponiveis is not None and id_veiculo not in disponiveis:
+                    continue
+                resultado.append(id_veiculo)
+                if len(resultado) >= limite:
+                    return resultado
+            vistos.update(self._conjunto(chaves))
+        return resultado
+
+    def _buscar_varios_termos(self, todas_faixas, limite, disponiveis):
+        """Vários termos: interseção das faixas, combinação a combinação"""
+        # Combinações de faixas em ordem decrescente de pontuação total; um
+        # veículo aparece primeiro na combinação das suas melhores faixas
+        por_total = {}
+        for combinacao in product(*todas_faixas):
+            total = sum(pontos for pontos, _ in combinacao)
+            por_total.setdefault(total, []).append([self._conjunto(chaves) for _, chaves in combinacao])
+
+        resultado, vistos = [], set()
+        for total in sorted(por_total, reverse=True):
+            grupo = set()
+            for conjuntos in por_total[total]:
+                conjuntos.sort(key=len)
+                if disponiveis is not None:
+                    conjuntos.append(disponiveis)
+                grupo |= conjuntos[0].intersection(*conjuntos[1:])
+            if vistos:
+                grupo -= vistos
+            if not grupo:
+                continue
+            vistos |= grupo
+            # Empate de pontuação: ids menores (mais antigos) primeiro
+            resultado.extend(sorted(grupo)[:limite - len(resultado)])
+            if len(resultado) >= limite:
+                break
+        return resultado
+
+    def buscar(self, consulta, limite=50, somente_disponiveis=True):
+        """Retorna os ids dos veículos que casam com todos os termos, do mais relevante ao menos"""
+        termos = normalizar(consulta)
+        if not termos:
+            return []
+        with self._lock:
+            todas_faixas = []
+            for termo in set(termos):
+                faixas = self._faixas(termo)
+                if not faixas:
+                    return []
+                todas_faixas.append(faixas)
+            disponiveis = self._disponiveis if somente_disponiveis else None
+            if len(todas_faixas) == 1:
+                return self._buscar_um_termo(todas_faixas[0], limite, disponiveis)
+            return self._buscar_varios_termos(todas_faixas, limite, disponiveis)
+
+
+indice = IndiceVeiculos()
+_construcao_lock = threading.Lock()
+
+
+def reconstruir():
+    """Recarrega o índice inteiro a partir do banco"""
+    from models import veiculo_model
+    with _construcao_lock:
+        veiculos = veiculo_model.listar_veiculos_para_indice()
+        if veiculos is None:
+            return False
+        indice.carregar(veiculos)
+        return True
+
+
+def reconstruir_em_segundo_plano():
+    def tarefa():
+        try:
+            reconstruir()
+        except Exception as e:
+            print(f"Erro ao reconstruir índice de busca: {e}")
+    threading.Thread(target=tarefa, name='indice-busca', daemon=True).start()
+
+
+def buscar(consulta, limite=50, somente_disponiveis=True):
+    """Busca no índice, construindo-o se ainda não existir e renovando-o se estiver velho"""
+    if indice.construido_em is None:
+        reconstruir()
+    elif Config.SEARCH_INDEX_REFRESH and time.monotonic() - indice.construido_em > Config.SEARCH_INDEX_REFRESH:
+        # Outros workers também escrevem: renova periodicamente sem travar a busca
+        indice.construido_em = time.monotonic()
+        reconstruir_em_segundo_plano()
+    return indice.buscar(consulta, limite, somente_disponiveis)
+
+
+def reindexar_veiculo(id_veiculo):
+    """Relê um veículo do banco e atualiza o índice (após cadastro/edição)"""
+    if indice.construido_em is None:
+        return
+    from models import veiculo_model
+    veiculo = veiculo_model.obter_veiculo(id_veiculo)
+    if veiculo:
+        indice.indexar(veiculo)
+    else:
+        indice.remover(id_veiculo)
+
+
+def indexar_veiculo(veiculo):
+    if indice.construido_em is not None:
+        indice.indexar(veiculo)
+
+
+def remover_veiculo(id_veiculo):
+    indice.remover(id_veiculo)
+
+
+def marcar_disponivel(id_veiculo, disponivel):
+    indice.marcar_disponivel(id_veiculo, disponivel)
+
+
+def init_app(app):
+    """Constrói o índice na inicialização, em segundo plano"""
+    if Config.SEARCH_INDEX_ON_STARTUP:
+        reconstruir_em_segundo_plano()
@@ -0,0 +1,212 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, get_flashed_messages, make_response
+
+from config import Config
+from infra import metricas, condicional
+
+
+class EntradaCache:
+    """HTML renderizado de uma página, já acompanhado da versão gzip"""
+
+    __slots__ = ('html', 'gzip', 'criada_em')
+
+    def __init__(self, html):
+        self.html = html.encode('utf-8')
+        self.gzip = gzip.compress(self.html, compresslevel=6)
+        self.criada_em = time.monotonic()
+
+
+class _Voo:
+    """Renderização em andamento; quem chega depois espera por ela"""
+
+    __slots__ = ('evento', 'entrada')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.entrada = None
+
+
+class CachePaginas:
+    """Cache LRU em memória de páginas inteiras, com single-flight e invalidação por grupo"""
+
+    def __init__(self, ttl=300, max_itens=256):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._voos = {}
+        self._geracoes = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def _valida(self, entrada):
+        return entrada is not None and (not self.ttl or time.monotonic() - entrada.criada_em < self.ttl)
+
+    def _guardar(self, chave, entrada):
+        # Chamado com self._lock já adquirido
+        self._itens[chave] = entrada
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def obter(self, grupo, chave):
+        """Entrada válida para `chave` (ou None) e a geração atual do grupo, sem esperar renderizações"""
+        with self._lock:
+            entrada = self._itens.get(chave)
+            acertou = self._valida(entrada)
+            if acertou:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+            else:
+                self.falhas += 1
+            geracao = self._geracoes.get(grupo, 0)
+        metricas.registrar_cache('paginas', acertou)
+        return (entrada if acertou else None), geracao
+
+    def guardar(self, grupo, chave, html, geracao):
+        """Guarda o HTML renderizado, a não ser que o grupo tenha sido invalidado desde `geracao`"""
+        entrada = EntradaCache(html)
+        with self._lock:
+            if self._geracoes.get(grupo, 0) == geracao:
+                self._guardar(chave, entrada)
+        return entrada
+
+    def obter_ou_renderizar(self, grupo, chave, renderizar):
+        """
+        Devolve a entrada em cache para `chave` ou chama `renderizar()` uma única
+        vez, mesmo com várias threads pedindo a mesma página ao mesmo tempo.
+        `renderizar` retorna o HTML ou None quando o resultado não deve ir para o cache.
+        """
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if self._valida(entrada):
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                metricas.registrar_cache('paginas', True)
+                return entrada
+            self.falhas += 1
+            metricas.registrar_cache('paginas', False)
+            voo = self._voos.get(chave)
+            dono = voo is None
+            if dono:
+                voo = self._voos[chave] = _Voo()
+            geracao = self._geracoes.get(grupo, 0)
+
+        if not dono:
+            voo.evento.wait()
+            if voo.entrada is not None:
+                return voo.entrada
+            # O dono não pôde usar o cache (erro ou mensagem flash); renderiza sozinho
+            html = renderizar()
+            return EntradaCache(html) if isinstance(html, str) else html
+
+        try:
+            html = renderizar()
+            if not isinstance(html, str):
+                return html
+            entrada = EntradaCache(html)
+            with self._lock:
+                # Se houve invalidação durante a renderização o resultado já nasceu velho
+                if self._geracoes.get(grupo, 0) == geracao:
+                    self._guardar(chave, entrada)
+                    voo.entrada = entrada
+            return entrada
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.evento.set()
+
+    def invalidar(self, grupo):
+        """Descarta todas as páginas do grupo (chamado pelos models após escrever)"""
+        with self._lock:
+            self._geracoes[grupo] = self._geracoes.get(grupo, 0) + 1
+            for chave in [c for c in self._itens if c[0] == grupo]:
+                del self._itens[chave]
+
+    def estatisticas(self):
+        with self._lock:
+            return {'itens': len(self._itens), 'acertos': self.acertos, 'falhas': self.falhas}
+
+
+cache = CachePaginas(ttl=Config.PAGE_CACHE_TTL, max_itens=Config.PAGE_CACHE_MAX_ITENS)
+
+CATALOGO = 'catalogo'
+
+# Tabelas de cada grupo: as versões delas (versoes_tabelas, comuns a todos os
+# workers) entram na chave, então uma escrita em qualquer worker faz as páginas
+# dos outros deixarem de valer assim que eles relerem os marcadores
+TABELAS_GRUPOS = {CATALOGO: ('veiculos',)}
+
+
+def invalidar_catalogo():
+    """Descarta já as páginas deste worker; os outros percebem pela versão de veículos"""
+    cache.invalidar(CATALOGO)
+
+
+def _responder(entrada):
+    aceita_gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+    resposta = make_response(entrada.gzip if aceita_gzip else entrada.html)
+    resposta.content_type = 'text/html; charset=utf-8'
+    if aceita_gzip:
+        resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.vary.add('Accept-Encoding')
+    resposta.vary.add('Cookie')
+    return resposta
+
+
+def _chave(grupo, versoes):
+    marcas = None if versoes is None else tuple(
+        versoes.get(tabela, (0, 0.0))[0] for tabela in TABELAS_GRUPOS.get(grupo, ()))
+    return (grupo, request.endpoint, request.query_string,
+            session.get('user_tipo'), session.get('user_nome', ''), session.get('user_cargo', ''), marcas)
+
+
+def pagina_em_cache(grupo):
+    """Decorator: guarda o HTML da view por rota, query string, estado de login e versão das tabelas"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Mensagens flash pendentes são consumidas pela renderização: não cacheia
+            if not Config.PAGE_CACHE_ENABLED or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            chave = _chave(grupo, condicional.versoes())
+
+            def renderizar():
+                html = f(*args, **kwargs)
+                if isinstance(html, str) and get_flashed_messages():
+                    return make_response(html)
+                return html
+
+            resultado = cache.obter_ou_renderizar(grupo, chave, renderizar)
+            if isinstance(resultado, EntradaCache):
+                return _responder(resultado)
+            return resultado
+        return wrapper
+    return decorator
+
+
+async def pagina_em_cache_async(grupo, renderizar):
+    """
+    Equivalente ao pagina_em_cache para views async (asgi.py), com a mesma chave:
+    as duas formas de servir compartilham as entradas. Não tem single-flight,
+    que bloquearia o event loop esperando outra renderização.
+    """
+    if not Config.PAGE_CACHE_ENABLED or session.get('_flashes'):
+        return await renderizar()
+
+    chave = _chave(grupo, await condicional.versoes_async())
+    entrada, geracao = cache.obter(grupo, chave)
+    if entrada is None:
+        html = await renderizar()
+        if not isinstance(html, str):
+            return html
+        if get_flashed_messages():
+            return make_response(html)
+        entrada = cache.guardar(grupo, chave, html, geracao)
+    return _responder(entrada)
@@ -0,0 +1,176 @@
+"""
+GET condicional (ETag / Last-Modified / 304) das páginas que só mudam quando
+as tabelas mudam. Os models avançam um marcador de versão por tabela
+(versoes_tabelas) com versao_model.tocar_versao(), logo depois do commit de cada
+escrita. Cada worker guarda os marcadores por CONDITIONAL_VERSION_TTL segundos (o
+que fez a escrita os esquece na hora, com esquecer_versoes()), então a conferência do
+If-None-Match / If-Modified-Since acontece antes de qualquer consulta da página
+e de qualquer renderização.
+"""
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import request, session, make_response
+
+from config import Config
+from infra import metricas, pool_async, estaticos
+from models import versao_model
+
+PASTAS_CODIGO = ('views/templates', 'views/static')
+
+_versoes = None
+_lidas_em = 0.0
+_lock = threading.Lock()
+_codigo = ''
+_codigo_em = 0.0
+
+respostas_304 = metricas.contador('http_not_modified_total', 'Respostas 304 do GET condicional', ('endpoint',))
+
+
+def _em_cache():
+    with _lock:
+        if _versoes is not None and time.monotonic() - _lidas_em < Config.CONDITIONAL_VERSION_TTL:
+            return _versoes
+    return None
+
+
+def _lembrar(versoes):
+    global _versoes, _lidas_em
+    if versoes is not None:
+        with _lock:
+            _versoes, _lidas_em = versoes, time.monotonic()
+    return versoes
+
+
+def versoes():
+    """Marcadores das tabelas (do cache do worker ou do banco); None se indisponíveis"""
+    return _em_cache() or _lembrar(versao_model.obter_versoes())
+
+
+async def versoes_async():
+    """Mesmo que versoes() para o modo async, lendo pelo pool do aiomysql"""
+    em_cache = _em_cache()
+    if em_cache is not None:
+        return em_cache
+    try:
+        linhas = await pool_async.consultar(versao_model.SQL_VERSOES, tipo=versao_model.Versao)
+    except Exception as e:
+        print(f"Erro ao obter versões das tabelas: {e}")
+        return None
+    return _lembrar(versao_model.montar_versoes(linhas))
+
+
+def esquecer_versoes():
+    """Força a releitura dos marcadores (chamado pelos models após o commit de uma escrita)"""
+    global _versoes
+    with _lock:
+        _versoes = None
+
+
+def validadores(tabelas, versoes):
+    """
+    (etag, última modificação) da página atual: mudam com as versões das tabelas,
+    a rota e query string, o usuário logado e o código (templates e estáticos).
+    None quando a página não deve ser condicional.
+    """
+    if not Config.CONDITIONAL_GET_ENABLED or versoes is None or session.get('_flashes'):
+        return None
+    partes = [_codigo, request.path, request.query_string.decode('latin-1'),
+              str(session.get('user_id', '')), session.get('user_tipo') or '',
+              session.get('user_nome', ''), session.get('user_cargo', '')]
+    modificado = _codigo_em
+    for tabela in tabelas:
+        versao, atualizado_em = versoes.get(tabela, (0, 0.0))
+        partes.append(f"{tabela}={versao}")
+        modificado = max(modificado, atualizado_em)
+    etag = hashlib.sha256('\0'.join(partes).encode('utf-8')).hexdigest()[:32]
+    return etag, modificado
+
+
+def _cabecalhos(resposta, etag, modificado, privado):
+    resposta.set_etag(etag)
+    resposta.last_modified = int(modificado)
+    # no-cache: o navegador/proxy guarda, mas sempre revalida com o ETag
+    resposta.headers['Cache-Control'] = 'private, no-cache' if privado else 'no-cache'
+    resposta.vary.add('Cookie')
+    return resposta
+
+
+def nao_modificado(etag, modificado, privado=False):
+    """Resposta 304 se o cliente já tem esta versão da página, senão None"""
+    if request.if_none_match:
+        # A variante gzip tem ETag próprio; qualquer uma das duas continua válida
+        atual = request.if_none_match.contains_weak(etag) or request.if_none_match.contains_weak(f"{etag}-gzip")
+    elif request.if_modified_since:
+        atual = int(modificado) <= request.if_modified_since.timestamp()
+    else:
+        atual = False
+    if not atual:
+        return None
+    respostas_304.inc(request.endpoint or '')
+    return _cabecalhos(make_response('', 304), etag, modificado, privado)
+
+
+def aplicar(resposta, etag, modificado, privado=False):
+    """Acrescenta ETag forte e Last-Modified a uma resposta 200 da página"""
+    # Páginas que mexeram na sessão (ex.: exibiram uma mensagem flash) não se repetem
+    if resposta.status_code != 200 or session.modified:
+        return resposta
+    sufixo = '-gzip' if resposta.headers.get('Content-Encoding') == 'gzip' else ''
+    return _cabecalhos(resposta, etag + sufixo, modificado, privado)
+
+
+def condicional(*tabelas, privado=False):
+    """Decorator: responde 304 sem executar a view se as tabelas não mudaram desde a cópia do cliente"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            marcas = validadores(tabelas, versoes())
+            if marcas is None:
+                return f(*args, **kwargs)
+            resposta = nao_modificado(*marcas, privado)
+            if resposta is not None:
+                return resposta
+            return aplicar(make_response(f(*args, **kwargs)), *marcas, privado)
+        return wrapper
+    return decorator
+
+
+async def condicional_async(tabelas, renderizar, privado=False):
+    """Equivalente ao decorator condicional para as views async (asgi.py)"""
+    marcas = validadores(tabelas, await versoes_async())
+    if marcas is None:
+        return await renderizar()
+    resposta = nao_modificado(*marcas, privado)
+    if resposta is not None:
+        return resposta
+    return aplicar(make_response(await renderizar()), *marcas, privado)
+
+
+def _assinatura_codigo(pastas):
+    """Hash e data mais recente dos templates e estáticos (as fotos enviadas não contam; os logos sim)"""
+    resumo = hashlib.sha256()
+    mais_recente = 0.0
+    for pasta in pastas:
+        for raiz, dirs, arquivos in os.walk(pasta):
+            dirs.sort()
+            for nome in sorted(arquivos):
+                caminho = os.path.join(raiz, nome)
+                if estaticos.foto_enviada(os.path.relpath(caminho, pasta).replace('\\', '/')):
+                    continue
+                try:
+                    with open(caminho, 'rb') as f:
+                        resumo.update(caminho.encode('utf-8') + b'\0' + f.read())
+                    mais_recente = max(mais_recente, os.path.getmtime(caminho))
+                except OSError:
+                    continue
+    return resumo.hexdigest()[:16], mais_recente
+
+
+def init_app(app):
+    """Calcula a assinatura do código: um deploy novo muda todos os ETags"""
+    global _codigo, _codigo_em
+    _codigo, _codigo_em = _assinatura_codigo(PASTAS_CODIGO)
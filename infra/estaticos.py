@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import request, send_file, make_response, abort
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele servimos apenas gzip
+    brotli = None
+
+# Tipos que valem a pena comprimir (imagens já vêm comprimidas)
+COMPRIMIVEIS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.ico'}
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Só os arquivos da aplicação são versionados (inclusive os logos em uploads/); as fotos
+# enviadas, com o prefixo de timestamp do cadastro (e suas variantes), seguem o caminho padrão
+EXTENSOES_ATIVOS = {'.css', '.js', '.svg', '.ico', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2'}
+FOTO_ENVIADA = re.compile(r'^uploads/\d+_')
+
+
+def foto_enviada(relativo):
+    """True para as fotos de veículos enviadas pelos usuários (uploads/<timestamp>_nome)"""
+    return FOTO_ENVIADA.match(relativo) is not None
+
+
+class Ativo:
+    """Arquivo estático com nome versionado pelo conteúdo e variantes pré-comprimidas"""
+
+    __slots__ = ('original', 'nome_hash', 'caminho', 'hash', 'mimetype', 'variantes')
+
+    def __init__(self, pasta, original):
+        self.original = original
+        self.caminho = os.path.join(pasta, original)
+        with open(self.caminho, 'rb') as f:
+            conteudo = f.read()
+        self.hash = hashlib.sha256(conteudo).hexdigest()[:12]
+        base, ext = os.path.splitext(original)
+        self.nome_hash = f"{base}.{self.hash}{ext}"
+        self.mimetype = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+        self.variantes = {}
+        if ext.lower() in COMPRIMIVEIS:
+            if brotli is not None:
+                self.variantes['br'] = brotli.compress(conteudo, quality=11)
+            self.variantes['gzip'] = gzip.compress(conteudo, compresslevel=9)
+
+
+class Manifesto:
+    """Mapeia nomes originais <-> nomes versionados dos ativos da pasta static (sem as fotos enviadas)"""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.por_original = {}
+        self.por_hash = {}
+
+    def construir(self):
+        for raiz, dirs, arquivos in os.walk(self.pasta):
+            for nome in arquivos:
+                if os.path.splitext(nome)[1].lower() not in EXTENSOES_ATIVOS:
+                    continue
+                relativo = os.path.relpath(os.path.join(raiz, nome), self.pasta).replace('\\', '/')
+                if not foto_enviada(relativo):
+                    self.adicionar(relativo)
+        return self
+
+    def adicionar(self, relativo):
+        try:
+            ativo = Ativo(self.pasta, relativo)
+        except OSError:
+            return None
+        self.por_original[relativo] = ativo
+        self.por_hash[ativo.nome_hash] = ativo
+        return ativo
+
+
+def _escolher_codificacao(ativo):
+    aceitas = request.accept_encodings
+    for codificacao in ('br', 'gzip'):
+        if codificacao in ativo.variantes and aceitas[codificacao]:
+            return codificacao
+    return None
+
+
+def _servir(ativo):
+    codificacao = _escolher_codificacao(ativo)
+    etag = f"{ativo.hash}-{codificacao}" if codificacao else ativo.hash
+    if request.if_none_match.contains(etag):
+        resposta = make_response('', 304)
+    elif codificacao:
+        resposta = make_response(ativo.variantes[codificacao])
+        resposta.content_type = ativo.mimetype
+        resposta.headers['Content-Encoding'] = codificacao
+    else:
+        if not os.path.exists(ativo.caminho):
+            abort(404)
+        resposta = send_file(ativo.caminho, mimetype=ativo.mimetype, conditional=True, etag=False)
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+    if ativo.variantes:
+        resposta.vary.add('Accept-Encoding')
+    return resposta
+
+
+def init_app(app):
+    """
+    Gera o manifesto na inicialização e passa a reescrever url_for('static', ...)
+    para o nome versionado, servindo-o com cache imutável de um ano.
+    """
+    if not Config.STATIC_FINGERPRINT:
+        return None
+    manifesto = Manifesto(app.static_folder).construir()
+    servir_original = app.view_functions['static']
+
+    @app.url_defaults
+    def versionar_estaticos(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            ativo = manifesto.por_original.get(values['filename'])
+            if ativo is not None:
+                values['filename'] = ativo.nome_hash
+
+    def static(filename):
+        ativo = manifesto.por_hash.get(filename)
+        if ativo is None:
+            # Arquivos enviados depois da inicialização (fotos) seguem o caminho padrão
+            return servir_original(filename=filename)
+        return _servir(ativo)
+
+    app.view_functions['static'] = static
+    return manifesto
@@ -0,0 +1,71 @@
+"""
+Cache de fragmentos: o HTML de cada cartão de veículo fica guardado por
+id_veiculo e só é renderizado de novo quando a versão da linha muda (os models
+avançam veiculos.versao em toda escrita) ou quando as variantes da foto ficam
+prontas. Num catálogo de 500 carros, só os cartões alterados passam pelo Jinja.
+"""
+import threading
+from collections import OrderedDict
+
+from flask import render_template
+from markupsafe import Markup
+
+from config import Config
+from infra import imagens, metricas
+
+
+class CacheFragmentos:
+    """LRU em memória de fragmentos HTML; cada chave guarda só a assinatura mais recente"""
+
+    def __init__(self, max_itens=5000):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # chave -> (assinatura, html)
+        self._lock = threading.Lock()
+
+    def obter(self, chave, assinatura):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] != assinatura:
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def guardar(self, chave, assinatura, html):
+        with self._lock:
+            self._itens[chave] = (assinatura, html)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def __len__(self):
+        return len(self._itens)
+
+
+cache = CacheFragmentos(Config.FRAGMENT_CACHE_MAX_ITENS)
+
+
+def _renderizar_cartao(veiculo, gerenciar):
+    return Markup(render_template('_cartao_veiculo.html', veiculo=veiculo, gerenciar=gerenciar))
+
+
+def cartao_veiculo(veiculo, gerenciar=False):
+    """HTML do cartão do veículo (global das templates), do cache se a linha não mudou"""
+    gerenciar = bool(gerenciar)
+    versao = veiculo.get('versao')
+    if not Config.FRAGMENT_CACHE_ENABLED or versao is None:
+        return _renderizar_cartao(veiculo, gerenciar)
+
+    chave = (veiculo['id_veiculo'], gerenciar)
+    # O cartão muda sozinho quando as variantes da foto ficam prontas (srcset)
+    assinatura = (versao, bool(veiculo['foto']) and imagens.derivados_prontos(veiculo['foto']))
+    html = cache.obter(chave, assinatura)
+    metricas.registrar_cache('fragmentos', html is not None)
+    if html is None:
+        html = _renderizar_cartao(veiculo, gerenciar)
+        cache.guardar(chave, assinatura, html)
+    return html
+
+
+def init_app(app):
+    app.jinja_env.globals['cartao_veiculo'] = cartao_veiculo
+    metricas.medidor('fragment_cache_items', 'Cartões de veículo no cache de fragmentos', lambda: len(cache))
@@ -0,0 +1,149 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import url_for
+
+from config import Config
+from infra.cache_paginas import invalidar_catalogo
+from infra import condicional
+from models import versao_model
+
+# Larguras (px) geradas para cada foto; a altura acompanha a proporção original
+VARIANTES = {
+    'thumb': 240,
+    'card': 640,
+    'full': 1280,
+}
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = ThreadPoolExecutor(max_workers=Config.IMAGE_WORKERS, thread_name_prefix='imagens')
+_existentes = {}
+_existentes_lock = threading.Lock()
+
+
+def caminho_derivado(foto_path, variante, formato):
+    """views/static/uploads/123_civic.png -> views/static/uploads/123_civic.card.webp"""
+    base, _ = os.path.splitext(foto_path)
+    return f"{base}.{variante}.{formato}"
+
+
+def gerar_derivados(foto_path):
+    """Gera todas as variantes (WebP e JPEG) de uma foto já salva em disco"""
+    from PIL import Image, ImageOps
+
+    with Image.open(foto_path) as original:
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode not in ('RGB', 'RGBA'):
+            imagem = imagem.convert('RGBA' if 'transparency' in imagem.info else 'RGB')
+
+        for variante, largura in VARIANTES.items():
+            copia = imagem.copy()
+            # thumbnail nunca amplia: fotos pequenas ficam com o tamanho original
+            copia.thumbnail((largura, largura * 4), Image.LANCZOS)
+            for formato, (formato_pil, opcoes) in FORMATOS.items():
+                destino = caminho_derivado(foto_path, variante, formato)
+                saida = copia
+                if formato_pil == 'JPEG' and saida.mode == 'RGBA':
+                    # JPEG não tem transparência: compõe sobre fundo branco
+                    fundo = Image.new('RGB', saida.size, (255, 255, 255))
+                    fundo.paste(saida, mask=saida.split()[3])
+                    saida = fundo
+                temporario = destino + '.tmp'
+                saida.save(temporario, formato_pil, **opcoes)
+                os.replace(temporario, destino)
+
+    with _existentes_lock:
+        _existentes.pop(foto_path, None)
+    # Páginas em cache (e as cópias dos navegadores) ainda apontam para a foto original
+    invalidar_catalogo()
+    versao_model.tocar_versao('veiculos')
+    condicional.esquecer_versoes()
+
+
+def _processar(foto_path):
+    try:
+        gerar_derivados(foto_path)
+    except Exception as e:
+        print(f"Erro ao gerar variantes da foto {foto_path}: {e}")
+
+
+def agendar_derivados(foto_path):
+    """Enfileira a geração das variantes fora da thread da requisição"""
+    if foto_path:
+        return _executor.submit(_processar, foto_path)
+
+
+def remover_derivados(foto_path):
+    """Apaga as variantes geradas de uma foto"""
+    for variante in VARIANTES:
+        for formato in FORMATOS:
+            caminho = caminho_derivado(foto_path, variante, formato)
+            if os.path.exists(caminho):
+                try:
+                    os.remove(caminho)
+                except Exception as e:
+                    print(f"Erro ao deletar variante da foto: {e}")
+    with _existentes_lock:
+        _existentes.pop(foto_path, None)
+
+
+def derivados_prontos(foto_path):
+    """Indica (com cache) se todas as variantes da foto já existem em disco"""
+    with _existentes_lock:
+        pronto = _existentes.get(foto_path)
+    if pronto:
+        return True
+    pronto = all(
+        os.path.exists(caminho_derivado(foto_path, variante, formato))
+        for variante in VARIANTES for formato in FORMATOS
+    )
+    if pronto:
+        with _existentes_lock:
+            _existentes[foto_path] = True
+    return pronto
+
+
+def _url(caminho):
+    return url_for('static', filename=caminho.replace('views/static/', ''))
+
+
+def imagem_responsiva(foto_path):
+    """
+    Dados para o <picture> de um veículo: srcset WebP/JPEG e src de fallback.
+    Enquanto as variantes não ficam prontas, usa apenas a foto original.
+    """
+    if not foto_path:
+        return None
+    if not derivados_prontos(foto_path):
+        return {'src': _url(foto_path), 'webp': None, 'jpg': None}
+
+    def srcset(formato):
+        return ', '.join(
+            f"{_url(caminho_derivado(foto_path, variante, formato))} {largura}w"
+            for variante, largura in VARIANTES.items()
+        )
+
+    return {
+        'src': _url(caminho_derivado(foto_path, 'card', 'jpg')),
+        'webp': srcset('webp'),
+        'jpg': srcset('jpg'),
+    }
+
+
+def init_app(app):
+    app.jinja_env.globals['imagem_responsiva'] = imagem_responsiva
+
+
+if __name__ == '__main__':
+    # Gera as variantes das fotos já existentes: python -m infra.imagens
+    pasta = 'views/static/uploads'
+    for nome in sorted(os.listdir(pasta)):
+        caminho = f"{pasta}/{nome}"
+        if nome.startswith('logo') or nome.count('.') != 1:
+            continue
+        print(f"Gerando variantes de {caminho}")
+        _processar(caminho)
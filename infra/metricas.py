@@ -0,0 +1,417 @@
+import atexit
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request, session, Response, abort
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # sem fcntl (Windows) não há vários workers gunicorn: a trava é dispensável
+    fcntl = None
+
+# Limites (segundos) dos buckets dos histogramas de latência
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_RAPIDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PREFIXO = 'scriptcars_'
+
+
+class Contador:
+    """Contador monotônico com rótulos"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def amostras(self):
+        with self._lock:
+            return [[list(r), v] for r, v in self._valores.items()]
+
+
+class Histograma:
+    """Histograma com buckets fixos; guarda contagens por bucket, soma e total"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            dados = self._valores.get(rotulos)
+            if dados is None:
+                # [contagem por bucket..., +Inf, soma]
+                dados = self._valores[rotulos] = [0] * (len(self.buckets) + 1) + [0.0]
+            dados[i] += 1
+            dados[-1] += valor
+
+    def amostras(self):
+        with self._lock:
+            return [[list(r), list(d)] for r, d in self._valores.items()]
+
+
+class Medidor:
+    """Valor instantâneo lido de uma função no momento da coleta"""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, funcao):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, ()
+        self._funcao = funcao
+
+    def amostras(self):
+        try:
+            return [[[], float(self._funcao())]]
+        except Exception:
+            return []
+
+
+_registro = {}
+_registro_lock = threading.Lock()
+
+
+def _registrar(metrica):
+    with _registro_lock:
+        return _registro.setdefault(metrica.nome, metrica)
+
+
+def contador(nome, ajuda, rotulos=()):
+    return _registrar(Contador(PREFIXO + nome, ajuda, rotulos))
+
+
+def histograma(nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+    return _registrar(Histograma(PREFIXO + nome, ajuda, rotulos, buckets))
+
+
+def medidor(nome, ajuda, funcao):
+    return _registrar(Medidor(PREFIXO + nome, ajuda, funcao))
+
+
+# ========== MÉTRICAS DA APLICAÇÃO ==========
+
+requisicoes = histograma('http_request_duration_seconds', 'Latência das requisições por endpoint',
+                         ('endpoint', 'method', 'status'))
+consultas = histograma('db_query_duration_seconds', 'Duração das consultas SQL por função de model',
+                       ('funcao',), BUCKETS_RAPIDOS)
+erros_consulta = contador('db_query_errors_total', 'Consultas SQL que levantaram erro', ('funcao',))
+espera_pool = histograma('db_pool_checkout_wait_seconds', 'Espera para obter conexão do pool', (), BUCKETS_RAPIDOS)
+timeouts_pool = contador('db_pool_timeouts_total', 'Checkouts que desistiram por pool esgotado')
+bcrypt = histograma('bcrypt_duration_seconds', 'Tempo de cada hash/verificação bcrypt', ('operacao',))
+bcrypt_recusados = contador('bcrypt_rejected_total', 'Operações bcrypt recusadas por fila cheia')
+cache = contador('cache_requests_total', 'Consultas a caches por resultado (acerto/falha)', ('cache', 'resultado'))
+
+
+def registrar_cache(nome, acertou):
+    cache.inc(nome, 'acerto' if acertou else 'falha')
+
+
+def funcao_model():
+    """Nome 'modulo.funcao' do primeiro frame da pilha que pertence a models.*"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get('__name__', '')
+        if modulo.startswith('models.'):
+            return f"{modulo[7:]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'outros'
+
+
+# ========== AGREGAÇÃO ENTRE WORKERS ==========
+
+def coletar():
+    """Foto das métricas deste processo em formato serializável"""
+    with _registro_lock:
+        metricas = list(_registro.values())
+    return {
+        m.nome: {
+            'tipo': m.tipo,
+            'ajuda': m.ajuda,
+            'rotulos': list(m.rotulos),
+            'buckets': list(getattr(m, 'buckets', ())),
+            'amostras': m.amostras(),
+        }
+        for m in metricas
+    }
+
+
+# Contadores e histogramas dos workers encerrados: somados aqui antes de o arquivo
+# do worker sumir, para os totais do /metrics nunca diminuírem (o Prometheus leria
+# como reinício do contador). Medidores de workers encerrados são descartados
+ARQUIVO_ENCERRADOS = 'encerrados.json'
+
+_identidade = None
+
+
+def _identidade_do_processo():
+    """(pid, início) deste processo; distingue um pid reaproveitado do worker anterior"""
+    global _identidade
+    if _identidade is None or _identidade[0] != os.getpid():
+        _identidade = (os.getpid(), time.time())
+    return _identidade
+
+
+def _arquivo_do_processo(pid=None):
+    return os.path.join(Config.METRICS_DIR, f"{pid or os.getpid()}.json")
+
+
+@contextmanager
+def _trava(exclusiva):
+    """Trava de arquivo em METRICS_DIR: quem arquiva exclui quem está somando"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(Config.METRICS_DIR, '.trava'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _ler(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escrever(caminho, dados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, separators=(',', ':'))
+    os.replace(temporario, caminho)
+
+
+def gravar():
+    """Grava a foto deste worker em METRICS_DIR (troca atômica do arquivo)"""
+    if not Config.METRICS_DIR:
+        return
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    destino = _arquivo_do_processo()
+    identidade = list(_identidade_do_processo())
+    anterior = _ler(destino)
+    if anterior and anterior.get('identidade') != identidade:
+        # Arquivo de um worker morto com o mesmo pid: arquiva antes de sobrescrever
+        _arquivar(destino, anterior)
+    _escrever(destino, {'identidade': identidade, 'metricas': coletar()})
+
+
+def _somar(destino, origem, pid):
+    """
+    Soma contadores e histogramas de mesmo rótulo. Medidores não se somam
+    (a ocupação de um pool não é a soma dos pools): cada worker sai com o rótulo pid.
+    """
+    for nome, metrica in origem.items():
+        medidor = metrica['tipo'] == 'gauge'
+        rotulos_extra = ['pid'] if medidor else []
+        alvo = destino.setdefault(nome, {**metrica, 'rotulos': metrica['rotulos'] + rotulos_extra, 'amostras': []})
+        por_rotulo = {tuple(r): v for r, v in alvo['amostras']}
+        for rotulos, valor in metrica['amostras']:
+            chave = tuple(rotulos) + ((str(pid),) if medidor else ())
+            atual = por_rotulo.get(chave)
+            if atual is None:
+                por_rotulo[chave] = valor
+            elif isinstance(valor, list):
+                por_rotulo[chave] = [a + b for a, b in zip(atual, valor)]
+            else:
+                por_rotulo[chave] = atual + valor
+        alvo['amostras'] = [[list(r), v] for r, v in por_rotulo.items()]
+
+
+def _sem_medidores(metricas):
+    return {nome: m for nome, m in metricas.items() if m['tipo'] != 'gauge'}
+
+
+def _so_medidores(metricas):
+    return {nome: m for nome, m in metricas.items() if m['tipo'] == 'gauge'}
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _encerrado(caminho, pid):
+    """Worker que não existe mais ou que não grava há mais de 3 intervalos"""
+    try:
+        idade = time.time() - os.path.getmtime(caminho)
+    except OSError:
+        return False
+    return not _processo_vivo(pid) or idade > Config.METRICS_FLUSH_INTERVAL * 3
+
+
+def _arquivar(caminho, dados):
+    """
+    Soma os contadores e histogramas do worker encerrado em ARQUIVO_ENCERRADOS e
+    apaga o arquivo dele. A identidade fica registrada, para o mesmo worker nunca
+    entrar duas vezes na soma (ex.: um worker travado que volta a gravar).
+    """
+    with _trava(exclusiva=True):
+        destino = os.path.join(Config.METRICS_DIR, ARQUIVO_ENCERRADOS)
+        encerrados = _ler(destino) or {'metricas': {}, 'identidades': []}
+        if dados.get('identidade') not in encerrados['identidades']:
+            _somar(encerrados['metricas'], _sem_medidores(dados.get('metricas', {})), None)
+            encerrados['identidades'].append(dados.get('identidade'))
+            # Só as identidades cujo arquivo ainda existe podem voltar a aparecer
+            vivos = {tuple(d['identidade']) for d in map(_ler, glob.glob(os.path.join(Config.METRICS_DIR, '[0-9]*.json')))
+                     if d and d.get('identidade')}
+            encerrados['identidades'] = [i for i in encerrados['identidades']
+                                         if i == dados.get('identidade') or (i and (tuple(i) in vivos or _processo_vivo(i[0])))]
+            _escrever(destino, encerrados)
+        atual = _ler(caminho)
+        if caminho and (atual is None or atual.get('identidade') == dados.get('identidade')):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+def agregar():
+    """Soma as métricas deste processo, dos outros workers ativos e dos já encerrados"""
+    total = {}
+    if not Config.METRICS_DIR:
+        _somar(total, coletar(), os.getpid())
+        return total
+
+    os.makedirs(Config.METRICS_DIR, exist_ok=True)
+    proprio = _arquivo_do_processo()
+    encerrar = []
+    with _trava(exclusiva=False):
+        encerrados = _ler(os.path.join(Config.METRICS_DIR, ARQUIVO_ENCERRADOS)) or {'metricas': {}, 'identidades': []}
+        _somar(total, encerrados['metricas'], None)
+        arquivados = [tuple(i) for i in encerrados['identidades'] if i]
+        # Este worker, se já foi arquivado (ficou travado), só entra com os medidores
+        minhas = coletar()
+        _somar(total, _so_medidores(minhas) if _identidade_do_processo() in arquivados else minhas, os.getpid())
+        for caminho in glob.glob(os.path.join(Config.METRICS_DIR, '[0-9]*.json')):
+            nome = os.path.basename(caminho)[:-5]
+            if caminho == proprio or not nome.isdigit():
+                continue
+            dados = _ler(caminho)
+            if not dados or not dados.get('identidade') or tuple(dados['identidade']) in arquivados:
+                continue
+            if _encerrado(caminho, int(nome)):
+                # Conta agora e arquiva em seguida: na próxima leitura vem de ARQUIVO_ENCERRADOS
+                _somar(total, _sem_medidores(dados['metricas']), None)
+                encerrar.append((caminho, dados))
+            else:
+                _somar(total, dados['metricas'], int(nome))
+    for caminho, dados in encerrar:
+        _arquivar(caminho, dados)
+    return total
+
+
+def _encerrar_worker():
+    """Ao sair, o worker passa os seus totais para ARQUIVO_ENCERRADOS e apaga o próprio arquivo"""
+    _parar.set()
+    try:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        _arquivar(_arquivo_do_processo(), {'identidade': list(_identidade_do_processo()), 'metricas': coletar()})
+    except OSError as e:
+        print(f"Erro ao arquivar métricas: {e}")
+
+
+# ========== FORMATO TEXTO DO PROMETHEUS ==========
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formatar(metricas):
+    linhas = []
+    for nome in sorted(metricas):
+        m = metricas[nome]
+        linhas.append(f"# HELP {nome} {m['ajuda']}")
+        linhas.append(f"# TYPE {nome} {m['tipo']}")
+        for rotulos, valor in sorted(m['amostras']):
+            if m['tipo'] == 'histogram':
+                acumulado = 0
+                for limite, contagem in zip(list(m['buckets']) + [float('inf')], valor[:-1]):
+                    acumulado += contagem
+                    le = f'le="{_numero(float(limite))}"'
+                    linhas.append(f"{nome}_bucket{_rotulos(m['rotulos'], rotulos, le)} {acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos(m['rotulos'], rotulos)} {_numero(valor[-1])}")
+                linhas.append(f"{nome}_count{_rotulos(m['rotulos'], rotulos)} {acumulado}")
+            else:
+                linhas.append(f"{nome}{_rotulos(m['rotulos'], rotulos)} {_numero(valor)}")
+    return '\n'.join(linhas) + '\n'
+
+
+# ========== INTEGRAÇÃO COM O FLASK ==========
+
+_parar = threading.Event()
+
+
+def _gravar_periodicamente():
+    while not _parar.wait(Config.METRICS_FLUSH_INTERVAL):
+        try:
+            gravar()
+        except Exception as e:
+            print(f"Erro ao gravar métricas: {e}")
+
+
+def init_app(app):
+    """Mede cada requisição e expõe /metrics no formato do Prometheus"""
+    if not Config.METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def iniciar_cronometro():
+        g._inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def medir_requisicao(resposta):
+        inicio = g.pop('_inicio_requisicao', None)
+        if inicio is not None:
+            endpoint = request.endpoint or 'sem_rota'
+            requisicoes.observar(time.perf_counter() - inicio, endpoint, request.method, str(resposta.status_code))
+        return resposta
+
+    @app.route('/metrics')
+    def metrics():
+        """Métricas agregadas de todos os workers (Prometheus): token do METRICS_TOKEN ou funcionário logado"""
+        if session.get('user_tipo') != 'funcionario' and not (
+                Config.METRICS_TOKEN and request.headers.get('Authorization') == f"Bearer {Config.METRICS_TOKEN}"):
+            abort(401)
+        return Response(formatar(agregar()), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    if Config.METRICS_DIR:
+        threading.Thread(target=_gravar_periodicamente, name='metricas', daemon=True).start()
+        atexit.register(_encerrar_worker)
@@ -0,0 +1,123 @@
+"""
+Migrações do esquema, só para frente. Cada arquivo migracoes/NNNN_descricao.sql
+roda uma única vez, em ordem, e fica registrado em schema_migracoes com o hash
+do conteúdo; rode `flask --app app migrar` a cada deploy.
+
+O MySQL não desfaz DDL (cada ALTER/CREATE faz commit sozinho), então uma
+migração interrompida no meio é simplesmente repetida: tabelas, colunas e
+índices que já existem são ignorados. O mesmo vale para bancos criados pelo
+SQL-Códigos-BD.txt, que já trazem o esquema completo.
+"""
+import hashlib
+import os
+import re
+
+from mysql.connector import errors
+
+from infra import pool
+
+PASTA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migracoes')
+PADRAO_ARQUIVO = re.compile(r'^\d{4}_[\w-]+\.sql$')
+NOME_TRAVA = 'scriptcars_migracoes'
+
+# Objeto já criado: tabela, coluna ou índice com o mesmo nome
+ER_TABLE_EXISTS = 1050
+ER_DUP_FIELDNAME = 1060
+ER_DUP_KEYNAME = 1061
+JA_EXISTE = (ER_TABLE_EXISTS, ER_DUP_FIELDNAME, ER_DUP_KEYNAME)
+
+SQL_TABELA = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao VARCHAR(100) PRIMARY KEY,
+        hash CHAR(64) NOT NULL,
+        aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+def arquivos():
+    """[(versão, caminho)] das migrações da pasta, em ordem"""
+    nomes = sorted(n for n in os.listdir(PASTA) if PADRAO_ARQUIVO.match(n))
+    return [(nome[:-4], os.path.join(PASTA, nome)) for nome in nomes]
+
+
+def comandos(texto):
+    """Separa o arquivo em comandos (terminados por ';' no fim da linha), sem os comentários '--'"""
+    atual, lista = [], []
+    for linha in texto.splitlines():
+        if linha.strip().startswith('--') or not linha.strip():
+            continue
+        atual.append(linha)
+        if linha.rstrip().endswith(';'):
+            lista.append('\n'.join(atual).rstrip()[:-1])
+            atual = []
+    if atual:
+        lista.append('\n'.join(atual))
+    return lista
+
+
+def _hash(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _aplicadas(cursor):
+    cursor.execute("SELECT versao, hash, aplicada_em FROM schema_migracoes")
+    return {versao: (hash_, aplicada_em) for versao, hash_, aplicada_em in cursor.fetchall()}
+
+
+def situacao():
+    """[(versão, data de aplicação ou None, alterada depois de aplicada)] de todas as migrações"""
+    conn = pool.conexao_dedicada()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_TABELA)
+        aplicadas = _aplicadas(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    resultado = []
+    for versao, caminho in arquivos():
+        with open(caminho, encoding='utf-8') as f:
+            hash_atual = _hash(f.read())
+        hash_, aplicada_em = aplicadas.get(versao, (None, None))
+        resultado.append((versao, aplicada_em, hash_ is not None and hash_ != hash_atual))
+    return resultado
+
+
+def migrar(avisar=print):
+    """Aplica as migrações pendentes, em ordem; retorna as versões aplicadas"""
+    conn = pool.conexao_dedicada()
+    cursor = conn.cursor()
+    try:
+        # Dois deploys ao mesmo tempo não aplicam a mesma migração duas vezes
+        cursor.execute("SELECT GET_LOCK(%s, 600)", (NOME_TRAVA,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Outra execução de migrações está em andamento")
+        cursor.execute(SQL_TABELA)
+        aplicadas = _aplicadas(cursor)
+        novas = []
+        for versao, caminho in arquivos():
+            with open(caminho, encoding='utf-8') as f:
+                texto = f.read()
+            if versao in aplicadas:
+                if aplicadas[versao][0] != _hash(texto):
+                    avisar(f"Aviso: {versao} foi alterada depois de aplicada (migrações são só para frente)")
+                continue
+            avisar(f"Aplicando {versao}...")
+            for comando in comandos(texto):
+                try:
+                    cursor.execute(comando)
+                except errors.DatabaseError as e:
+                    if e.errno not in JA_EXISTE:
+                        conn.rollback()
+                        raise
+                    avisar(f"  já existe, ignorado: {e.msg}")
+            cursor.execute("INSERT INTO schema_migracoes (versao, hash) VALUES (%s, %s)", (versao, _hash(texto)))
+            conn.commit()
+            novas.append(versao)
+        return novas
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (NOME_TRAVA,))
+        cursor.fetchone()
+        cursor.close()
+        conn.close()
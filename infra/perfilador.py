@@ -0,0 +1,187 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, session
+
+from config import Config
+
+# Categorias do resumo -> teste sobre (arquivo, função) do pstats
+CATEGORIAS = {
+    'models': lambda arquivo, funcao: f"{os.sep}models{os.sep}" in arquivo,
+    'templates': lambda arquivo, funcao: f"{os.sep}jinja2{os.sep}" in arquivo or arquivo.endswith('.html'),
+    'moeda_brl': lambda arquivo, funcao: funcao == 'moeda_brl',
+    'banco': lambda arquivo, funcao: f"{os.sep}mysql{os.sep}" in arquivo,
+}
+
+# Só um perfil por vez: o profiler e a amostragem pesam sobre o processo inteiro
+_ocupado = threading.Lock()
+
+
+class Amostrador(threading.Thread):
+    """Amostra a pilha de uma thread em intervalos fixos para montar o flame graph"""
+
+    def __init__(self, id_thread, intervalo):
+        super().__init__(name='perfilador', daemon=True)
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.id_thread)
+            pilha = []
+            while frame is not None:
+                codigo = frame.f_code
+                pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+def tempo_inclusivo(estatisticas, pertence):
+    """
+    Tempo total gasto dentro da categoria, sem contar duas vezes chamadas internas:
+    soma o tempo acumulado das funções da categoria só a partir de chamadores de fora dela.
+    """
+    total = 0.0
+    for (arquivo, _, funcao), (_, _, _, acumulado, chamadores) in estatisticas.stats.items():
+        if not pertence(arquivo, funcao):
+            continue
+        if not chamadores:
+            total += acumulado
+            continue
+        for (arquivo_chamador, _, funcao_chamador), dados in chamadores.items():
+            if not pertence(arquivo_chamador, funcao_chamador):
+                total += dados[3]
+    return total
+
+
+def resumir(estatisticas, duracao):
+    """Tempo por categoria e as funções de models mais caras"""
+    categorias = {nome: round(tempo_inclusivo(estatisticas, teste), 6) for nome, teste in CATEGORIAS.items()}
+    funcoes_models = [
+        {
+            'funcao': f"{os.path.basename(arquivo)[:-3]}.{funcao}",
+            'chamadas': chamadas,
+            'tempo_s': round(acumulado, 6),
+        }
+        for (arquivo, _, funcao), (_, chamadas, _, acumulado, _) in estatisticas.stats.items()
+        if CATEGORIAS['models'](arquivo, funcao) and funcao != '<module>'
+    ]
+    funcoes_models.sort(key=lambda f: f['tempo_s'], reverse=True)
+    return {'duracao_s': round(duracao, 6), 'categorias': categorias, 'models': funcoes_models[:15]}
+
+
+def _podar():
+    """Mantém só os PROFILING_KEEP perfis mais recentes"""
+    resumos = sorted(f for f in os.listdir(Config.PROFILING_DIR) if f.endswith('.json'))
+    for antigo in resumos[:-Config.PROFILING_KEEP]:
+        base = antigo[:-5]
+        for extensao in ('.json', '.pstats', '.folded'):
+            try:
+                os.remove(os.path.join(Config.PROFILING_DIR, base + extensao))
+            except OSError:
+                pass
+
+
+def gravar(perfil, amostrador, duracao, status):
+    """Grava .pstats (cProfile), .folded (flame graph) e .json (resumo) do perfil"""
+    os.makedirs(Config.PROFILING_DIR, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.endpoint or 'sem_rota'}"
+    caminho = os.path.join(Config.PROFILING_DIR, nome)
+
+    perfil.dump_stats(caminho + '.pstats')
+    # Formato "pilha;de;frames contagem" aceito por flamegraph.pl e speedscope
+    with open(caminho + '.folded', 'w', encoding='utf-8') as f:
+        for pilha, contagem in amostrador.pilhas.most_common():
+            f.write(f"{pilha} {contagem}\n")
+
+    resumo = resumir(pstats.Stats(perfil), duracao)
+    resumo.update({
+        'nome': nome,
+        'quando': datetime.now().isoformat(timespec='seconds'),
+        'metodo': request.method,
+        'caminho': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': status,
+        'usuario': session.get('user_nome'),
+        'amostras': sum(amostrador.pilhas.values()),
+    })
+    with open(caminho + '.json', 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+    _podar()
+    return nome
+
+
+def listar_perfis(limite=None):
+    """Resumos dos perfis gravados, do mais recente ao mais antigo"""
+    if not os.path.isdir(Config.PROFILING_DIR):
+        return []
+    arquivos = sorted((f for f in os.listdir(Config.PROFILING_DIR) if f.endswith('.json')), reverse=True)
+    perfis = []
+    for arquivo in arquivos[:limite or Config.PROFILING_KEEP]:
+        try:
+            with open(os.path.join(Config.PROFILING_DIR, arquivo), encoding='utf-8') as f:
+                perfis.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return perfis
+
+
+def pode_perfilar():
+    """Pedido com ?perfilar=1 vindo de funcionário (ou de qualquer um com PROFILING_ALLOW_ALL)"""
+    if request.args.get('perfilar') != '1':
+        return False
+    return Config.PROFILING_ALLOW_ALL or session.get('user_tipo') == 'funcionario'
+
+
+def init_app(app):
+    """Perfila a requisição atual quando pedido com ?perfilar=1"""
+
+    @app.before_request
+    def iniciar_perfil():
+        if not pode_perfilar() or not _ocupado.acquire(blocking=False):
+            return
+        amostrador = Amostrador(threading.get_ident(), Config.PROFILING_INTERVAL)
+        perfil = cProfile.Profile()
+        g._perfil = (perfil, amostrador, time.perf_counter())
+        amostrador.start()
+        perfil.enable()
+
+    @app.after_request
+    def encerrar_perfil(resposta):
+        dados = g.pop('_perfil', None)
+        if dados is None:
+            return resposta
+        perfil, amostrador, inicio = dados
+        try:
+            perfil.disable()
+            amostrador.parar()
+            nome = gravar(perfil, amostrador, time.perf_counter() - inicio, resposta.status_code)
+            resposta.headers['X-Perfil'] = nome
+        except Exception as e:
+            print(f"Erro ao gravar perfil: {e}")
+        finally:
+            _ocupado.release()
+        return resposta
+
+    @app.teardown_request
+    def liberar_perfil(exc=None):
+        # Requisição terminou com exceção antes do after_request
+        dados = g.pop('_perfil', None)
+        if dados is not None:
+            dados[0].disable()
+            dados[1].parar()
+            _ocupado.release()
@@ -0,0 +1,292 @@
+import functools
+import random
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errors
+from flask import g, has_app_context
+
+from config import Config
+from infra import metricas
+
+
+# Erros do InnoDB em que a transação inteira pode ser repetida
+ER_LOCK_DEADLOCK = 1213
+ER_LOCK_WAIT_TIMEOUT = 1205
+ERROS_REPETIVEIS = (ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT)
+
+repeticoes = metricas.contador('db_transaction_retries_total',
+                               'Transações repetidas após deadlock ou timeout de lock', ('funcao', 'erro'))
+
+
+class PoolEsgotadoError(errors.PoolError):
+    """Nenhuma conexão ficou livre dentro do tempo limite de checkout"""
+
+
+class ConexaoPool:
+    """Conexão emprestada do pool; close() devolve ao pool em vez de fechar o socket"""
+
+    def __init__(self, pool, conexao, criada_em, da_requisicao=False):
+        self._pool = pool
+        self._conexao = conexao
+        self._criada_em = criada_em
+        self._da_requisicao = da_requisicao
+        self._devolvida = False
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conexao.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._da_requisicao:
+            # A conexão da requisição só volta ao pool no teardown; aqui apenas
+            # encerra a transação aberta para o próximo model começar limpo
+            self._pool._encerrar_transacao(self._conexao)
+            return
+        self.devolver()
+
+    def devolver(self):
+        if self._devolvida:
+            return
+        self._devolvida = True
+        self._pool.devolver(self._conexao, self._criada_em)
+
+
+class CursorMedido:
+    """Cursor que mede cada execute/executemany e atribui o tempo à função de model que o chamou"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _medir(self, metodo, *args, **kwargs):
+        funcao = metricas.funcao_model()
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        except Exception:
+            metricas.erros_consulta.inc(funcao)
+            raise
+        finally:
+            metricas.consultas.observar(time.perf_counter() - inicio, funcao)
+
+    def execute(self, *args, **kwargs):
+        return self._medir(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._medir(self._cursor.executemany, *args, **kwargs)
+
+
+class PoolConexoes:
+    """Pool limitado de conexões MySQL com timeout, ping e reciclagem por idade"""
+
+    def __init__(self, db_config, tamanho=10, timeout=10, max_vida=1800):
+        self.db_config = db_config
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.max_vida = max_vida
+        self._ociosas = deque()
+        self._abertas = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'tempo_espera_total': 0.0,
+            'tempo_espera_max': 0.0,
+            'descartadas_ping': 0,
+            'recicladas': 0,
+            'criadas': 0,
+        }
+
+    def _conectar(self):
+        conexao = mysql.connector.connect(**self.db_config)
+        self._contar('criadas')
+        return conexao, time.monotonic()
+
+    def _contar(self, chave):
+        with self._cond:
+            self._stats[chave] += 1
+
+    def _fechar(self, conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+
+    def _encerrar_transacao(self, conexao):
+        try:
+            if conexao.in_transaction:
+                conexao.rollback()
+        except Exception:
+            pass
+
+    def _valida(self, conexao, criada_em):
+        """Descarta conexões velhas demais ou que não respondem ao ping"""
+        if self.max_vida and time.monotonic() - criada_em > self.max_vida:
+            self._contar('recicladas')
+            return False
+        try:
+            conexao.ping(reconnect=False)
+            return True
+        except Exception:
+            self._contar('descartadas_ping')
+            return False
+
+    def obter(self, da_requisicao=False):
+        """Empresta uma conexão, esperando até `timeout` segundos se o pool estiver cheio"""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        esperou = False
+        with self._cond:
+            while True:
+                if self._ociosas:
+                    conexao, criada_em = self._ociosas.pop()
+                    break
+                if self._abertas < self.tamanho:
+                    self._abertas += 1
+                    conexao = None
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._stats['timeouts'] += 1
+                    metricas.timeouts_pool.inc()
+                    raise PoolEsgotadoError(
+                        f"Pool de conexões esgotado ({self.tamanho} em uso) após {self.timeout}s"
+                    )
+                esperou = True
+                self._cond.wait(restante)
+            espera = time.monotonic() - inicio
+            self._stats['checkouts'] += 1
+            if esperou:
+                self._stats['esperas'] += 1
+            self._stats['tempo_espera_total'] += espera
+            self._stats['tempo_espera_max'] = max(self._stats['tempo_espera_max'], espera)
+        metricas.espera_pool.observar(espera)
+
+        # Conexão e ping acontecem fora do lock para não travar as outras threads
+        try:
+            if conexao is not None and not self._valida(conexao, criada_em):
+                self._fechar(conexao)
+                conexao = None
+            if conexao is None:
+                conexao, criada_em = self._conectar()
+        except Exception:
+            with self._cond:
+                self._abertas -= 1
+                self._cond.notify()
+            raise
+        return ConexaoPool(self, conexao, criada_em, da_requisicao)
+
+    def devolver(self, conexao, criada_em):
+        """Recoloca a conexão entre as ociosas e acorda quem estiver esperando"""
+        self._encerrar_transacao(conexao)
+        with self._cond:
+            self._ociosas.append((conexao, criada_em))
+            self._cond.notify()
+
+    def estatisticas(self):
+        """Retorna tamanho, ocupação e contadores de checkout do pool"""
+        with self._cond:
+            dados = dict(self._stats)
+            dados['tamanho_max'] = self.tamanho
+            dados['abertas'] = self._abertas
+            dados['ociosas'] = len(self._ociosas)
+            dados['em_uso'] = self._abertas - len(self._ociosas)
+        checkouts = dados['checkouts'] or 1
+        dados['tempo_espera_medio'] = dados['tempo_espera_total'] / checkouts
+        return dados
+
+
+def repetir_em_conflito(funcao):
+    """
+    Repete a função de model quando o MySQL aborta a transação por deadlock ou
+    timeout de lock, com espera exponencial e aleatória entre as tentativas.
+    A função precisa fazer rollback ao falhar (todas as escritas dos models fazem).
+    """
+    @functools.wraps(funcao)
+    def wrapper(*args, **kwargs):
+        tentativa = 1
+        while True:
+            try:
+                return funcao(*args, **kwargs)
+            except errors.DatabaseError as e:
+                if e.errno not in ERROS_REPETIVEIS or tentativa >= Config.DB_RETRY_ATTEMPTS:
+                    raise
+                repeticoes.inc(funcao.__name__, str(e.errno))
+                time.sleep(random.uniform(0, Config.DB_RETRY_BACKOFF * 2 ** (tentativa - 1)))
+                tentativa += 1
+    return wrapper
+
+
+def apos_commit(funcao, *args):
+    """
+    Chama um efeito de uma escrita já confirmada (versão, caches, índice de busca).
+    Uma falha aqui só vai para o log: propagá-la faria o model desfazer uma escrita
+    que já está no banco e o repetir_em_conflito tentar gravá-la de novo.
+    """
+    try:
+        return funcao(*args)
+    except Exception as e:
+        print(f"Erro depois do commit em {funcao.__name__}: {e}")
+        return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+metricas.medidor('db_pool_connections_in_use', 'Conexões do pool emprestadas no momento',
+                 lambda: _pool.estatisticas()['em_uso'] if _pool else 0)
+metricas.medidor('db_pool_connections_open', 'Conexões do pool abertas no momento',
+                 lambda: _pool.estatisticas()['abertas'] if _pool else 0)
+
+
+def obter_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(
+                    Config.DB_CONFIG,
+                    tamanho=Config.DB_POOL_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    max_vida=Config.DB_POOL_MAX_LIFETIME,
+                )
+    return _pool
+
+
+def conexao_da_requisicao():
+    """Dentro de uma requisição devolve sempre a mesma conexão (guardada em g)"""
+    if not has_app_context():
+        return obter_pool().obter()
+    conexao = g.get('_db_conexao')
+    if conexao is None:
+        conexao = obter_pool().obter(da_requisicao=True)
+        g._db_conexao = conexao
+    return conexao
+
+
+def liberar_conexao_requisicao(exc=None):
+    """Teardown: devolve ao pool a conexão usada pela requisição"""
+    conexao = g.pop('_db_conexao', None)
+    if conexao is not None:
+        conexao.devolver()
+
+
+def conexao_dedicada():
+    """Conexão fora do pool para operações longas (exportações), sem ocupar vaga"""
+    return mysql.connector.connect(**Config.DB_CONFIG)
+
+
+def init_app(app):
+    app.teardown_appcontext(liberar_conexao_requisicao)
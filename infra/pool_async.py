@@ -0,0 +1,81 @@
+import time
+
+from config import Config
+from infra import metricas
+
+try:
+    import aiomysql
+except ImportError:  # modo async é opcional (requirements-async.txt)
+    aiomysql = None
+
+_pool = None
+
+
+def _config_aiomysql():
+    """Config.DB_CONFIG (mysql-connector) com os nomes de parâmetro do aiomysql"""
+    config = dict(Config.DB_CONFIG)
+    if 'database' in config:
+        config['db'] = config.pop('database')
+    return config
+
+
+async def iniciar():
+    """Cria o pool async do worker (chamado no startup do servidor ASGI)"""
+    global _pool
+    if aiomysql is None:
+        raise RuntimeError("Modo async requer o aiomysql: pip install -r requirements-async.txt")
+    if _pool is None:
+        _pool = await aiomysql.create_pool(
+            minsize=1,
+            maxsize=Config.ASYNC_DB_POOL_SIZE,
+            pool_recycle=Config.DB_POOL_MAX_LIFETIME,
+            autocommit=True,
+            **_config_aiomysql(),
+        )
+    return _pool
+
+
+async def encerrar():
+    """Fecha as conexões do pool async (shutdown do servidor ASGI)"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def consultar(sql, params=(), tipo=None):
+    """
+    Executa um SELECT e devolve as linhas como dicionários, ou no tipo de linha
+    compacto da projeção (models.linhas) se `tipo` for dado; mede como o CursorMedido.
+    """
+    pool = await iniciar()
+    funcao = metricas.funcao_model()
+    inicio_espera = time.perf_counter()
+    async with pool.acquire() as conexao:
+        metricas.espera_pool.observar(time.perf_counter() - inicio_espera)
+        classe = aiomysql.Cursor if tipo else aiomysql.DictCursor
+        async with conexao.cursor(classe) as cursor:
+            inicio = time.perf_counter()
+            try:
+                await cursor.execute(sql, params)
+                linhas = await cursor.fetchall()
+                return list(map(tipo._make, linhas)) if tipo else linhas
+            except Exception:
+                metricas.erros_consulta.inc(funcao)
+                raise
+            finally:
+                metricas.consultas.observar(time.perf_counter() - inicio, funcao)
+
+
+def estatisticas():
+    """Tamanho e ocupação do pool async"""
+    if _pool is None:
+        return {'iniciado': False}
+    return {
+        'iniciado': True,
+        'tamanho_max': _pool.maxsize,
+        'abertas': _pool.size,
+        'ociosas': _pool.freesize,
+        'em_uso': _pool.size - _pool.freesize,
+    }
@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import Config
+from infra import metricas
+
+
+class FilaSenhasCheiaError(Exception):
+    """Há verificações de senha demais na fila; o login deve ser tentado de novo"""
+
+
+_executor = ThreadPoolExecutor(max_workers=Config.BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+# Limita quantas operações podem estar executando + aguardando na fila
+_vagas = threading.BoundedSemaphore(Config.BCRYPT_WORKERS + Config.BCRYPT_QUEUE_MAX)
+_custo = Config.BCRYPT_ROUNDS
+
+
+def _executar(funcao, *args):
+    if not _vagas.acquire(blocking=False):
+        metricas.bcrypt_recusados.inc()
+        raise FilaSenhasCheiaError("Muitas tentativas de login simultâneas. Tente novamente em instantes.")
+    try:
+        futuro = _executor.submit(funcao, *args)
+    except Exception:
+        _vagas.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas.release())
+    return futuro
+
+
+def custo_atual():
+    return _custo
+
+
+def custo_do_hash(senha_hash):
+    """Extrai o custo de um hash no formato $2b$12$..."""
+    if isinstance(senha_hash, bytes):
+        senha_hash = senha_hash.decode('utf-8')
+    try:
+        return int(senha_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def precisa_rehash(senha_hash):
+    """Só sobe o custo: hashes mais fortes que o configurado ficam como estão"""
+    custo = custo_do_hash(senha_hash)
+    return custo is None or custo < _custo
+
+
+def _checkpw(senha, senha_hash):
+    inicio = time.perf_counter()
+    try:
+        return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+    finally:
+        metricas.bcrypt.observar(time.perf_counter() - inicio, 'verificar')
+
+
+def hashpw_sem_medir(senha, custo):
+    """Hash sem métricas nem travas: seguro para rodar em outros processos"""
+    return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds=custo)).decode('utf-8')
+
+
+def _hashpw(senha, custo):
+    inicio = time.perf_counter()
+    try:
+        return hashpw_sem_medir(senha, custo)
+    finally:
+        metricas.bcrypt.observar(time.perf_counter() - inicio, 'gerar')
+
+
+def verificar(senha, senha_hash):
+    """
+    Confere a senha no executor do bcrypt; levanta FilaSenhasCheiaError se a fila lotar.
+    A thread que chama espera o resultado: o executor limita quantos hashes rodam
+    ao mesmo tempo, não libera a requisição.
+    """
+    if not senha_hash:
+        return False
+    if isinstance(senha_hash, bytes):
+        senha_hash = senha_hash.decode('utf-8')
+    return _executar(_checkpw, senha, senha_hash).result()
+
+
+def gerar_hash(senha):
+    """Gera o hash bcrypt com o custo configurado; bloqueia como verificar()"""
+    return _executar(_hashpw, senha, _custo).result()
+
+
+def rehash_em_segundo_plano(senha, salvar):
+    """
+    Recalcula o hash com o custo atual e chama salvar(novo_hash), sem segurar
+    a requisição de login. Se a fila estiver cheia, tenta no próximo login.
+    """
+    def tarefa():
+        try:
+            salvar(_hashpw(senha, _custo))
+        except Exception as e:
+            print(f"Erro ao atualizar hash de senha: {e}")
+    try:
+        _executar(tarefa)
+    except FilaSenhasCheiaError:
+        pass
+
+
+def calibrar(alvo_ms, custo_min=10, custo_max=16):
+    """Escolhe o maior custo cujo hash leva no máximo `alvo_ms` nesta máquina"""
+    escolhido = custo_min
+    for custo in range(custo_min, custo_max + 1):
+        inicio = time.perf_counter()
+        hashpw_sem_medir('calibracao', custo)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if duracao_ms > alvo_ms:
+            break
+        escolhido = custo
+        # Cada custo a mais dobra o tempo: não adianta medir o próximo
+        if duracao_ms * 2 > alvo_ms:
+            break
+    return escolhido
+
+
+def init_app(app):
+    """Registra `flask --app app calibrar-bcrypt`; o custo em uso é sempre o BCRYPT_ROUNDS"""
+    @app.cli.command('calibrar-bcrypt')
+    def calibrar_bcrypt():
+        """Recomenda um BCRYPT_ROUNDS para o alvo BCRYPT_TARGET_MS nesta máquina"""
+        recomendado = calibrar(Config.BCRYPT_TARGET_MS)
+        print(f"Custo recomendado para {Config.BCRYPT_TARGET_MS}ms nesta máquina: {recomendado} "
+              f"(em uso: {_custo}). Fixe BCRYPT_ROUNDS igual em todos os servidores.")
@@ -0,0 +1,293 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+
+from config import Config
+from infra import metricas
+
+_serializador = TaggedJSONSerializer()
+
+
+class ArmazemSessoes:
+    """
+    Sessões num SQLite compartilhado pelos workers da máquina, com um LRU em
+    memória na frente. Cada sessão tem uma versão: o LRU só é usado se a versão
+    no SQLite for a mesma (ou se a entrada tiver menos de SESSION_CACHE_TTL s),
+    então uma alteração feita em outro worker nunca é perdida.
+    """
+
+    def __init__(self, caminho, max_itens=10000, ttl_cache=0):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl_cache = ttl_cache
+        self._lru = OrderedDict()  # sid -> (versao, dados serializados, expira, verificada_em)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ultima_limpeza = 0.0
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pasta, exist_ok=True)
+        conexao = self._conexao()
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS sessoes (
+                sid TEXT PRIMARY KEY,
+                dados TEXT NOT NULL,
+                versao INTEGER NOT NULL DEFAULT 1,
+                expira REAL NOT NULL
+            )
+        """)
+        conexao.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes (expira)")
+
+    def _conexao(self):
+        """Uma conexão SQLite por thread (em WAL: leituras não esperam escritas)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _lembrar(self, sid, versao, dados, expira):
+        with self._lock:
+            self._lru[sid] = (versao, dados, expira, time.monotonic())
+            self._lru.move_to_end(sid)
+            while len(self._lru) > self.max_itens:
+                self._lru.popitem(last=False)
+
+    def _esquecer(self, sid):
+        with self._lock:
+            self._lru.pop(sid, None)
+
+    def carregar(self, sid):
+        """(dados serializados, expira) da sessão, ou None se não existe ou expirou"""
+        agora = time.time()
+        with self._lock:
+            entrada = self._lru.get(sid)
+            if entrada is not None:
+                self._lru.move_to_end(sid)
+        if entrada is not None and entrada[2] > agora and self.ttl_cache \
+                and time.monotonic() - entrada[3] < self.ttl_cache:
+            metricas.registrar_cache('sessoes', True)
+            return entrada[1], entrada[2]
+
+        conexao = self._conexao()
+        if entrada is not None:
+            # Confere só a versão; os dados vêm do LRU se não mudaram
+            linha = conexao.execute("SELECT versao, expira FROM sessoes WHERE sid=?", (sid,)).fetchone()
+            if linha and linha[0] == entrada[0] and linha[1] > agora:
+                metricas.registrar_cache('sessoes', True)
+                self._lembrar(sid, linha[0], entrada[1], linha[1])
+                return entrada[1], linha[1]
+        metricas.registrar_cache('sessoes', False)
+        linha = conexao.execute("SELECT versao, dados, expira FROM sessoes WHERE sid=?", (sid,)).fetchone()
+        if not linha or linha[2] <= agora:
+            self._esquecer(sid)
+            return None
+        self._lembrar(sid, *linha)
+        return linha[1], linha[2]
+
+    def gravar(self, sid, dados, expira):
+        conexao = self._conexao()
+        # Transação para a versão lida ser a desta escrita, mesmo com outros workers gravando
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute("""
+                INSERT INTO sessoes (sid, dados, versao, expira) VALUES (?, ?, 1, ?)
+                ON CONFLICT(sid) DO UPDATE SET dados=excluded.dados, versao=versao + 1, expira=excluded.expira
+            """, (sid, dados, expira))
+            versao = conexao.execute("SELECT versao FROM sessoes WHERE sid=?", (sid,)).fetchone()[0]
+            conexao.execute("COMMIT")
+        except Exception:
+            conexao.execute("ROLLBACK")
+            raise
+        self._lembrar(sid, versao, dados, expira)
+        self._limpar_periodicamente()
+
+    def prolongar(self, sid, expira):
+        """Adia a expiração sem regravar os dados (nem mudar a versão)"""
+        self._conexao().execute("UPDATE sessoes SET expira=? WHERE sid=?", (expira, sid))
+        with self._lock:
+            entrada = self._lru.get(sid)
+            if entrada is not None:
+                self._lru[sid] = (entrada[0], entrada[1], expira, entrada[3])
+
+    def excluir(self, sid):
+        self._conexao().execute("DELETE FROM sessoes WHERE sid=?", (sid,))
+        self._esquecer(sid)
+
+    def limpar_expiradas(self):
+        """Apaga de uma vez todas as sessões vencidas; retorna quantas"""
+        agora = time.time()
+        cursor = self._conexao().execute("DELETE FROM sessoes WHERE expira <= ?", (agora,))
+        with self._lock:
+            for sid in [s for s, e in self._lru.items() if e[2] <= agora]:
+                del self._lru[sid]
+        return cursor.rowcount
+
+    def _limpar_periodicamente(self):
+        agora = time.monotonic()
+        if agora - self._ultima_limpeza < Config.SESSION_PURGE_INTERVAL:
+            return
+        self._ultima_limpeza = agora
+        try:
+            self.limpar_expiradas()
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar sessões expiradas: {e}")
+
+    def contar(self):
+        return self._conexao().execute("SELECT COUNT(*) FROM sessoes").fetchone()[0]
+
+
+class SessaoServidor(SessionMixin):
+    """Sessão cujo cookie guarda só o id; os dados são lidos do armazém no primeiro acesso"""
+
+    def __init__(self, armazem, sid, existente=True):
+        self.armazem = armazem
+        self.sid = sid
+        self.new = not existente
+        self.modified = False
+        self.accessed = False
+        self._dados = None if existente else {}
+        self._original = None
+        self.expira = None
+        # O cliente mandou um id que o armazém não conhece (ou que venceu)
+        self.cookie_invalido = False
+
+    def _carregar(self):
+        self.accessed = True
+        if self._dados is None:
+            registro = self.armazem.carregar(self.sid)
+            if registro is None:
+                # Id desconhecido ou vencido: nunca reaproveita um id vindo do cliente
+                self.sid = _novo_sid()
+                self.new = True
+                self.cookie_invalido = True
+                self._dados = {}
+            else:
+                self._original, self.expira = registro
+                self._dados = _serializador.loads(self._original)
+        return self._dados
+
+    @property
+    def carregada(self):
+        return self._dados is not None
+
+    def __getitem__(self, chave):
+        return self._carregar()[chave]
+
+    def __setitem__(self, chave, valor):
+        self._carregar()[chave] = valor
+        self.modified = True
+
+    def __delitem__(self, chave):
+        del self._carregar()[chave]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._carregar())
+
+    def __len__(self):
+        return len(self._carregar())
+
+    def __contains__(self, chave):
+        return chave in self._carregar()
+
+    def get(self, chave, padrao=None):
+        return self._carregar().get(chave, padrao)
+
+    def clear(self):
+        if self._carregar():
+            self._dados.clear()
+            self.modified = True
+
+
+def _novo_sid():
+    return secrets.token_urlsafe(32)
+
+
+def renovar_id(sessao):
+    """Troca o id da sessão mantendo os dados (chamado no login contra fixação de sessão)"""
+    if isinstance(sessao, SessaoServidor):
+        sessao._carregar()
+        if not sessao.new:
+            sessao.armazem.excluir(sessao.sid)
+        sessao.sid = _novo_sid()
+        sessao.new = True
+        sessao.modified = True
+
+
+class InterfaceSessoesServidor(SessionInterface):
+    """Liga o ArmazemSessoes ao Flask: o cookie leva apenas um id opaco e aleatório"""
+
+    def __init__(self, armazem):
+        self.armazem = armazem
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > 128:
+            sessao = SessaoServidor(self.armazem, _novo_sid(), existente=False)
+            sessao.cookie_invalido = bool(sid)
+            return sessao
+        return SessaoServidor(self.armazem, sid)
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        caminho = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.carregada:
+            # Ninguém leu nem escreveu a sessão nesta requisição: nada a fazer
+            return
+
+        if not session:
+            # Sessão vazia: apaga a do armazém e o cookie, inclusive um id velho que
+            # o cliente continuaria mandando (e que custaria uma leitura por requisição)
+            if not session.new or session.cookie_invalido:
+                if not session.new:
+                    self.armazem.excluir(session.sid)
+                response.delete_cookie(nome, domain=dominio, path=caminho,
+                                       secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        expira = time.time() + app.permanent_session_lifetime.total_seconds()
+        if session.modified or session.new:
+            dados = _serializador.dumps(dict(session))
+            if session.new or dados != session._original:
+                self.armazem.gravar(session.sid, dados, expira)
+            else:
+                session.modified = False
+        elif session.expira is not None and expira - session.expira > Config.SESSION_TOUCH_INTERVAL:
+            # Sessão só lida: adia a expiração no máximo uma vez por SESSION_TOUCH_INTERVAL
+            self.armazem.prolongar(session.sid, expira)
+
+        if session.new or (session.permanent and self.should_set_cookie(app, session)):
+            response.set_cookie(
+                nome, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=dominio,
+                path=caminho,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+armazem = None
+
+
+def init_app(app):
+    """Troca a sessão em cookie assinado do Flask pelo armazém no servidor"""
+    global armazem
+    if not Config.SESSION_STORE_ENABLED:
+        return
+    armazem = ArmazemSessoes(Config.SESSION_DB, Config.SESSION_CACHE_MAX_ITENS, Config.SESSION_CACHE_TTL)
+    app.session_interface = InterfaceSessoesServidor(armazem)
+    metricas.medidor('sessions_cached', 'Sessões no LRU em memória deste worker', lambda: len(armazem._lru))
@@ -0,0 +1,54 @@
+-- Esquema original: funcionários, clientes, veículos e vendas
+CREATE TABLE IF NOT EXISTS funcionarios (
+    id_funcionario INT AUTO_INCREMENT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    senha_hash VARCHAR(255) NOT NULL,
+    cargo VARCHAR(50) NOT NULL,
+    data_admissao DATE DEFAULT (CURRENT_DATE),
+    INDEX idx_email (email)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id_cliente INT AUTO_INCREMENT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    username VARCHAR(50) NULL,
+    cpf VARCHAR(14) NOT NULL,
+    telefone VARCHAR(20),
+    email VARCHAR(100),
+    endereco VARCHAR(255),
+    senha_hash VARCHAR(255) NULL,
+    data_cadastro DATE DEFAULT (CURRENT_DATE),
+    UNIQUE KEY uq_clientes_email (email),
+    UNIQUE KEY uq_clientes_username (username),
+    UNIQUE KEY uq_clientes_cpf (cpf)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS veiculos (
+    id_veiculo INT AUTO_INCREMENT PRIMARY KEY,
+    marca VARCHAR(50) NOT NULL,
+    modelo VARCHAR(50) NOT NULL,
+    ano YEAR NOT NULL,
+    preco DECIMAL(10,2) NOT NULL,
+    disponivel BOOLEAN DEFAULT TRUE,
+    foto VARCHAR(255),
+    km_rodados INT DEFAULT 0,
+    cor VARCHAR(30),
+    combustivel VARCHAR(30),
+    INDEX idx_disponivel (disponivel)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS vendas (
+    id_venda INT AUTO_INCREMENT PRIMARY KEY,
+    id_cliente INT NOT NULL,
+    id_funcionario INT NOT NULL,
+    id_veiculo INT NOT NULL,
+    data_venda DATE DEFAULT (CURRENT_DATE),
+    valor_final DECIMAL(10,2) NOT NULL,
+    forma_pagamento VARCHAR(50),
+    observacoes TEXT,
+    FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE RESTRICT,
+    FOREIGN KEY (id_funcionario) REFERENCES funcionarios(id_funcionario) ON DELETE RESTRICT,
+    FOREIGN KEY (id_veiculo) REFERENCES veiculos(id_veiculo) ON DELETE RESTRICT,
+    INDEX idx_data_venda (data_venda)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,11 @@
+-- Listagens ordenadas por nome e catálogo (filtro por disponível + ordenação, com id para o keyset).
+-- Um índice por comando: bancos criados por versões intermediárias do script já têm parte deles
+ALTER TABLE funcionarios ADD INDEX idx_funcionarios_nome (nome);
+ALTER TABLE clientes ADD INDEX idx_clientes_nome (nome);
+ALTER TABLE veiculos ADD INDEX idx_marca_modelo (marca, modelo);
+ALTER TABLE veiculos ADD INDEX idx_disp_marca_modelo (disponivel, marca, modelo, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_preco (disponivel, preco, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_ano (disponivel, ano, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_km (disponivel, km_rodados, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_combustivel_preco (disponivel, combustivel, preco);
+ALTER TABLE veiculos ADD INDEX idx_disp_cor_preco (disponivel, cor, preco);
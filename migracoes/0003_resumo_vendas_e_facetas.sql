@@ -0,0 +1,36 @@
+-- Resumo diário de vendas e contagens de facetas do catálogo, ajustados pelos
+-- models dentro da transação de cada escrita (os marcadores de versoes_tabelas,
+-- não: esses avançam depois do commit). Aqui são recalculados do zero.
+CREATE TABLE IF NOT EXISTS vendas_resumo_diario (
+    dia DATE NOT NULL,
+    id_funcionario INT NOT NULL,
+    marca VARCHAR(50) NOT NULL,
+    forma_pagamento VARCHAR(50) NOT NULL DEFAULT '',
+    total_vendas INT NOT NULL DEFAULT 0,
+    total_valor DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, id_funcionario, marca, forma_pagamento)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS veiculos_facetas (
+    dimensao VARCHAR(20) NOT NULL,
+    valor VARCHAR(50) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimensao, valor)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+DELETE FROM vendas_resumo_diario;
+INSERT INTO vendas_resumo_diario (dia, id_funcionario, marca, forma_pagamento, total_vendas, total_valor)
+SELECT v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, ''), COUNT(*), SUM(v.valor_final)
+FROM vendas v
+JOIN veiculos ve ON ve.id_veiculo = v.id_veiculo
+GROUP BY v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, '');
+
+DELETE FROM veiculos_facetas;
+INSERT INTO veiculos_facetas (dimensao, valor, total)
+SELECT 'marca', marca, COUNT(*) FROM veiculos WHERE disponivel = TRUE GROUP BY marca
+UNION ALL
+SELECT 'combustivel', COALESCE(combustivel, ''), COUNT(*) FROM veiculos WHERE disponivel = TRUE GROUP BY COALESCE(combustivel, '')
+UNION ALL
+SELECT 'cor', COALESCE(cor, ''), COUNT(*) FROM veiculos WHERE disponivel = TRUE GROUP BY COALESCE(cor, '')
+UNION ALL
+SELECT 'ano', CAST(ano - MOD(ano, 5) AS CHAR), COUNT(*) FROM veiculos WHERE disponivel = TRUE GROUP BY CAST(ano - MOD(ano, 5) AS CHAR);
@@ -0,0 +1,10 @@
+-- Marcadores de versão por tabela (GET condicional) e versão por linha de veículo (cache de fragmentos)
+CREATE TABLE IF NOT EXISTS versoes_tabelas (
+    tabela VARCHAR(30) PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 1,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO versoes_tabelas (tabela) VALUES ('veiculos'), ('clientes'), ('funcionarios');
+
+ALTER TABLE veiculos ADD COLUMN versao INT NOT NULL DEFAULT 1;
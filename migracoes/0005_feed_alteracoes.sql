@@ -0,0 +1,18 @@
+-- Feed de alterações (/api/mudancas): instante da última escrita de cada linha e marcas de exclusão
+ALTER TABLE veiculos
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE veiculos ADD INDEX idx_veiculos_updated (updated_at, id_veiculo);
+ALTER TABLE vendas
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE vendas ADD INDEX idx_vendas_updated (updated_at, id_venda);
+ALTER TABLE clientes
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE clientes ADD INDEX idx_clientes_updated (updated_at, id_cliente);
+
+CREATE TABLE IF NOT EXISTS exclusoes (
+    tabela VARCHAR(30) NOT NULL,
+    id_registro INT NOT NULL,
+    excluido_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (tabela, id_registro),
+    INDEX idx_exclusoes_feed (tabela, excluido_em, id_registro)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,5 @@
+-- Catálogo filtrado por marca, combustível ou cor sem ordenar em arquivo (apontado pelo bench.explicar):
+-- marca com ordem por preço, e combustível/cor na ordem padrão (marca, modelo)
+ALTER TABLE veiculos ADD INDEX idx_disp_marca_preco (disponivel, marca, preco, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_combustivel_marca (disponivel, combustivel, marca, modelo, id_veiculo);
+ALTER TABLE veiculos ADD INDEX idx_disp_cor_marca (disponivel, cor, marca, modelo, id_veiculo);
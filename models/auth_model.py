@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from infra import metricas, condicional
+
+_negativos = OrderedDict()
+_negativos_lock = threading.Lock()
+
+# Contas novas (ou emails alterados) avançam estas versões em versoes_tabelas;
+# o cache negativo só vale enquanto elas não mudarem, em qualquer worker
+TABELAS_CONTAS = ('clientes', 'funcionarios')
+
+
+def _versoes_contas():
+    """Versões das tabelas de contas no cache curto de condicional.versoes(); None sem banco"""
+    versoes = condicional.versoes()
+    if versoes is None:
+        return None
+    return tuple(versoes.get(tabela, (0, 0.0))[0] for tabela in TABELAS_CONTAS)
+
+
+def _negativo(email):
+    """Versões das contas de quando o email foi procurado e não existia, ou None"""
+    with _negativos_lock:
+        entrada = _negativos.get(email)
+        if entrada is None:
+            return None
+        expira, versoes = entrada
+        if expira < time.monotonic():
+            del _negativos[email]
+            return None
+        return versoes
+
+
+def _lembrar_desconhecido(email, versoes):
+    with _negativos_lock:
+        _negativos[email] = (time.monotonic() + Config.LOGIN_NEGATIVE_CACHE_TTL, versoes)
+        _negativos.move_to_end(email)
+        while len(_negativos) > Config.LOGIN_NEGATIVE_CACHE_MAX:
+            _negativos.popitem(last=False)
+
+
+def esquecer_email(email):
+    """Remove o email do cache negativo (chamado quando uma conta é criada/alterada)"""
+    if not email:
+        return
+    with _negativos_lock:
+        _negativos.pop(email.strip().lower(), None)
+
+
+def obter_identidades_por_email(email):
+    """
+    Resolve o email para as contas (cliente e/ou funcionário) em uma única consulta.
+    Retorna uma lista com tipo, id, nome, email, cargo e senha_hash; clientes primeiro.
+    Um email procurado há pouco e sem conta responde sem consultar o banco, enquanto
+    as versões das contas (relidas por cada worker a cada CONDITIONAL_VERSION_TTL)
+    não mudarem.
+    """
+    chave = email.strip().lower()
+    # As versões são lidas antes das contas: uma conta criada depois desta
+    # leitura avança a versão e o email deixa de valer como desconhecido
+    versoes = _versoes_contas()
+    lembrado = _negativo(chave)
+    desconhecido = lembrado is not None and lembrado == versoes
+    metricas.registrar_cache('login_negativo', desconhecido)
+    if desconhecido:
+        return []
+
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT 'cliente' AS tipo, id_cliente AS id, COALESCE(username, nome) AS nome,
+                   email, NULL AS cargo, senha_hash
+            FROM clientes WHERE email = %s
+            UNION ALL
+            SELECT 'funcionario' AS tipo, id_funcionario AS id, nome,
+                   email, cargo, senha_hash
+            FROM funcionarios WHERE email = %s
+        """, (email, email))
+        identidades = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    if identidades:
+        esquecer_email(chave)
+    elif versoes is not None:
+        _lembrar_desconhecido(chave, versoes)
+    # UNION ALL não garante ordem: cliente tem prioridade, como no login original
+    identidades.sort(key=lambda i: i['tipo'] != 'cliente')
+    return identidades
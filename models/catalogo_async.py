@@ -0,0 +1,46 @@
+"""
+Leituras do catálogo público para o modo async (asgi.py). O SQL é o mesmo do
+veiculo_model/faceta_model; só a execução passa pelo pool do aiomysql. Como lá,
+as falhas levantam exceção, para o catálogo vazio não ir para o cache de páginas.
+"""
+import asyncio
+
+from config import Config
+from infra import busca, pool_async
+from models import paginacao, veiculo_model, faceta_model
+
+
+async def listar_catalogo(filtros=None, ordem=None, apos=None, antes=None, por_pagina=None):
+    """Página do catálogo público (mesmo resultado de veiculo_model.listar_catalogo)"""
+    sql, params, fechamento = veiculo_model.consulta_catalogo(filtros, ordem, apos, antes, por_pagina)
+    try:
+        veiculos = await pool_async.consultar(sql, params, veiculo_model.Veiculo)
+        return paginacao.fechar_pagina(veiculos, *fechamento)
+    except Exception as e:
+        print(f"Erro ao listar catálogo: {e}")
+        raise
+
+
+async def buscar_veiculos_disponiveis(consulta, filtros=None, ordem=None):
+    """Busca textual nos veículos disponíveis (mesmo resultado de veiculo_model.buscar_veiculos_disponiveis)"""
+    # O índice é em memória, mas pode precisar ser montado/recarregado do banco: fora do event loop
+    ids = await asyncio.to_thread(busca.buscar, consulta, Config.SEARCH_RESULTS_MAX)
+    veiculo_model.exigir_indice_busca()
+    if not ids:
+        return []
+    sql, params = veiculo_model.consulta_busca(ids, filtros)
+    try:
+        linhas = await pool_async.consultar(sql, params, veiculo_model.Veiculo)
+    except Exception as e:
+        print(f"Erro ao buscar veículos: {e}")
+        raise
+    return veiculo_model.ordenar_resultado_busca(linhas, ids, ordem)
+
+
+async def obter_facetas():
+    """Contagens das facetas do catálogo (mesmo resultado de faceta_model.obter_facetas)"""
+    try:
+        return faceta_model.montar_facetas(await pool_async.consultar(faceta_model.SQL_FACETAS))
+    except Exception as e:
+        print(f"Erro ao obter facetas: {e}")
+        raise
@@ -1,35 +1,93 @@
-import bcrypt
 from config import Config
+from infra import senhas, pool, condicional
+from models import auth_model
+from models import paginacao
+from models.versao_model import tocar_versao
+from models.mudanca_model import registrar_exclusao
+from models.linhas import tipo_linha, sql_colunas, buscar_todas, buscar_uma
 
-def listar_clientes():
-    """Lista todos os clientes"""
+# Projeções: a lista e o perfil/formulário nunca trazem o senha_hash
+COLUNAS_LISTA = ('id_cliente', 'nome', 'cpf', 'telefone', 'email', 'endereco')
+COLUNAS_PERFIL = COLUNAS_LISTA + ('username', 'data_cadastro')
+ClienteLista = tipo_linha('ClienteLista', COLUNAS_LISTA)
+ClientePerfil = tipo_linha('ClientePerfil', COLUNAS_PERFIL)
+
+CHAVES_CLIENTES = [('nome', 'nome'), ('id_cliente', 'id_cliente')]
+
+def formatar_prefixo_cpf(digitos):
+    """'1234567' -> '123.456.7': prefixo no formato 000.000.000-00"""
+    partes = [digitos[:3], digitos[3:6], digitos[6:9]]
+    formatado = '.'.join(p for p in partes if p)
+    if len(digitos) > 9:
+        formatado += '-' + digitos[9:11]
+    return formatado
+
+def buscar_clientes_por_prefixo(texto, limite=None):
+    """Sugestões de clientes pelo início do nome ou do CPF (com ou sem pontuação)"""
+    limite = paginacao.tamanho_sugestoes(limite)
     conn = Config.get_db_connection()
     if not conn:
-        return None
-    
+        return []
+
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM clientes ORDER BY nome")
+        if texto[:1].isdigit():
+            digitos = ''.join(c for c in texto if c.isdigit())
+            cursor.execute("""
+                SELECT id_cliente, nome, cpf FROM clientes
+                WHERE cpf LIKE %s OR cpf LIKE %s
+                ORDER BY cpf LIMIT %s
+            """, (paginacao.padrao_prefixo(digitos), paginacao.padrao_prefixo(formatar_prefixo_cpf(digitos)), limite))
+        else:
+            cursor.execute("""
+                SELECT id_cliente, nome, cpf FROM clientes
+                WHERE nome LIKE %s
+                ORDER BY nome, id_cliente LIMIT %s
+            """, (paginacao.padrao_prefixo(texto), limite))
         clientes = cursor.fetchall()
         cursor.close()
         conn.close()
         return clientes
-    
+
     except Exception as e:
-        print(f"Erro ao listar clientes: {e}")
+        print(f"Erro ao buscar clientes: {e}")
         if conn:
             conn.close()
         return []
 
+def listar_clientes_paginado(apos=None, antes=None, por_pagina=None):
+    """Lista uma página de clientes ordenada por nome e id (keyset)"""
+    limite = paginacao.tamanho_pagina(por_pagina)
+    condicao, params, order_by, voltando = paginacao.montar_seek(CHAVES_CLIENTES, apos, antes)
+    conn = Config.get_db_connection()
+    if not conn:
+        return paginacao.pagina_vazia(limite)
+
+    try:
+        cursor = conn.cursor()
+        where = f"WHERE {condicao}" if condicao else ""
+        cursor.execute(f"SELECT {sql_colunas(COLUNAS_LISTA)} FROM clientes {where} ORDER BY {order_by} LIMIT %s",
+                       (*params, limite + 1))
+        clientes = buscar_todas(cursor, ClienteLista)
+        cursor.close()
+        conn.close()
+        return paginacao.fechar_pagina(clientes, CHAVES_CLIENTES, limite, voltando, bool(params))
+
+    except Exception as e:
+        print(f"Erro ao listar clientes: {e}")
+        if conn:
+            conn.close()
+        return paginacao.pagina_vazia(limite)
+
 def obter_cliente(id_cliente):
     """Obtém um cliente específico por ID"""
     conn = Config.get_db_connection()
     if not conn:
         return None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM clientes WHERE id_cliente = %s", (id_cliente,))
-        cliente = cursor.fetchone()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {sql_colunas(COLUNAS_PERFIL)} FROM clientes WHERE id_cliente = %s", (id_cliente,))
+        cliente = buscar_uma(cursor, ClientePerfil)
         cursor.close()
         conn.close()
         return cliente
@@ -40,10 +98,27 @@ def obter_cliente(id_cliente):
             conn.close()
         return None
 
-def adicionar_cliente(nome, cpf, telefone, email, endereco):
-    """Adiciona um novo cliente"""
+def obter_hash_cliente(id_cliente):
+    """Somente o senha_hash do cliente (conferência da senha atual na troca de senha)"""
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT senha_hash FROM clientes WHERE id_cliente = %s", (id_cliente,))
+        linha = cursor.fetchone()
+        cursor.close()
+        return linha[0] if linha else None
+    finally:
+        conn.close()
+
+def validar_cliente(nome, cpf, email, senha=None):
+    """Regras de validação de cliente; com senha, o email passa a ser obrigatório"""
     # Validação dos campos obrigatórios
-    if not nome or not cpf:
+    if senha is not None:
+        if not nome or not cpf or not email or not senha:
+            raise ValueError("Nome, CPF, email e senha são obrigatórios")
+    elif not nome or not cpf:
         raise ValueError("Nome e CPF são obrigatórios")
     
     # Validação de CPF (formato básico)
@@ -54,6 +129,10 @@ def adicionar_cliente(nome, cpf, telefone, email, endereco):
     # Validação de email
     if email and '@' not in email:
         raise ValueError("Email inválido")
+
+def adicionar_cliente(nome, cpf, telefone, email, endereco):
+    """Adiciona um novo cliente"""
+    validar_cliente(nome, cpf, email)
     
     conn = Config.get_db_connection()
     if not conn:
@@ -65,6 +144,10 @@ def adicionar_cliente(nome, cpf, telefone, email, endereco):
             VALUES (%s, %s, %s, %s, %s)
         """, (nome, cpf, telefone, email, endereco))
         conn.commit() # Salva permanetentemente os clientes na nossa tabela.
+        # A versão nova invalida o cache negativo do login nos outros workers
+        pool.apos_commit(tocar_versao, 'clientes')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
         cursor.close()
         return cursor.lastrowid
     
@@ -81,7 +164,9 @@ def obter_cliente_por_email(email):
         return None
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM clientes WHERE email = %s", (email,))
+        cursor.execute("""
+            SELECT id_cliente, nome, username, email, senha_hash FROM clientes WHERE email = %s
+        """, (email,))
         return cursor.fetchone()
     finally:
         conn.close()
@@ -90,19 +175,13 @@ def verificar_senha(senha_digitada, senha_hash_banco):
     """Verifica senha do cliente (se coluna existir)."""
     if not senha_hash_banco:
         return False
-    return bcrypt.checkpw(senha_digitada.encode('utf-8'), senha_hash_banco.encode('utf-8'))
+    return senhas.verificar(senha_digitada, senha_hash_banco)
 
 def adicionar_cliente_com_senha(nome, cpf, telefone, email, endereco, senha, username=None):
     """Adiciona um cliente com credenciais de acesso."""
-    if not nome or not cpf or not email or not senha:
-        raise ValueError("Nome, CPF, email e senha são obrigatórios")
-    cpf_limpo = cpf.replace('.', '').replace('-', '')
-    if len(cpf_limpo) != 11 or not cpf_limpo.isdigit():
-        raise ValueError("CPF inválido")
-    if '@' not in email:
-        raise ValueError("Email inválido")
+    validar_cliente(nome, cpf, email, senha)
 
-    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
+    senha_hash = senhas.gerar_hash(senha)
 
     conn = Config.get_db_connection()
     if not conn:
@@ -119,6 +198,9 @@ def adicionar_cliente_com_senha(nome, cpf, telefone, email, endereco, senha, use
         )
         cursor.close()
         conn.commit()
+        pool.apos_commit(tocar_versao, 'clientes')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
         return cursor.lastrowid
     except Exception as e:
         conn.rollback() # Controle de mudanças durante a criação do cliente
@@ -152,6 +234,10 @@ def atualizar_perfil_cliente(id_cliente, username, nome, email, cpf, telefone, e
         )
         cursor.close()
         conn.commit()
+        # Nome e CPF aparecem nos detalhes das vendas do cliente
+        pool.apos_commit(tocar_versao, 'clientes')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
     except Exception as e:
         conn.rollback()
         raise e
@@ -162,7 +248,23 @@ def atualizar_senha_cliente(id_cliente, nova_senha):
     """Atualiza a senha do cliente."""
     if len(nova_senha) < 6:
         raise ValueError("A senha deve ter pelo menos 6 caracteres")
-    senha_hash = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt())
+    senha_hash = senhas.gerar_hash(nova_senha)
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE clientes SET senha_hash=%s WHERE id_cliente=%s", (senha_hash, id_cliente))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cursor.close()
+        conn.close()
+
+def atualizar_hash_cliente(id_cliente, senha_hash):
+    """Regrava o hash da senha (rehash com novo custo do bcrypt)."""
     conn = Config.get_db_connection()
     if not conn:
         return None
@@ -208,6 +310,9 @@ def atualizar_cliente(id_cliente, nome, cpf, telefone, email, endereco):
             WHERE id_cliente=%s
         """, (nome, cpf, telefone, email, endereco, id_cliente))
         conn.commit()
+        pool.apos_commit(tocar_versao, 'clientes')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
     except Exception as e:
         conn.rollback()
         raise e
@@ -215,32 +320,27 @@ def atualizar_cliente(id_cliente, nome, cpf, telefone, email, endereco):
         cursor.close()
         conn.close()
 
+@pool.repetir_em_conflito
 def excluir_cliente(id_cliente):
-    """Exclui um cliente"""
+    """Exclui o cliente se ele não tiver vendas, conferindo e excluindo na mesma transação"""
     conn = Config.get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor()
     try:
+        # Travar o cliente impede que uma venda nova o referencie antes do DELETE
+        cursor.execute("SELECT id_cliente FROM clientes WHERE id_cliente=%s FOR UPDATE", (id_cliente,))
+        if not cursor.fetchone():
+            raise ValueError("Cliente não encontrado!")
+        cursor.execute("SELECT 1 FROM vendas WHERE id_cliente=%s LIMIT 1", (id_cliente,))
+        if cursor.fetchone():
+            raise ValueError("Não é possível excluir cliente que já possui vendas associadas!")
         cursor.execute("DELETE FROM clientes WHERE id_cliente=%s", (id_cliente,))
+        registrar_exclusao(cursor, 'clientes', id_cliente)
         conn.commit()
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         cursor.close()
-        conn.close()
-
-def cliente_ja_tem_vendas(id_cliente):
-    """Verifica se cliente tem vendas associadas"""
-    conn = Config.get_db_connection()
-    if not conn:
-        return None
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT COUNT(*) as total FROM vendas WHERE id_cliente=%s", (id_cliente,))
-        result = cursor.fetchone()
-        return result[0] > 0
-    finally:
-        conn.close()
-        cursor.close()
\ No newline at end of file
+        conn.close()
\ No newline at end of file
@@ -0,0 +1,100 @@
+from config import Config
+
+# Dimensões das facetas -> expressão sobre veiculos (ano agrupado em faixas de 5 anos)
+DIMENSOES_FACETAS = {
+    'marca': 'marca',
+    'combustivel': "COALESCE(combustivel, '')",
+    'cor': "COALESCE(cor, '')",
+    'ano': 'CAST(ano - MOD(ano, 5) AS CHAR)',
+}
+LARGURA_FAIXA_ANO = 5
+
+
+def _select_dimensoes(filtro):
+    return '\nUNION ALL\n'.join(
+        f"SELECT '{dimensao}' AS dimensao, {expr} AS valor, COUNT(*) AS total "
+        f"FROM veiculos WHERE {filtro} GROUP BY {expr}"
+        for dimensao, expr in DIMENSOES_FACETAS.items()
+    )
+
+
+def ajustar_facetas(cursor, sinal, id_veiculo, disponivel=True):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) o veículo das contagens de facetas, se
+    ele estiver disponível. Deve rodar na mesma transação da escrita: -1 antes
+    de alterar/excluir o veículo e +1 depois de inserir/alterar. Logo após uma
+    reserva (disponivel já FALSE, com a linha travada) use disponivel=False.
+    """
+    estado = 'TRUE' if disponivel else 'FALSE'
+    cursor.execute(f"""
+        INSERT INTO veiculos_facetas (dimensao, valor, total)
+        SELECT dimensao, valor, %s * total FROM (
+            {_select_dimensoes(f'id_veiculo = %s AND disponivel = {estado}')}
+        ) d
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+    """, (sinal, *([id_veiculo] * len(DIMENSOES_FACETAS))))
+
+
+SQL_FACETAS = """
+    SELECT dimensao, valor, total FROM veiculos_facetas
+    WHERE total > 0 AND valor <> ''
+    ORDER BY dimensao, valor
+"""
+
+
+def montar_facetas(linhas):
+    """Agrupa as linhas de SQL_FACETAS por dimensão, com a faixa das facetas de ano"""
+    facetas = {dimensao: [] for dimensao in DIMENSOES_FACETAS}
+    for linha in linhas:
+        item = {'valor': linha['valor'], 'total': linha['total']}
+        if linha['dimensao'] == 'ano':
+            inicio = int(linha['valor'])
+            item['ano_min'], item['ano_max'] = inicio, inicio + LARGURA_FAIXA_ANO - 1
+        facetas.setdefault(linha['dimensao'], []).append(item)
+    # Anos mais novos primeiro
+    facetas['ano'].reverse()
+    return facetas
+
+
+def obter_facetas():
+    """Contagens dos veículos disponíveis por marca, combustível, cor e faixa de ano; levanta exceção se o banco falhar"""
+    conn = Config.get_db_connection()
+    if not conn:
+        raise ConnectionError("Sem conexão com o banco de dados")
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(SQL_FACETAS)
+        facetas = montar_facetas(cursor.fetchall())
+        cursor.close()
+        conn.close()
+        return facetas
+
+    except Exception as e:
+        print(f"Erro ao obter facetas: {e}")
+        if conn:
+            conn.close()
+        raise
+
+
+def reconstruir_facetas():
+    """Recalcula veiculos_facetas do zero (após importações em lote ou para corrigir divergências)"""
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM veiculos_facetas")
+        cursor.execute(f"""
+            INSERT INTO veiculos_facetas (dimensao, valor, total)
+            {_select_dimensoes('disponivel = TRUE')}
+        """)
+        linhas = cursor.rowcount
+        conn.commit()
+        return linhas
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cursor.close()
+        conn.close()
@@ -1,5 +1,13 @@
-import bcrypt
 from config import Config
+from infra import senhas, pool, condicional
+from models import auth_model
+from models import paginacao
+from models.versao_model import tocar_versao
+from models.linhas import tipo_linha, sql_colunas, buscar_uma
+
+# Projeção do formulário de edição (sem o senha_hash)
+COLUNAS_FORMULARIO = ('id_funcionario', 'nome', 'email', 'cargo', 'data_admissao')
+FuncionarioFormulario = tipo_linha('FuncionarioFormulario', COLUNAS_FORMULARIO)
 
 def listar_funcionarios():
     """Lista todos os funcionários"""
@@ -21,15 +29,41 @@ def listar_funcionarios():
             conn.close()
         return []
 
+def buscar_funcionarios_por_prefixo(texto, limite=None):
+    """Sugestões de funcionários pelo início do nome"""
+    limite = paginacao.tamanho_sugestoes(limite)
+    conn = Config.get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id_funcionario, nome, cargo FROM funcionarios
+            WHERE nome LIKE %s
+            ORDER BY nome, id_funcionario LIMIT %s
+        """, (paginacao.padrao_prefixo(texto), limite))
+        funcionarios = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return funcionarios
+
+    except Exception as e:
+        print(f"Erro ao buscar funcionários: {e}")
+        if conn:
+            conn.close()
+        return []
+
 def obter_funcionario(id_funcionario):
     """Obtém um funcionário específico por ID"""
     conn = Config.get_db_connection()
     if not conn:
         return None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM funcionarios WHERE id_funcionario = %s", (id_funcionario,))
-        funcionario = cursor.fetchone()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {sql_colunas(COLUNAS_FORMULARIO)} FROM funcionarios WHERE id_funcionario = %s",
+                       (id_funcionario,))
+        funcionario = buscar_uma(cursor, FuncionarioFormulario)
         cursor.close()
         conn.close()
         return funcionario
@@ -47,7 +81,9 @@ def obter_funcionario_por_email(email):
         return None
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM funcionarios WHERE email = %s", (email,))
+        cursor.execute("""
+            SELECT id_funcionario, nome, email, cargo, senha_hash FROM funcionarios WHERE email = %s
+        """, (email,))
         funcionario = cursor.fetchone()
         cursor.close()
         conn.close()
@@ -61,7 +97,7 @@ def obter_funcionario_por_email(email):
 
 def verificar_senha(senha_digitada, senha_hash_banco):
     """Verifica se a senha digitada corresponde ao hash"""
-    return bcrypt.checkpw(senha_digitada.encode('utf-8'), senha_hash_banco.encode('utf-8'))
+    return senhas.verificar(senha_digitada, senha_hash_banco)
 
 def adicionar_funcionario(nome, email, senha, cargo):
     """Adiciona um novo funcionário"""
@@ -74,7 +110,7 @@ def adicionar_funcionario(nome, email, senha, cargo):
         raise ValueError("Email inválido")
     
     # Hash da senha
-    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
+    senha_hash = senhas.gerar_hash(senha)
     
     conn = Config.get_db_connection()
     if not conn:
@@ -86,6 +122,10 @@ def adicionar_funcionario(nome, email, senha, cargo):
             VALUES (%s, %s, %s, %s)
         """, (nome, email, senha_hash, cargo))
         conn.commit()
+        # A versão nova invalida o cache negativo do login nos outros workers
+        pool.apos_commit(tocar_versao, 'funcionarios')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
         return cursor.lastrowid
     except Exception as e:
         conn.rollback()
@@ -107,7 +147,7 @@ def atualizar_funcionario(id_funcionario, nome, email, cargo, senha=None):
     try:
         if senha:
             # Hash da nova senha
-            senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
+            senha_hash = senhas.gerar_hash(senha)
             cursor.execute("""
                 UPDATE funcionarios
                 SET nome=%s, email=%s, cargo=%s, senha_hash=%s
@@ -120,6 +160,10 @@ def atualizar_funcionario(id_funcionario, nome, email, cargo, senha=None):
                 WHERE id_funcionario=%s
             """, (nome, email, cargo, id_funcionario))
         conn.commit()
+        # O nome do funcionário aparece nos detalhes das vendas
+        pool.apos_commit(tocar_versao, 'funcionarios')
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(auth_model.esquecer_email, email)
     except Exception as e:
         conn.rollback()
         raise e
@@ -127,14 +171,14 @@ def atualizar_funcionario(id_funcionario, nome, email, cargo, senha=None):
         cursor.close()
         conn.close()
 
-def excluir_funcionario(id_funcionario):
-    """Exclui um funcionário"""
+def atualizar_hash_funcionario(id_funcionario, senha_hash):
+    """Regrava o hash da senha (rehash com novo custo do bcrypt)"""
     conn = Config.get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM funcionarios WHERE id_funcionario = %s", (id_funcionario,))
+        cursor.execute("UPDATE funcionarios SET senha_hash=%s WHERE id_funcionario=%s", (senha_hash, id_funcionario))
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -143,19 +187,26 @@ def excluir_funcionario(id_funcionario):
         cursor.close()
         conn.close()
 
-def funcionario_tem_vendas(id_funcionario: int) -> bool:
-    """Retorna True se o funcionário possui vendas vinculadas."""
+@pool.repetir_em_conflito
+def excluir_funcionario(id_funcionario):
+    """Exclui o funcionário se ele não tiver vendas, conferindo e excluindo na mesma transação"""
     conn = Config.get_db_connection()
     if not conn:
-        return False
+        return None
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT COUNT(*) FROM vendas WHERE id_funcionario=%s", (id_funcionario,))
-        total = cursor.fetchone()[0]
-        return total > 0
+        # Travar o funcionário impede que uma venda nova o referencie antes do DELETE
+        cursor.execute("SELECT id_funcionario FROM funcionarios WHERE id_funcionario = %s FOR UPDATE", (id_funcionario,))
+        if not cursor.fetchone():
+            raise ValueError("Funcionário não encontrado!")
+        cursor.execute("SELECT 1 FROM vendas WHERE id_funcionario = %s LIMIT 1", (id_funcionario,))
+        if cursor.fetchone():
+            raise ValueError("Não é possível excluir: o funcionário possui vendas vinculadas.")
+        cursor.execute("DELETE FROM funcionarios WHERE id_funcionario = %s", (id_funcionario,))
+        conn.commit()
     except Exception as e:
-        print(f"Erro ao verificar vendas do funcionário: {e}")
-        return False
+        conn.rollback()
+        raise e
     finally:
         cursor.close()
         conn.close()
\ No newline at end of file
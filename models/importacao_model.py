@@ -0,0 +1,149 @@
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from config import Config
+from infra import senhas, busca, condicional
+from infra.cache_paginas import invalidar_catalogo
+from models import auth_model, faceta_model, versao_model
+from models.cliente_model import validar_cliente
+from models.veiculo_model import validar_veiculo
+
+SQL_VEICULO = """
+    INSERT INTO veiculos (marca, modelo, ano, preco, km_rodados, cor, combustivel)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+SQL_CLIENTE = """
+    INSERT INTO clientes (nome, username, cpf, telefone, email, endereco, senha_hash)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _texto(linha, campo):
+    return (linha.get(campo) or '').strip()
+
+
+def _preparar_veiculo(linha):
+    """Valida a linha do CSV com as mesmas regras do cadastro e monta a tupla do INSERT"""
+    marca, modelo = _texto(linha, 'marca'), _texto(linha, 'modelo')
+    ano, preco = _texto(linha, 'ano'), _texto(linha, 'preco')
+    validar_veiculo(marca, modelo, ano, preco)
+    km = _texto(linha, 'km_rodados') or '0'
+    if not km.isdigit():
+        raise ValueError("KM inválido")
+    return (marca, modelo, int(ano), preco, int(km),
+            _texto(linha, 'cor') or None, _texto(linha, 'combustivel') or None), None
+
+
+def _preparar_cliente(linha):
+    """Valida o cliente; a senha (opcional) volta à parte para ser hasheada em lote"""
+    nome, cpf = _texto(linha, 'nome'), _texto(linha, 'cpf')
+    email = _texto(linha, 'email') or None
+    senha = linha.get('senha') or None
+    validar_cliente(nome, cpf, email, senha)
+    if senha and len(senha) < 6:
+        raise ValueError("A senha deve ter pelo menos 6 caracteres")
+    valores = [nome, _texto(linha, 'username') or None, cpf, _texto(linha, 'telefone') or None,
+               email, _texto(linha, 'endereco') or None, None]
+    return valores, senha
+
+
+TIPOS = {
+    'veiculos': (_preparar_veiculo, SQL_VEICULO),
+    'clientes': (_preparar_cliente, SQL_CLIENTE),
+}
+
+
+def _hashear_senhas(processos, lote):
+    """Preenche senha_hash das linhas com senha usando o pool de processos"""
+    pendentes = [(valores, senha) for valores, senha in lote if senha]
+    if not pendentes:
+        return
+    custo = senhas.custo_atual()
+    hashes = processos.map(senhas.hashpw_sem_medir, [s for _, s in pendentes], [custo] * len(pendentes))
+    for (valores, _), senha_hash in zip(pendentes, hashes):
+        valores[-1] = senha_hash
+
+
+def _gravar_lote(conn, sql, lote, erros):
+    """
+    Grava o lote com um executemany numa transação. Se o lote falhar (ex.: CPF
+    duplicado), regrava linha a linha para isolar os erros sem perder o resto.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(sql, [tuple(valores) for _, valores in lote])
+        conn.commit()
+        return len(lote)
+    except Exception:
+        conn.rollback()
+    inseridos = 0
+    for numero, valores in lote:
+        try:
+            cursor.execute(sql, tuple(valores))
+            inseridos += 1
+        except Exception as e:
+            erros.append((numero, str(e)))
+    conn.commit()
+    cursor.close()
+    return inseridos
+
+
+def importar_csv(tipo, arquivo, tamanho_lote=None):
+    """
+    Importa veículos ou clientes de um arquivo CSV (objeto texto) em lotes.
+    Retorna {'inseridos': n, 'erros': [(linha, mensagem), ...]}; linhas inválidas
+    são reportadas sem interromper a importação do restante do arquivo.
+    """
+    if tipo not in TIPOS:
+        raise ValueError("Tipo de importação deve ser 'veiculos' ou 'clientes'")
+    preparar, sql = TIPOS[tipo]
+    tamanho_lote = tamanho_lote or Config.IMPORT_CHUNK_SIZE
+    leitor = csv.DictReader(arquivo)
+    resultado = {'inseridos': 0, 'erros': []}
+
+    conn = Config.get_db_connection()
+    if not conn:
+        raise RuntimeError("Não foi possível conectar ao banco de dados")
+    # spawn: um fork do processo web copiaria travas (métricas, pool) seguradas por outras threads
+    processos = ProcessPoolExecutor(max_workers=Config.IMPORT_HASH_PROCESSES,
+                                    mp_context=multiprocessing.get_context('spawn')) if tipo == 'clientes' else None
+    try:
+        # Linha 1 é o cabeçalho; numeração igual à de uma planilha
+        numerado = enumerate(leitor, start=2)
+        while True:
+            linhas = list(islice(numerado, tamanho_lote))
+            if not linhas:
+                break
+            validas = []
+            for numero, linha in linhas:
+                try:
+                    validas.append((numero,) + preparar(linha))
+                except ValueError as e:
+                    resultado['erros'].append((numero, str(e)))
+            if processos:
+                _hashear_senhas(processos, [(valores, senha) for _, valores, senha in validas])
+            lote = [(numero, valores) for numero, valores, _ in validas]
+            inseridos = _gravar_lote(conn, sql, lote, resultado['erros']) if lote else 0
+            resultado['inseridos'] += inseridos
+            if tipo == 'clientes':
+                if inseridos:
+                    versao_model.tocar_versao('clientes')
+                    condicional.esquecer_versoes()
+                for _, valores in lote:
+                    auth_model.esquecer_email(valores[4])
+    finally:
+        if processos:
+            processos.shutdown()
+        conn.close()
+
+    if tipo == 'veiculos' and resultado['inseridos']:
+        faceta_model.reconstruir_facetas()
+        versao_model.tocar_versao('veiculos')
+        invalidar_catalogo()
+        condicional.esquecer_versoes()
+        # executemany não devolve os ids inseridos: recarrega o índice inteiro
+        busca.reconstruir_em_segundo_plano()
+    resultado['erros'].sort()
+    return resultado
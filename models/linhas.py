@@ -0,0 +1,57 @@
+"""
+Linhas compactas para as leituras dos models. Cada projeção (as colunas que uma
+tela realmente usa) vira um tipo baseado em namedtuple, sem __dict__ por linha:
+os valores ficam numa tupla e os nomes das colunas uma única vez, na classe.
+
+Os tipos aceitam acesso por atributo (veiculo.marca, como nos templates) e por
+nome (veiculo['marca'], veiculo.get('foto')), como os dicionários do
+cursor(dictionary=True) que substituem.
+"""
+from collections import namedtuple
+
+
+def tipo_linha(nome, colunas):
+    """Cria o tipo de linha de uma projeção (colunas na mesma ordem do SELECT)"""
+    base = namedtuple(nome, colunas)
+
+    class Linha(base):
+        __slots__ = ()
+
+        def __getitem__(self, chave):
+            if isinstance(chave, str):
+                if chave not in self._fields:
+                    raise KeyError(chave)
+                return getattr(self, chave)
+            return tuple.__getitem__(self, chave)
+
+        def __contains__(self, chave):
+            return chave in self._fields
+
+        def get(self, chave, padrao=None):
+            return getattr(self, chave) if chave in self._fields else padrao
+
+        def keys(self):
+            return self._fields
+
+        def items(self):
+            return zip(self._fields, self)
+
+    Linha.__name__ = Linha.__qualname__ = nome
+    return Linha
+
+
+def sql_colunas(colunas, tabela=None):
+    """'a, b, c' (ou 't.a, t.b, t.c') para o SELECT de uma projeção"""
+    if tabela:
+        return ', '.join(f"{tabela}.{c}" for c in colunas)
+    return ', '.join(colunas)
+
+
+def buscar_todas(cursor, tipo):
+    """fetchall de um cursor comum (tuplas) convertido para o tipo da projeção"""
+    return list(map(tipo._make, cursor.fetchall()))
+
+
+def buscar_uma(cursor, tipo):
+    linha = cursor.fetchone()
+    return tipo._make(linha) if linha is not None else None
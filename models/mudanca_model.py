@@ -0,0 +1,138 @@
+"""
+Feed de alterações de veículos, vendas e clientes para as integrações (site dos
+parceiros, DMS). Cada linha guarda em updated_at o instante da última escrita
+(ON UPDATE do próprio MySQL) e cada exclusão deixa uma marca em `exclusoes`;
+o feed lê as duas fontes na ordem (instante, id, tipo) a partir do cursor recebido.
+"""
+from config import Config
+from models import paginacao
+from models.linhas import tipo_linha, sql_colunas, buscar_todas
+
+# entidade -> (chave primária, colunas entregues no feed). clientes nunca leva o senha_hash
+ENTIDADES = {
+    'veiculos': ('id_veiculo', ('id_veiculo', 'marca', 'modelo', 'ano', 'preco', 'disponivel', 'foto',
+                                'km_rodados', 'cor', 'combustivel')),
+    'vendas': ('id_venda', ('id_venda', 'id_cliente', 'id_funcionario', 'id_veiculo', 'data_venda',
+                            'valor_final', 'forma_pagamento', 'observacoes')),
+    'clientes': ('id_cliente', ('id_cliente', 'nome', 'username', 'cpf', 'telefone', 'email', 'endereco',
+                                'data_cadastro')),
+}
+TIPOS = {entidade: tipo_linha(f"Mudanca_{entidade}", colunas + ('updated_at',))
+         for entidade, (_, colunas) in ENTIDADES.items()}
+Exclusao = tipo_linha('Exclusao', ('id_registro', 'excluido_em'))
+# Desempate entre uma alteração e uma exclusão com o mesmo (instante, id)
+ORDEM_TIPOS = {'alterado': 0, 'excluido': 1}
+
+# Corte do feed: antes do início da transação aberta mais antiga que já travou ou
+# alterou linhas (o updated_at dela pode ser menor que o instante do commit), e
+# nunca depois de NOW(6) - FEED_SAFETY_LAG. Ler innodb_trx exige o privilégio PROCESS
+SQL_CORTE = """
+    SELECT LEAST(NOW(6) - INTERVAL %s MICROSECOND,
+                 COALESCE(MIN(trx_started), NOW(6)))
+    FROM information_schema.innodb_trx
+    WHERE trx_mysql_thread_id <> CONNECTION_ID() AND (trx_rows_locked > 0 OR trx_rows_modified > 0)
+"""
+
+
+def registrar_exclusao(cursor, tabela, id_registro):
+    """Marca a exclusão para o feed; roda na mesma transação do DELETE"""
+    cursor.execute("""
+        INSERT INTO exclusoes (tabela, id_registro, excluido_em) VALUES (%s, %s, CURRENT_TIMESTAMP(6))
+        ON DUPLICATE KEY UPDATE excluido_em = CURRENT_TIMESTAMP(6)
+    """, (tabela, id_registro))
+
+
+def _ler(cursor, sql, colunas, desde, inclusivo, params, limite, tipo):
+    """Linhas da fonte depois do cursor (ou a partir dele, com `inclusivo`), em ordem de `colunas`"""
+    tupla = ', '.join(colunas)
+    if desde:
+        sql += f" AND ({tupla}) {'>=' if inclusivo else '>'} (%s, %s)"
+        params = [*params, *desde[:2]]
+    cursor.execute(f"{sql} ORDER BY {tupla} LIMIT %s", (*params, limite))
+    return buscar_todas(cursor, tipo)
+
+
+_sem_innodb_trx = False
+
+
+def _corte(cursor):
+    global _sem_innodb_trx
+    lag = int(Config.FEED_SAFETY_LAG * 1000000)
+    if not _sem_innodb_trx:
+        try:
+            cursor.execute(SQL_CORTE, (lag,))
+            return cursor.fetchone()[0]
+        except Exception as e:
+            # Sem o privilégio PROCESS sobra só o atraso fixo (avisa uma vez por worker)
+            _sem_innodb_trx = True
+            print(f"Aviso: feed sem acesso a information_schema.innodb_trx ({e}); usando só FEED_SAFETY_LAG")
+    cursor.execute("SELECT NOW(6) - INTERVAL %s MICROSECOND", (lag,))
+    return cursor.fetchone()[0]
+
+
+def _decodificar(desde):
+    """[instante, id, tipo] do cursor; cursores antigos de 2 valores valem como depois do par"""
+    valores = paginacao.decodificar_cursor(desde, 3)
+    if valores is None:
+        valores = paginacao.decodificar_cursor(desde, 2)
+        if valores is not None:
+            valores.append(ORDEM_TIPOS['excluido'])
+    if valores is None or valores[2] not in ORDEM_TIPOS.values():
+        raise ValueError("Cursor inválido")
+    return valores
+
+
+def listar_mudancas(entidade, desde=None, limite=None):
+    """
+    Linhas alteradas e excluídas depois do cursor `desde`, em ordem de (instante, id, tipo).
+    Retorna {'itens', 'proximo', 'tem_mais'}; o próximo pedido usa `proximo` como
+    `desde` (sem mudanças, o cursor volta igual). Levanta ValueError se a entidade
+    ou o cursor forem inválidos; retorna None se o banco não respondeu.
+    """
+    if entidade not in ENTIDADES:
+        raise ValueError(f"Entidade inválida: {entidade}")
+    valores = _decodificar(desde) if desde else None
+    limite = paginacao.tamanho_pagina(limite, Config.FEED_PAGE_SIZE, Config.FEED_PAGE_SIZE_MAX)
+    chave, colunas = ENTIDADES[entidade]
+
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        # Um corte único para as duas fontes
+        corte = _corte(cursor)
+
+        # No mesmo (instante, id) a alteração vem antes da exclusão: depois de um
+        # cursor numa alteração, a exclusão do mesmo par ainda entra
+        alteradas = _ler(cursor, f"SELECT {sql_colunas(colunas)}, updated_at FROM {entidade} WHERE updated_at <= %s",
+                         ('updated_at', chave), valores, False, [corte], limite + 1, TIPOS[entidade])
+        excluidas = _ler(cursor, "SELECT id_registro, excluido_em FROM exclusoes WHERE tabela = %s AND excluido_em <= %s",
+                         ('excluido_em', 'id_registro'), valores,
+                         bool(valores) and valores[2] < ORDEM_TIPOS['excluido'], [entidade, corte], limite + 1, Exclusao)
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Erro ao listar mudanças de {entidade}: {e}")
+        if conn:
+            conn.close()
+        return None
+
+    itens = [(linha.updated_at, linha[chave], ORDEM_TIPOS['alterado'], 'alterado', linha) for linha in alteradas]
+    itens += [(linha.excluido_em, linha.id_registro, ORDEM_TIPOS['excluido'], 'excluido', None) for linha in excluidas]
+    itens.sort(key=lambda item: item[:3])
+    tem_mais = len(itens) > limite
+    itens = itens[:limite]
+
+    proximo = paginacao.codificar_cursor(itens[-1][:3]) if itens else desde
+    return {
+        'itens': [{
+            'tipo': tipo,
+            'id': id_registro,
+            'alterado_em': paginacao.serializar_valor(instante),
+            'dados': {col: paginacao.serializar_valor(linha[col]) for col in colunas} if linha else None,
+        } for instante, id_registro, _, tipo, linha in itens],
+        'proximo': proximo,
+        'tem_mais': tem_mais,
+    }
@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from config import Config
+
+
+def serializar_valor(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(valores):
+    """Transforma os valores da chave de ordenação num token opaco para a URL"""
+    dados = json.dumps([serializar_valor(v) for v in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token, tamanho):
+    """Recupera os valores da chave a partir do token; retorna None se inválido"""
+    if not token:
+        return None
+    try:
+        preenchido = token + '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(preenchido.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        return None
+    return valores
+
+
+def tamanho_pagina(valor=None, padrao=None, maximo=None):
+    """Normaliza o tamanho de página pedido, respeitando o máximo configurado"""
+    padrao = padrao or Config.PAGE_SIZE
+    try:
+        tamanho = int(valor) if valor else padrao
+    except (TypeError, ValueError):
+        tamanho = padrao
+    return max(1, min(tamanho, maximo or Config.PAGE_SIZE_MAX))
+
+
+def tamanho_sugestoes(valor=None):
+    """Tamanho das páginas do autocompletar (bem menores que as das listagens)"""
+    return tamanho_pagina(valor, Config.TYPEAHEAD_SIZE, Config.TYPEAHEAD_SIZE_MAX)
+
+
+def padrao_prefixo(texto):
+    """Padrão LIKE 'texto%' com os curingas do texto escapados; assim o índice da coluna é usado"""
+    escapado = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escapado + '%'
+
+
+def montar_seek(chaves, apos=None, antes=None, decrescente=False):
+    """
+    Monta o trecho WHERE/ORDER BY da paginação por chave (keyset).
+
+    `chaves` é uma lista de (expressão SQL, nome da coluna no resultado) que
+    forma uma ordenação estável (a última deve ser a chave primária).
+    Retorna (condição, parâmetros, order_by, voltando).
+    """
+    colunas = [expr for expr, _ in chaves]
+    voltando = False
+    valores = decodificar_cursor(apos, len(chaves))
+    if valores is None:
+        valores = decodificar_cursor(antes, len(chaves))
+        voltando = valores is not None
+
+    # Ao voltar uma página a comparação e a ordenação se invertem
+    crescente = decrescente == voltando
+    sentido = 'ASC' if crescente else 'DESC'
+    order_by = ', '.join(f"{col} {sentido}" for col in colunas)
+
+    if valores is None:
+        return '', [], order_by, False
+    operador = '>' if crescente else '<'
+    tupla = ', '.join(colunas)
+    marcadores = ', '.join(['%s'] * len(colunas))
+    return f"({tupla}) {operador} ({marcadores})", valores, order_by, voltando
+
+
+def fechar_pagina(linhas, chaves, limite, voltando, com_cursor):
+    """Corta a linha extra buscada, restaura a ordem e gera os cursores vizinhos"""
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    if voltando:
+        linhas.reverse()
+
+    def cursor_de(linha):
+        return codificar_cursor([linha[nome] for _, nome in chaves])
+
+    if voltando:
+        tem_anterior, tem_proxima = tem_mais, True
+    else:
+        tem_anterior, tem_proxima = com_cursor, tem_mais
+
+    return {
+        'itens': linhas,
+        'anterior': cursor_de(linhas[0]) if linhas and tem_anterior else None,
+        'proximo': cursor_de(linhas[-1]) if linhas and tem_proxima else None,
+        'por_pagina': limite,
+    }
+
+
+def pagina_vazia(limite):
+    return {'itens': [], 'anterior': None, 'proximo': None, 'por_pagina': limite}
@@ -1,44 +1,212 @@
 from config import Config
+from models import paginacao
+from models.linhas import tipo_linha, sql_colunas, buscar_todas, buscar_uma
+from infra.cache_paginas import invalidar_catalogo
+from infra import busca, pool, condicional
+from models.venda_model import ajustar_resumo
+from models.faceta_model import ajustar_facetas
+from models.versao_model import tocar_versao
+from models.mudanca_model import registrar_exclusao
 
-def listar_veiculos():
-    """Lista todos os veículos"""
+# Projeções: colunas de cada leitura (a ordem é a do SELECT)
+COLUNAS_VEICULO = ('id_veiculo', 'marca', 'modelo', 'ano', 'preco', 'disponivel', 'foto', 'km_rodados', 'cor', 'combustivel',
+                   'versao')
+COLUNAS_INDICE = ('id_veiculo', 'marca', 'modelo', 'ano', 'cor', 'combustivel', 'disponivel')
+Veiculo = tipo_linha('Veiculo', COLUNAS_VEICULO)
+VeiculoIndice = tipo_linha('VeiculoIndice', COLUNAS_INDICE)
+SELECT_VEICULO = f"SELECT {sql_colunas(COLUNAS_VEICULO)} FROM veiculos"
+
+CHAVES_VEICULOS = [('marca', 'marca'), ('modelo', 'modelo'), ('id_veiculo', 'id_veiculo')]
+
+# Ordenações do catálogo público -> (chaves do keyset, decrescente)
+ORDENS_CATALOGO = {
+    'preco': ([('preco', 'preco'), ('id_veiculo', 'id_veiculo')], False),
+    'preco_desc': ([('preco', 'preco'), ('id_veiculo', 'id_veiculo')], True),
+    'ano': ([('ano', 'ano'), ('id_veiculo', 'id_veiculo')], False),
+    'ano_desc': ([('ano', 'ano'), ('id_veiculo', 'id_veiculo')], True),
+    'km': ([('km_rodados', 'km_rodados'), ('id_veiculo', 'id_veiculo')], False),
+}
+
+# Filtros do catálogo -> condição SQL (igualdade ou faixa)
+FILTROS_CATALOGO = {
+    'marca': 'marca = %s',
+    'combustivel': 'combustivel = %s',
+    'cor': 'cor = %s',
+    'ano_min': 'ano >= %s',
+    'ano_max': 'ano <= %s',
+    'preco_min': 'preco >= %s',
+    'preco_max': 'preco <= %s',
+    'km_min': 'km_rodados >= %s',
+    'km_max': 'km_rodados <= %s',
+}
+
+def listar_veiculos_paginado(apos=None, antes=None, por_pagina=None):
+    """Lista uma página de veículos ordenada por marca, modelo e id (keyset)"""
+    limite = paginacao.tamanho_pagina(por_pagina)
+    condicao, params, order_by, voltando = paginacao.montar_seek(CHAVES_VEICULOS, apos, antes)
     conn = Config.get_db_connection()
     if not conn:
-        return None
-    
+        return paginacao.pagina_vazia(limite)
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM veiculos ORDER BY marca, modelo")
-        veiculos = cursor.fetchall()
+        cursor = conn.cursor()
+        where = f"WHERE {condicao}" if condicao else ""
+        cursor.execute(f"{SELECT_VEICULO} {where} ORDER BY {order_by} LIMIT %s", (*params, limite + 1))
+        veiculos = buscar_todas(cursor, Veiculo)
         cursor.close()
         conn.close()
-        return veiculos
-    
+        return paginacao.fechar_pagina(veiculos, CHAVES_VEICULOS, limite, voltando, bool(params))
+
     except Exception as e:
         print(f"Erro ao listar veículos: {e}")
         if conn:
             conn.close()
-        return []
+        return paginacao.pagina_vazia(limite)
 
-def listar_veiculos_disponiveis():
-    """Lista apenas veículos disponíveis"""
+def listar_veiculos_para_indice():
+    """Colunas usadas pelo índice de busca, de todos os veículos"""
     conn = Config.get_db_connection()
     if not conn:
         return None
-    
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM veiculos WHERE disponivel=TRUE ORDER BY marca, modelo")
-        veiculos = cursor.fetchall()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {sql_colunas(COLUNAS_INDICE)} FROM veiculos")
+        veiculos = buscar_todas(cursor, VeiculoIndice)
         cursor.close()
         conn.close()
         return veiculos
-    
+
     except Exception as e:
-        print(f"Erro ao listar veículos disponíveis: {e}")
+        print(f"Erro ao carregar veículos para a busca: {e}")
         if conn:
             conn.close()
+        return None
+
+def obter_veiculos_por_ids(ids):
+    """Obtém vários veículos pela chave primária, na mesma ordem dos ids"""
+    if not ids:
+        return []
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"{SELECT_VEICULO} WHERE id_veiculo IN ({marcadores})", tuple(ids))
+        por_id = {v.id_veiculo: v for v in buscar_todas(cursor, Veiculo)}
+        cursor.close()
+        conn.close()
+        return [por_id[i] for i in ids if i in por_id]
+
+    except Exception as e:
+        print(f"Erro ao obter veículos: {e}")
+        if conn:
+            conn.close()
+        return []
+
+def _condicoes_catalogo(filtros):
+    condicoes, params = ["disponivel = TRUE"], []
+    for nome, valor in (filtros or {}).items():
+        if nome in FILTROS_CATALOGO and valor not in (None, ''):
+            condicoes.append(FILTROS_CATALOGO[nome])
+            params.append(valor)
+    return condicoes, params
+
+def consulta_catalogo(filtros=None, ordem=None, apos=None, antes=None, por_pagina=None):
+    """
+    SQL e parâmetros de uma página do catálogo, mais o necessário para fechar a
+    página com paginacao.fechar_pagina (compartilhado com models.catalogo_async).
+    """
+    chaves, decrescente = ORDENS_CATALOGO.get(ordem, (CHAVES_VEICULOS, False))
+    limite = paginacao.tamanho_pagina(por_pagina)
+    seek, params_seek, order_by, voltando = paginacao.montar_seek(chaves, apos, antes, decrescente)
+    condicoes, params = _condicoes_catalogo(filtros)
+    if seek:
+        condicoes.append(seek)
+    sql = f"""
+        {SELECT_VEICULO} WHERE {' AND '.join(condicoes)}
+        ORDER BY {order_by} LIMIT %s
+    """
+    return sql, (*params, *params_seek, limite + 1), (chaves, limite, voltando, bool(params_seek))
+
+def listar_catalogo(filtros=None, ordem=None, apos=None, antes=None, por_pagina=None):
+    """
+    Página do catálogo público: veículos disponíveis com filtros e ordenação (keyset).
+    Levanta exceção se o banco falhar: um catálogo vazio por erro não pode ir para o cache de páginas.
+    """
+    sql, params, fechamento = consulta_catalogo(filtros, ordem, apos, antes, por_pagina)
+    conn = Config.get_db_connection()
+    if not conn:
+        raise ConnectionError("Sem conexão com o banco de dados")
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        veiculos = buscar_todas(cursor, Veiculo)
+        cursor.close()
+        conn.close()
+        return paginacao.fechar_pagina(veiculos, *fechamento)
+
+    except Exception as e:
+        print(f"Erro ao listar catálogo: {e}")
+        if conn:
+            conn.close()
+        raise
+
+def consulta_busca(ids, filtros=None):
+    """SQL e parâmetros que carregam os veículos encontrados pelo índice, com os filtros do catálogo"""
+    condicoes, params = _condicoes_catalogo(filtros)
+    condicoes.append(f"id_veiculo IN ({', '.join(['%s'] * len(ids))})")
+    return f"{SELECT_VEICULO} WHERE {' AND '.join(condicoes)}", (*params, *ids)
+
+def ordenar_resultado_busca(linhas, ids, ordem=None):
+    """Devolve as linhas na ordem de relevância do índice ou na ordenação pedida"""
+    por_id = {v.id_veiculo: v for v in linhas}
+    veiculos = [por_id[i] for i in ids if i in por_id]
+    if ordem in ORDENS_CATALOGO:
+        chaves, decrescente = ORDENS_CATALOGO[ordem]
+        veiculos.sort(key=lambda v: tuple(v[nome] for _, nome in chaves), reverse=decrescente)
+    return veiculos
+
+def exigir_indice_busca():
+    """Levanta exceção se o índice de busca não pôde ser montado (a busca vazia seria falsa)"""
+    if busca.indice.construido_em is None:
+        raise ConnectionError("Índice de busca indisponível")
+
+def buscar_veiculos_disponiveis(consulta, filtros=None, ordem=None):
+    """
+    Busca textual (marca, modelo, cor, combustível, ano) nos veículos disponíveis, por relevância.
+    Levanta exceção se o banco ou o índice falharem, como listar_catalogo.
+    """
+    ids = busca.buscar(consulta, Config.SEARCH_RESULTS_MAX)
+    exigir_indice_busca()
+    if not ids:
         return []
+    sql, params = consulta_busca(ids, filtros)
+    conn = Config.get_db_connection()
+    if not conn:
+        raise ConnectionError("Sem conexão com o banco de dados")
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        linhas = buscar_todas(cursor, Veiculo)
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"Erro ao buscar veículos: {e}")
+        if conn:
+            conn.close()
+        raise
+
+    return ordenar_resultado_busca(linhas, ids, ordem)
+
+def buscar_veiculos_por_prefixo(texto, limite=None, somente_disponiveis=True):
+    """Sugestões de veículos pelo índice de busca (prefixo de marca, modelo, cor, combustível ou ano)"""
+    ids = busca.buscar(texto, paginacao.tamanho_sugestoes(limite), somente_disponiveis)
+    return obter_veiculos_por_ids(ids)
 
 def obter_veiculo(id_veiculo):
     """Obtém um veículo específico por ID"""
@@ -46,9 +214,9 @@ def obter_veiculo(id_veiculo):
     if not conn:
         return None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM veiculos WHERE id_veiculo = %s", (id_veiculo,))
-        veiculo = cursor.fetchone()
+        cursor = conn.cursor()
+        cursor.execute(f"{SELECT_VEICULO} WHERE id_veiculo = %s", (id_veiculo,))
+        veiculo = buscar_uma(cursor, Veiculo)
         cursor.close()
         conn.close()
         return veiculo
@@ -59,8 +227,8 @@ def obter_veiculo(id_veiculo):
             conn.close()
         return None
 
-def adicionar_veiculo(marca, modelo, ano, preco, foto=None, km_rodados=0, cor=None, combustivel=None):
-    """Adiciona um novo veículo"""
+def validar_veiculo(marca, modelo, ano, preco):
+    """Regras de validação de veículo (usadas no cadastro, edição e importação)"""
     # Validação dos campos obrigatórios
     if not marca or not modelo or not ano or not preco:
         raise ValueError("Marca, modelo, ano e preço são obrigatórios")
@@ -80,6 +248,10 @@ def adicionar_veiculo(marca, modelo, ano, preco, foto=None, km_rodados=0, cor=No
             raise ValueError("Preço deve ser maior que zero")
     except ValueError:
         raise ValueError("Preço inválido")
+
+def adicionar_veiculo(marca, modelo, ano, preco, foto=None, km_rodados=0, cor=None, combustivel=None):
+    """Adiciona um novo veículo"""
+    validar_veiculo(marca, modelo, ano, preco)
     
     conn = Config.get_db_connection()
     if not conn:
@@ -90,8 +262,15 @@ def adicionar_veiculo(marca, modelo, ano, preco, foto=None, km_rodados=0, cor=No
             INSERT INTO veiculos (marca, modelo, ano, preco, foto, km_rodados, cor, combustivel)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, (marca, modelo, ano, preco, foto, km_rodados, cor, combustivel))
+        id_veiculo = cursor.lastrowid
+        ajustar_facetas(cursor, 1, id_veiculo)
         conn.commit()
-        return cursor.lastrowid
+        pool.apos_commit(tocar_versao, 'veiculos')
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(busca.indexar_veiculo, {'id_veiculo': id_veiculo, 'marca': marca, 'modelo': modelo, 'ano': ano,
+                                                 'cor': cor, 'combustivel': combustivel, 'disponivel': True})
+        return id_veiculo
     except Exception as e:
         conn.rollback()
         raise e
@@ -99,33 +278,26 @@ def adicionar_veiculo(marca, modelo, ano, preco, foto=None, km_rodados=0, cor=No
         cursor.close()
         conn.close()
 
+@pool.repetir_em_conflito
 def atualizar_veiculo(id_veiculo, marca, modelo, ano, preco, disponivel=None, km_rodados=None, cor=None, combustivel=None, foto=None):
-    """Atualiza um veículo"""
-    # Validação dos campos obrigatórios
-    if not marca or not modelo or not ano or not preco:
-        raise ValueError("Marca, modelo, ano e preço são obrigatórios")
-    
-    # Validação de ano
-    try:
-        ano_int = int(ano)
-        if ano_int < 1900 or ano_int > 2025:
-            raise ValueError("Ano inválido")
-    except ValueError:
-        raise ValueError("Ano inválido")
-    
-    # Validação de preço
-    try:
-        preco_float = float(preco)
-        if preco_float <= 0:
-            raise ValueError("Preço deve ser maior que zero")
-    except ValueError:
-        raise ValueError("Preço inválido")
+    """
+    Atualiza um veículo numa única transação e retorna o caminho da foto que
+    ele tinha antes, para o controller apagar o arquivo se a foto foi trocada.
+    """
+    validar_veiculo(marca, modelo, ano, preco)
     
     conn = Config.get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor()
     try:
+        # Trava o veículo e lê a foto atual na mesma transação do UPDATE
+        cursor.execute("SELECT foto FROM veiculos WHERE id_veiculo=%s FOR UPDATE", (id_veiculo,))
+        atual = cursor.fetchone()
+        if not atual:
+            raise ValueError("Veículo não encontrado!")
+        foto_antiga = atual[0]
+
         # Monta a query dinamicamente baseado nos campos fornecidos
         campos = []
         valores = []
@@ -158,11 +330,23 @@ def atualizar_veiculo(id_veiculo, marca, modelo, ano, preco, disponivel=None, km
             campos.append("foto=%s")
             valores.append(foto)
         
+        # Versão da linha: chave do cache de fragmentos (cartões do catálogo)
+        campos.append("versao=versao+1")
         valores.append(id_veiculo)
         query = f"UPDATE veiculos SET {', '.join(campos)} WHERE id_veiculo=%s"
         
+        # A marca faz parte do resumo de vendas e das facetas: move as contagens junto
+        ajustar_resumo(cursor, -1, id_veiculo=id_veiculo)
+        ajustar_facetas(cursor, -1, id_veiculo)
         cursor.execute(query, valores)
+        ajustar_resumo(cursor, 1, id_veiculo=id_veiculo)
+        ajustar_facetas(cursor, 1, id_veiculo)
         conn.commit()
+        pool.apos_commit(tocar_versao, 'veiculos')
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(busca.reindexar_veiculo, id_veiculo)
+        return foto_antiga
     except Exception as e:
         conn.rollback()
         raise e
@@ -170,35 +354,39 @@ def atualizar_veiculo(id_veiculo, marca, modelo, ano, preco, disponivel=None, km
         cursor.close()
         conn.close()
 
+@pool.repetir_em_conflito
 def excluir_veiculo(id_veiculo):
-    """Exclui um veículo"""
+    """
+    Exclui o veículo se ele não tiver vendas, numa única transação, e retorna o
+    caminho da foto para o controller apagar o arquivo depois do commit.
+    """
     conn = Config.get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor()
     try:
+        # A trava na linha do veículo impede que uma venda nova o referencie
+        # (a checagem da chave estrangeira espera por ela) até o DELETE
+        cursor.execute("SELECT foto FROM veiculos WHERE id_veiculo=%s FOR UPDATE", (id_veiculo,))
+        veiculo = cursor.fetchone()
+        if not veiculo:
+            raise ValueError("Veículo não encontrado!")
+        cursor.execute("SELECT 1 FROM vendas WHERE id_veiculo=%s LIMIT 1", (id_veiculo,))
+        if cursor.fetchone():
+            raise ValueError("Não é possível excluir veículo que já possui vendas associadas!")
+
+        ajustar_facetas(cursor, -1, id_veiculo)
         cursor.execute("DELETE FROM veiculos WHERE id_veiculo=%s", (id_veiculo,))
+        registrar_exclusao(cursor, 'veiculos', id_veiculo)
         conn.commit()
+        pool.apos_commit(tocar_versao, 'veiculos')
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(busca.remover_veiculo, id_veiculo)
+        return veiculo[0]
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         cursor.close()
         conn.close()
-
-def veiculo_tem_vendas(id_veiculo):
-    """Verifica se veículo tem vendas associadas"""
-    conn = Config.get_db_connection()
-    if not conn:
-        return False
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT COUNT(*) as total FROM vendas WHERE id_veiculo=%s", (id_veiculo,))
-        result = cursor.fetchone()
-        return result[0] > 0
-    except Exception as e:
-        print(f"Erro ao verificar vendas do veículo: {e}")
-        return False
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
@@ -1,14 +1,90 @@
 from config import Config
+from infra import pool, busca, condicional
+from models import paginacao
+from infra.cache_paginas import invalidar_catalogo
+from models.faceta_model import ajustar_facetas
+from models.versao_model import tocar_versao
+from models.mudanca_model import registrar_exclusao
+from models.linhas import tipo_linha, buscar_todas, buscar_uma
 
-def listar_vendas():
-    """Lista todas as vendas com informações relacionadas"""
+# Projeções da lista de vendas e da tela de detalhes
+VendaLista = tipo_linha('VendaLista', (
+    'id_venda', 'data_venda', 'valor_final', 'forma_pagamento', 'observacoes', 'nome_cliente',
+    'cpf_cliente', 'marca', 'modelo', 'ano_veiculo', 'nome_funcionario', 'cargo',
+))
+VendaDetalhe = tipo_linha('VendaDetalhe', (
+    'id_venda', 'id_cliente', 'id_funcionario', 'id_veiculo', 'data_venda', 'valor_final',
+    'forma_pagamento', 'observacoes', 'nome_cliente', 'cpf_cliente', 'marca_veiculo',
+    'modelo_veiculo', 'ano_veiculo', 'preco_veiculo', 'nome_funcionario',
+))
+
+CHAVES_VENDAS = [('v.data_venda', 'data_venda'), ('v.id_venda', 'id_venda')]
+
+# Dimensões aceitas no relatório -> expressão sobre vendas_resumo_diario
+AGRUPAMENTOS_RELATORIO = {
+    'dia': 'r.dia',
+    'mes': "DATE_FORMAT(r.dia, '%Y-%m')",
+    'ano': 'YEAR(r.dia)',
+    'funcionario': 'r.id_funcionario',
+    'marca': 'r.marca',
+    'forma_pagamento': 'r.forma_pagamento',
+}
+
+def ajustar_resumo(cursor, sinal, id_venda=None, id_veiculo=None):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) a(s) venda(s) do resumo diário por
+    dia x funcionário x marca x forma de pagamento. Deve rodar na mesma
+    transação da escrita em vendas/veiculos para o resumo nunca divergir.
+    """
+    filtro, valor = ('v.id_venda', id_venda) if id_venda is not None else ('v.id_veiculo', id_veiculo)
+    cursor.execute(f"""
+        INSERT INTO vendas_resumo_diario (dia, id_funcionario, marca, forma_pagamento, total_vendas, total_valor)
+        SELECT v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, ''),
+               %s * COUNT(*), %s * SUM(v.valor_final)
+        FROM vendas v
+        JOIN veiculos ve ON ve.id_veiculo = v.id_veiculo
+        WHERE {filtro} = %s
+        GROUP BY v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, '')
+        ON DUPLICATE KEY UPDATE
+            total_vendas = total_vendas + VALUES(total_vendas),
+            total_valor = total_valor + VALUES(total_valor)
+    """, (sinal, sinal, valor))
+
+def reservar_veiculo(cursor, id_veiculo):
+    """
+    Marca o veículo como vendido só se ainda estiver disponível. O UPDATE condicional
+    trava a linha, então entre vendas simultâneas do mesmo carro apenas uma afeta a
+    linha (rowcount 1); as demais veem disponivel=FALSE e recebem rowcount 0.
+    """
+    cursor.execute("""
+        UPDATE veiculos SET disponivel=FALSE, versao=versao+1 WHERE id_veiculo=%s AND disponivel=TRUE
+    """, (id_veiculo,))
+    if cursor.rowcount != 1:
+        return False
+    # Sai das facetas do catálogo (a linha já está travada por esta transação)
+    ajustar_facetas(cursor, -1, id_veiculo, disponivel=False)
+    return True
+
+def liberar_veiculo(cursor, id_veiculo):
+    """Marca o veículo como disponível novamente, devolvendo-o às facetas"""
+    cursor.execute("""
+        UPDATE veiculos SET disponivel=TRUE, versao=versao+1 WHERE id_veiculo=%s AND disponivel=FALSE
+    """, (id_veiculo,))
+    if cursor.rowcount == 1:
+        ajustar_facetas(cursor, 1, id_veiculo)
+
+def listar_vendas_paginado(apos=None, antes=None, por_pagina=None):
+    """Lista uma página de vendas, das mais recentes para as mais antigas (keyset)"""
+    limite = paginacao.tamanho_pagina(por_pagina)
+    condicao, params, order_by, voltando = paginacao.montar_seek(CHAVES_VENDAS, apos, antes, decrescente=True)
     conn = Config.get_db_connection()
     if not conn:
-        return None
-    
+        return paginacao.pagina_vazia(limite)
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
+        cursor = conn.cursor()
+        where = f"WHERE {condicao}" if condicao else ""
+        cursor.execute(f"""
             SELECT v.id_venda, v.data_venda, v.valor_final, v.forma_pagamento, v.observacoes,
                    c.nome AS nome_cliente, c.cpf AS cpf_cliente,
                    ve.marca, ve.modelo, ve.ano AS ano_veiculo,
@@ -17,18 +93,20 @@ def listar_vendas():
             JOIN clientes c ON v.id_cliente = c.id_cliente
             JOIN veiculos ve ON v.id_veiculo = ve.id_veiculo
             JOIN funcionarios f ON v.id_funcionario = f.id_funcionario
-            ORDER BY v.data_venda DESC
-        """)
-        vendas = cursor.fetchall()
+            {where}
+            ORDER BY {order_by}
+            LIMIT %s
+        """, (*params, limite + 1))
+        vendas = buscar_todas(cursor, VendaLista)
         cursor.close()
         conn.close()
-        return vendas
-    
+        return paginacao.fechar_pagina(vendas, CHAVES_VENDAS, limite, voltando, bool(params))
+
     except Exception as e:
         print(f"Erro ao listar vendas: {e}")
         if conn:
             conn.close()
-        return []
+        return paginacao.pagina_vazia(limite)
 
 def obter_venda(id_venda):
     """Obtém uma venda específica por ID"""
@@ -36,16 +114,19 @@ def obter_venda(id_venda):
     if not conn:
         return None
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT v.*, c.nome AS nome_cliente, ve.modelo AS modelo_veiculo, f.nome AS nome_funcionario
+            SELECT v.id_venda, v.id_cliente, v.id_funcionario, v.id_veiculo, v.data_venda, v.valor_final,
+                   v.forma_pagamento, v.observacoes, c.nome AS nome_cliente, c.cpf AS cpf_cliente, ve.marca AS marca_veiculo,
+                   ve.modelo AS modelo_veiculo, ve.ano AS ano_veiculo, ve.preco AS preco_veiculo,
+                   f.nome AS nome_funcionario
             FROM vendas v
             JOIN clientes c ON v.id_cliente = c.id_cliente
             JOIN veiculos ve ON v.id_veiculo = ve.id_veiculo
             JOIN funcionarios f ON v.id_funcionario = f.id_funcionario
             WHERE v.id_venda = %s
         """, (id_venda,))
-        venda = cursor.fetchone()
+        venda = buscar_uma(cursor, VendaDetalhe)
         cursor.close()
         conn.close()
         return venda
@@ -56,6 +137,7 @@ def obter_venda(id_venda):
             conn.close()
         return None
 
+@pool.repetir_em_conflito
 def adicionar_venda(id_cliente, id_veiculo, id_funcionario, valor_final, forma_pagamento=None, observacoes=None):
     """Adiciona uma nova venda e marca o veículo como indisponível"""
     # Validação dos campos obrigatórios
@@ -75,10 +157,8 @@ def adicionar_venda(id_cliente, id_veiculo, id_funcionario, valor_final, forma_p
         return None
     cursor = conn.cursor()
     try:
-        # Verifica se veículo está disponível
-        cursor.execute("SELECT disponivel FROM veiculos WHERE id_veiculo=%s", (id_veiculo,))
-        result = cursor.fetchone()
-        if not result or not result[0]:
+        # Reserva o veículo antes de tudo: se outra venda chegou primeiro, desiste
+        if not reservar_veiculo(cursor, id_veiculo):
             raise ValueError("Veículo não está disponível")
         
         # Insere a venda
@@ -86,12 +166,17 @@ def adicionar_venda(id_cliente, id_veiculo, id_funcionario, valor_final, forma_p
             INSERT INTO vendas (id_cliente, id_veiculo, id_funcionario, valor_final, forma_pagamento, observacoes)
             VALUES (%s, %s, %s, %s, %s, %s)
         """, (id_cliente, id_veiculo, id_funcionario, valor_final, forma_pagamento, observacoes))
+        id_venda = cursor.lastrowid
         
-        # Marca o veículo como indisponível
-        cursor.execute("UPDATE veiculos SET disponivel=FALSE WHERE id_veiculo=%s", (id_veiculo,))
+        # Contabiliza no resumo diário
+        ajustar_resumo(cursor, 1, id_venda=id_venda)
         
         conn.commit()
-        return cursor.lastrowid
+        pool.apos_commit(tocar_versao, 'veiculos')
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        pool.apos_commit(busca.marcar_disponivel, id_veiculo, False)
+        return id_venda
     except Exception as e:
         conn.rollback()
         raise e
@@ -99,6 +184,7 @@ def adicionar_venda(id_cliente, id_veiculo, id_funcionario, valor_final, forma_p
         cursor.close()
         conn.close()
 
+@pool.repetir_em_conflito
 def atualizar_venda(id_venda, id_cliente, id_veiculo, id_funcionario, valor_final, forma_pagamento=None, observacoes=None):
     """Atualiza uma venda existente"""
     # Validação dos campos obrigatórios
@@ -118,8 +204,8 @@ def atualizar_venda(id_venda, id_cliente, id_veiculo, id_funcionario, valor_fina
         return None
     cursor = conn.cursor()
     try:
-        # Obtém o veículo atual da venda
-        cursor.execute("SELECT id_veiculo FROM vendas WHERE id_venda=%s", (id_venda,))
+        # Obtém o veículo atual da venda, travando-a contra edições simultâneas
+        cursor.execute("SELECT id_veiculo FROM vendas WHERE id_venda=%s FOR UPDATE", (id_venda,))
         venda_atual = cursor.fetchone()
         
         if not venda_atual:
@@ -127,30 +213,29 @@ def atualizar_venda(id_venda, id_cliente, id_veiculo, id_funcionario, valor_fina
         
         veiculo_antigo_id = venda_atual[0]
         
-        # Se o veículo mudou, precisa liberar o antigo e reservar o novo
+        # Se o veículo mudou, precisa reservar o novo e liberar o antigo
         if veiculo_antigo_id != int(id_veiculo):
-            # Libera o veículo antigo
-            cursor.execute("UPDATE veiculos SET disponivel=TRUE WHERE id_veiculo=%s", (veiculo_antigo_id,))
-            
-            # Verifica se o novo veículo está disponível
-            cursor.execute("SELECT disponivel FROM veiculos WHERE id_veiculo=%s", (id_veiculo,))
-            result = cursor.fetchone()
-            if not result or not result[0]:
-                conn.rollback()
+            if not reservar_veiculo(cursor, id_veiculo):
                 raise ValueError("Veículo não está disponível")
-            
-            # Reserva o novo veículo
-            cursor.execute("UPDATE veiculos SET disponivel=FALSE WHERE id_veiculo=%s", (id_veiculo,))
+            liberar_veiculo(cursor, veiculo_antigo_id)
         
-        # Atualiza a venda
+        # Atualiza a venda, tirando os valores antigos do resumo e somando os novos
+        ajustar_resumo(cursor, -1, id_venda=id_venda)
         cursor.execute("""
             UPDATE vendas 
             SET id_cliente=%s, id_veiculo=%s, id_funcionario=%s, valor_final=%s, 
                 forma_pagamento=%s, observacoes=%s
             WHERE id_venda=%s
         """, (id_cliente, id_veiculo, id_funcionario, valor_final, forma_pagamento, observacoes, id_venda))
+        ajustar_resumo(cursor, 1, id_venda=id_venda)
         
         conn.commit()
+        pool.apos_commit(tocar_versao, 'veiculos')
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        if veiculo_antigo_id != int(id_veiculo):
+            pool.apos_commit(busca.marcar_disponivel, veiculo_antigo_id, True)
+            pool.apos_commit(busca.marcar_disponivel, int(id_veiculo), False)
     except Exception as e:
         conn.rollback()
         raise e
@@ -158,6 +243,7 @@ def atualizar_venda(id_venda, id_cliente, id_veiculo, id_funcionario, valor_fina
         cursor.close()
         conn.close()
 
+@pool.repetir_em_conflito
 def excluir_venda(id_venda):
     """Exclui uma venda e marca o veículo como disponível novamente"""
     conn = Config.get_db_connection()
@@ -166,17 +252,25 @@ def excluir_venda(id_venda):
     cursor = conn.cursor()
     try:
         # Obtém o ID do veículo antes de excluir
-        cursor.execute("SELECT id_veiculo FROM vendas WHERE id_venda=%s", (id_venda,))
+        cursor.execute("SELECT id_veiculo FROM vendas WHERE id_venda=%s FOR UPDATE", (id_venda,))
         result = cursor.fetchone()
         
+        id_veiculo = None
         if result:
             id_veiculo = result[0]
-            # Exclui a venda
+            # Retira do resumo diário e exclui a venda
+            ajustar_resumo(cursor, -1, id_venda=id_venda)
             cursor.execute("DELETE FROM vendas WHERE id_venda=%s", (id_venda,))
+            registrar_exclusao(cursor, 'vendas', id_venda)
             # Marca o veículo como disponível novamente
-            cursor.execute("UPDATE veiculos SET disponivel=TRUE WHERE id_veiculo=%s", (id_veiculo,))
+            liberar_veiculo(cursor, id_veiculo)
         
         conn.commit()
+        pool.apos_commit(invalidar_catalogo)
+        pool.apos_commit(condicional.esquecer_versoes)
+        if id_veiculo is not None:
+            pool.apos_commit(tocar_versao, 'veiculos')
+            pool.apos_commit(busca.marcar_disponivel, id_veiculo, True)
     except Exception as e:
         conn.rollback()
         raise e
@@ -184,38 +278,150 @@ def excluir_venda(id_venda):
         cursor.close()
         conn.close()
 
-def obter_relatorio_vendas(data_inicio=None, data_fim=None):
-    """Gera relatório de vendas no período especificado"""
+def obter_relatorio_vendas(data_inicio=None, data_fim=None, agrupar_por=None):
+    """
+    Gera relatório de vendas no período a partir do resumo diário.
+    Sem agrupamento retorna {total_vendas, total_valor}; com `agrupar_por`
+    (lista de chaves de AGRUPAMENTOS_RELATORIO) retorna uma linha por grupo.
+    """
+    agrupar_por = list(agrupar_por or [])
+    for chave in agrupar_por:
+        if chave not in AGRUPAMENTOS_RELATORIO:
+            raise ValueError(f"Agrupamento inválido: {chave}")
+
+    condicoes = []
+    params = []
+    if data_inicio:
+        condicoes.append("r.dia >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        condicoes.append("r.dia <= %s")
+        params.append(data_fim)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    colunas = [f"{AGRUPAMENTOS_RELATORIO[chave]} AS {chave}" for chave in agrupar_por]
+    colunas += ["CAST(SUM(r.total_vendas) AS SIGNED) AS total_vendas", "SUM(r.total_valor) AS total_valor"]
+    group_by = ""
+    if agrupar_por:
+        grupos = ', '.join(AGRUPAMENTOS_RELATORIO[chave] for chave in agrupar_por)
+        group_by = f"GROUP BY {grupos} HAVING SUM(r.total_vendas) > 0 ORDER BY {grupos}"
+
     conn = Config.get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor(dictionary=True)
     try:
-        if data_inicio and data_fim:
-            cursor.execute("""
-                SELECT COUNT(*) as total_vendas, SUM(valor_final) as total_valor
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-            """, (data_inicio, data_fim))
-        elif data_inicio:
-            cursor.execute("""
-                SELECT COUNT(*) as total_vendas, SUM(valor_final) as total_valor
-                FROM vendas
-                WHERE data_venda >= %s
-            """, (data_inicio,))
-        else:
-            cursor.execute("""
-                SELECT COUNT(*) as total_vendas, SUM(valor_final) as total_valor
-                FROM vendas
-            """)
-        
-        relatorio = cursor.fetchone()
+        cursor.execute(f"""
+            SELECT {', '.join(colunas)}
+            FROM vendas_resumo_diario r
+            {where}
+            {group_by}
+        """, params)
+        relatorio = cursor.fetchall() if agrupar_por else cursor.fetchone()
         cursor.close()
         conn.close()
+        if not agrupar_por and relatorio and relatorio['total_vendas'] is None:
+            relatorio['total_vendas'] = 0
         return relatorio
     
     except Exception as e:
         print(f"Erro ao obter relatório de vendas: {e}")
         if conn:
             conn.close()
-        return None
\ No newline at end of file
+        return None
+
+COLUNAS_EXPORTACAO = [
+    'id_venda', 'data_venda', 'valor_final', 'forma_pagamento',
+    'id_cliente', 'nome_cliente', 'cpf_cliente',
+    'id_veiculo', 'marca', 'modelo', 'ano_veiculo',
+    'id_funcionario', 'nome_funcionario',
+]
+
+def consulta_exportacao(data_inicio=None, data_fim=None):
+    """SQL e parâmetros da exportação (colunas de COLUNAS_EXPORTACAO, em ordem de data)"""
+    condicoes = []
+    params = []
+    if data_inicio:
+        condicoes.append("v.data_venda >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        condicoes.append("v.data_venda <= %s")
+        params.append(data_fim)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return f"""
+        SELECT v.id_venda, v.data_venda, v.valor_final, v.forma_pagamento,
+               c.id_cliente, c.nome, c.cpf,
+               ve.id_veiculo, ve.marca, ve.modelo, ve.ano,
+               f.id_funcionario, f.nome
+        FROM vendas v
+        JOIN clientes c ON v.id_cliente = c.id_cliente
+        JOIN veiculos ve ON v.id_veiculo = ve.id_veiculo
+        JOIN funcionarios f ON v.id_funcionario = f.id_funcionario
+        {where}
+        ORDER BY v.data_venda, v.id_venda
+    """, params
+
+def exportar_vendas(data_inicio=None, data_fim=None, lote=1000):
+    """
+    Gera as vendas (tuplas na ordem de COLUNAS_EXPORTACAO) lendo do servidor aos
+    poucos, com cursor sem buffer numa conexão própria: a memória fica constante
+    e a exportação não ocupa uma vaga do pool.
+    """
+    sql, params = consulta_exportacao(data_inicio, data_fim)
+    conn = pool.conexao_dedicada()
+    concluido = False
+    try:
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(sql, params)
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                break
+            yield from linhas
+        cursor.close()
+        concluido = True
+    finally:
+        if concluido:
+            conn.close()
+        else:
+            # Cliente desistiu no meio: fecha o socket sem ler o resto do resultado
+            conn.shutdown()
+
+def reconstruir_resumo_vendas(data_inicio=None, data_fim=None):
+    """Recalcula o resumo diário a partir de vendas (backfill ou correção)"""
+    condicoes = []
+    params = []
+    if data_inicio:
+        condicoes.append("{col} >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        condicoes.append("{col} <= %s")
+        params.append(data_fim)
+    filtro = ' AND '.join(condicoes)
+
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        where_resumo = f"WHERE {filtro.format(col='dia')}" if filtro else ""
+        cursor.execute(f"DELETE FROM vendas_resumo_diario {where_resumo}", params)
+        where_vendas = f"WHERE {filtro.format(col='v.data_venda')}" if filtro else ""
+        cursor.execute(f"""
+            INSERT INTO vendas_resumo_diario (dia, id_funcionario, marca, forma_pagamento, total_vendas, total_valor)
+            SELECT v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, ''),
+                   COUNT(*), SUM(v.valor_final)
+            FROM vendas v
+            JOIN veiculos ve ON ve.id_veiculo = v.id_veiculo
+            {where_vendas}
+            GROUP BY v.data_venda, v.id_funcionario, ve.marca, COALESCE(v.forma_pagamento, '')
+        """, params)
+        linhas = cursor.rowcount
+        conn.commit()
+        return linhas
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cursor.close()
+        conn.close()
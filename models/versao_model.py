@@ -0,0 +1,67 @@
+from config import Config
+from models.linhas import tipo_linha, buscar_todas
+
+
+def incrementar_versao(cursor, tabela):
+    """
+    Avança a versão da tabela e a data da última alteração no cursor recebido. A
+    linha do marcador fica travada até o commit: os models usam tocar_versao(),
+    depois do commit da escrita, para não enfileirar todas as escritas nessa linha.
+    """
+    cursor.execute("""
+        INSERT INTO versoes_tabelas (tabela, versao, atualizado_em) VALUES (%s, 1, CURRENT_TIMESTAMP)
+        ON DUPLICATE KEY UPDATE versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP
+    """, (tabela,))
+
+
+def tocar_versao(tabela):
+    """
+    Avança a versão numa transação própria, logo depois do commit da escrita. Entre
+    o commit e a versão nova, um leitor pode levar o ETag antigo com os dados
+    novos; na versão seguinte ele deixa de valer, então nunca fica conteúdo velho.
+    """
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        incrementar_versao(cursor, tabela)
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao atualizar versão de {tabela}: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+Versao = tipo_linha('Versao', ('tabela', 'versao', 'atualizado_em'))
+SQL_VERSOES = "SELECT tabela, versao, UNIX_TIMESTAMP(atualizado_em) FROM versoes_tabelas"
+
+
+def montar_versoes(linhas):
+    """{tabela: (versao, atualizado_em em segundos desde a época)}"""
+    return {linha.tabela: (int(linha.versao), float(linha.atualizado_em or 0)) for linha in linhas}
+
+
+def obter_versoes():
+    """Marcadores de todas as tabelas versionadas, ou None se o banco não respondeu"""
+    conn = Config.get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_VERSOES)
+        versoes = montar_versoes(buscar_todas(cursor, Versao))
+        cursor.close()
+        conn.close()
+        return versoes
+
+    except Exception as e:
+        print(f"Erro ao obter versões das tabelas: {e}")
+        if conn:
+            conn.close()
+        return None
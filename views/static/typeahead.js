@@ -0,0 +1,98 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const ESPERA_MS = 200; // espera após a última tecla antes de consultar
+    const MIN_CARACTERES = 2;
+
+    // <input data-typeahead="/url" data-alvo="id_do_hidden"> vira um campo de autocompletar
+    document.querySelectorAll('input[data-typeahead]').forEach(campo => {
+        const alvo = document.getElementById(campo.dataset.alvo);
+        const lista = document.createElement('ul');
+        lista.className = 'typeahead-list';
+        lista.hidden = true;
+        campo.parentNode.style.position = 'relative';
+        campo.parentNode.appendChild(lista);
+        campo.setAttribute('autocomplete', 'off');
+
+        let temporizador = null;
+        let controle = null;
+        let ativo = -1;
+
+        const fechar = () => {
+            lista.hidden = true;
+            ativo = -1;
+        };
+
+        const escolher = (item) => {
+            alvo.value = item.id;
+            campo.value = item.rotulo;
+            campo.setCustomValidity('');
+            fechar();
+        };
+
+        const mostrar = (itens) => {
+            lista.innerHTML = '';
+            itens.forEach(item => {
+                const li = document.createElement('li');
+                li.textContent = item.rotulo;
+                // mousedown dispara antes do blur do campo
+                li.addEventListener('mousedown', (e) => {
+                    e.preventDefault();
+                    escolher(item);
+                });
+                li.item = item;
+                lista.appendChild(li);
+            });
+            if (itens.length === 0) {
+                const li = document.createElement('li');
+                li.className = 'typeahead-empty';
+                li.textContent = 'Nenhum resultado';
+                lista.appendChild(li);
+            }
+            ativo = -1;
+            lista.hidden = false;
+        };
+
+        const consultar = () => {
+            const texto = campo.value.trim();
+            if (texto.length < MIN_CARACTERES) {
+                fechar();
+                return;
+            }
+            // cancela a consulta anterior para não mostrar resultados fora de ordem
+            if (controle) controle.abort();
+            controle = new AbortController();
+            const url = new URL(campo.dataset.typeahead, window.location.origin);
+            url.searchParams.set('q', texto);
+            fetch(url, { signal: controle.signal, headers: { 'Accept': 'application/json' } })
+                .then(resposta => resposta.json())
+                .then(dados => mostrar(dados.itens || []))
+                .catch(erro => {
+                    if (erro.name !== 'AbortError') fechar();
+                });
+        };
+
+        campo.addEventListener('input', () => {
+            // texto alterado: a seleção anterior deixa de valer
+            alvo.value = '';
+            campo.setCustomValidity('Selecione um item da lista');
+            clearTimeout(temporizador);
+            temporizador = setTimeout(consultar, ESPERA_MS);
+        });
+
+        campo.addEventListener('keydown', (e) => {
+            const itens = Array.from(lista.querySelectorAll('li')).filter(li => li.item);
+            if (lista.hidden || itens.length === 0) return;
+            if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                e.preventDefault();
+                ativo = (ativo + (e.key === 'ArrowDown' ? 1 : -1) + itens.length) % itens.length;
+                itens.forEach((li, i) => li.classList.toggle('active', i === ativo));
+            } else if (e.key === 'Enter' && ativo >= 0) {
+                e.preventDefault();
+                escolher(itens[ativo].item);
+            } else if (e.key === 'Escape') {
+                fechar();
+            }
+        });
+
+        campo.addEventListener('blur', fechar);
+    });
+});